@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable
+
+from socdedup.models import Alert, FoldedAlert
+
+
+def is_privileged_user(user: str) -> bool:
+    return user.lower().startswith("admin")
+
+
+def is_credential_spray_indicator(alert: Alert) -> bool:
+    if alert.mitre_technique and alert.mitre_technique.startswith("T1110"):
+        return True
+    return "failed login" in alert.alert_type.lower()
+
+
+@dataclass
+class AlertAggregates:
+    """Running aggregates over an incident's alerts.
+
+    Everything blast radius and reasoning need is folded in by ``add`` in
+    O(1) per alert, so assessing an incident does not rescan its alerts.
+    ``host_times`` holds the first-seen time of each host in arrival order.
+    A ``FoldedAlert`` counts as all of its occurrences spread over
+    ``timestamp`` through ``last_seen``.
+    """
+
+    count: int = 0
+    hosts: set[str] = field(default_factory=set)
+    users: set[str] = field(default_factory=set)
+    ips: set[str] = field(default_factory=set)
+    techniques: set[str] = field(default_factory=set)
+    privileged_users: set[str] = field(default_factory=set)
+    host_times: list[datetime] = field(default_factory=list)
+    user_hosts: dict[str, set[str]] = field(default_factory=dict)
+    user_ranks: dict[str, int] = field(default_factory=dict)
+    user_bounds: dict[str, tuple[datetime, datetime]] = field(default_factory=dict)
+    first_time: datetime | None = None
+    last_time: datetime | None = None
+    technique_bounds: tuple[datetime, datetime] | None = None
+    credential_indicator: bool = False
+    lateral_user: str | None = None
+    lateral_hosts: int = 0
+    lateral_t1021: bool = False
+
+    @classmethod
+    def from_alerts(cls, alerts: Iterable[Alert]) -> AlertAggregates:
+        aggregates = cls()
+        for alert in alerts:
+            aggregates.add(alert)
+        return aggregates
+
+    def add(self, alert: Alert) -> None:
+        timestamp = last_seen = alert.timestamp
+        host = alert.host
+        user = alert.user
+        if isinstance(alert, FoldedAlert):
+            self.count += alert.occurrences
+            last_seen = alert.last_seen
+        else:
+            self.count += 1
+
+        if self.first_time is None or timestamp < self.first_time:
+            self.first_time = timestamp
+        if self.last_time is None or last_seen > self.last_time:
+            self.last_time = last_seen
+
+        if host and host not in self.hosts:
+            self.hosts.add(host)
+            self.host_times.append(timestamp)
+        if user:
+            if user not in self.users:
+                self.users.add(user)
+                if is_privileged_user(user):
+                    self.privileged_users.add(user)
+            bounds = self.user_bounds.get(user)
+            if bounds is None:
+                self.user_bounds[user] = (timestamp, last_seen)
+            elif timestamp < bounds[0] or last_seen > bounds[1]:
+                self.user_bounds[user] = (min(bounds[0], timestamp), max(bounds[1], last_seen))
+            if host:
+                user_hosts = self.user_hosts.get(user)
+                if user_hosts is None:
+                    user_hosts = self.user_hosts[user] = set()
+                    self.user_ranks[user] = len(self.user_ranks)
+                if host not in user_hosts:
+                    user_hosts.add(host)
+                    self._track_lateral_user(user, len(user_hosts))
+        if alert.source_ip:
+            self.ips.add(alert.source_ip)
+        if alert.mitre_technique:
+            self.techniques.add(alert.mitre_technique)
+            if alert.mitre_technique.startswith("T1021"):
+                self.lateral_t1021 = True
+            bounds = self.technique_bounds
+            if bounds is None:
+                self.technique_bounds = (timestamp, last_seen)
+            elif timestamp < bounds[0] or last_seen > bounds[1]:
+                self.technique_bounds = (min(bounds[0], timestamp), max(bounds[1], last_seen))
+        if not self.credential_indicator and is_credential_spray_indicator(alert):
+            self.credential_indicator = True
+
+    def _track_lateral_user(self, user: str, hosts: int) -> None:
+        # Host counts only grow one at a time, so the user with the most
+        # hosts (earliest seen on ties, as a scan of user_hosts would pick)
+        # can be kept current without rescanning.
+        if hosts > self.lateral_hosts:
+            self.lateral_user = user
+            self.lateral_hosts = hosts
+        elif (
+            hosts == self.lateral_hosts
+            and self.lateral_user is not None
+            and self.user_ranks[user] < self.user_ranks[self.lateral_user]
+        ):
+            self.lateral_user = user
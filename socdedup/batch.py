@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without the fast extra
+    np = None
+
+from socdedup.models import Alert, construct_alert
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+_MISSING = -1
+
+
+def epoch_micros(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def from_epoch_micros(micros: int) -> datetime:
+    return EPOCH + micros * MICROSECOND
+
+
+class StringTable:
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def encode(self, value: str | None) -> int:
+        if value is None:
+            return _MISSING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self._ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+    def decode(self, string_id: int) -> str | None:
+        if string_id == _MISSING:
+            return None
+        return self.values[string_id]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class AlertBatch:
+    """Columnar alert storage with dictionary-encoded entities.
+
+    Timestamps are int64 microseconds since the epoch and every string
+    column holds int32 ids into a ``StringTable`` that can be shared
+    between batches. ``raw`` payloads are only retained with
+    ``keep_raw=True``; pydantic extra fields are not kept.
+    """
+
+    def __init__(self, table: StringTable | None = None, keep_raw: bool = False) -> None:
+        self.table = table if table is not None else StringTable()
+        self.keep_raw = keep_raw
+        self.timestamps = array("q")
+        self.hosts = array("i")
+        self.users = array("i")
+        self.source_ips = array("i")
+        self.dest_ips = array("i")
+        self.techniques = array("i")
+        self.alert_types = array("i")
+        self.raws: list[dict[str, Any]] | None = [] if keep_raw else None
+
+    @classmethod
+    def from_alerts(
+        cls,
+        alerts: Iterable[Alert],
+        table: StringTable | None = None,
+        keep_raw: bool = False,
+    ) -> AlertBatch:
+        batch = cls(table=table, keep_raw=keep_raw)
+        for alert in alerts:
+            batch.append(alert)
+        return batch
+
+    def append(self, alert: Alert) -> None:
+        encode = self.table.encode
+        self.timestamps.append(epoch_micros(alert.timestamp))
+        self.hosts.append(encode(alert.host))
+        self.users.append(encode(alert.user))
+        self.source_ips.append(encode(alert.source_ip))
+        self.dest_ips.append(encode(alert.dest_ip))
+        self.techniques.append(encode(alert.mitre_technique))
+        self.alert_types.append(encode(alert.alert_type))
+        if self.raws is not None:
+            self.raws.append(alert.raw)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def row(self, index: int) -> AlertRow:
+        return AlertRow(self, index)
+
+    def __iter__(self) -> Iterator[AlertRow]:
+        for index in range(len(self)):
+            yield AlertRow(self, index)
+
+    def sorted_rows(self) -> list[int]:
+        return sorted(range(len(self)), key=self.timestamps.__getitem__)
+
+
+class AlertRow:
+    """Read-only view of one batch row exposing the ``Alert`` attributes
+    used by clustering, blast radius and reasoning."""
+
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch: AlertBatch, index: int) -> None:
+        self.batch = batch
+        self.index = index
+
+    @property
+    def timestamp(self) -> datetime:
+        return from_epoch_micros(self.batch.timestamps[self.index])
+
+    @property
+    def host(self) -> str | None:
+        return self.batch.table.decode(self.batch.hosts[self.index])
+
+    @property
+    def user(self) -> str | None:
+        return self.batch.table.decode(self.batch.users[self.index])
+
+    @property
+    def source_ip(self) -> str | None:
+        return self.batch.table.decode(self.batch.source_ips[self.index])
+
+    @property
+    def dest_ip(self) -> str | None:
+        return self.batch.table.decode(self.batch.dest_ips[self.index])
+
+    @property
+    def mitre_technique(self) -> str | None:
+        return self.batch.table.decode(self.batch.techniques[self.index])
+
+    @property
+    def alert_type(self) -> str:
+        return self.batch.table.decode(self.batch.alert_types[self.index]) or ""
+
+    @property
+    def raw(self) -> dict[str, Any]:
+        if self.batch.raws is None:
+            return {}
+        return self.batch.raws[self.index]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Pickle as a standalone Alert so shipping rows to worker processes
+        # does not drag the whole batch along.
+        return (construct_alert, (self._fields(),))
+
+    def _fields(self) -> dict[str, Any]:
+        return {
+            "timestamp": self.timestamp,
+            "source_ip": self.source_ip,
+            "dest_ip": self.dest_ip,
+            "user": self.user,
+            "host": self.host,
+            "alert_type": self.alert_type,
+            "mitre_technique": self.mitre_technique,
+            "raw": self.raw,
+        }
+
+    def to_alert(self) -> Alert:
+        return construct_alert(self._fields())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Iterator
+
+from socdedup.blast_radius import compute_blast_radius
+from socdedup.clustering import cluster_alerts
+from socdedup.ingest import ingest_jsonl
+from socdedup.reasoning import derive_signals
+from socdedup.store import incident_payload
+from socdedup.workload import WorkloadConfig, write_workload
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def _commit() -> str | None:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+@dataclass
+class StageResult:
+    name: str
+    seconds: float
+    items: int
+    peak_rss_mb: float | None
+
+    @property
+    def per_second(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class BenchResult:
+    workload: dict[str, Any]
+    options: dict[str, Any]
+    stages: list[StageResult] = field(default_factory=list)
+    incidents: int = 0
+    commit: str | None = None
+
+    @property
+    def alerts_per_second(self) -> float:
+        # End to end: everything after the alerts exist on disk.
+        seconds = sum(stage.seconds for stage in self.stages if stage.name != "generate")
+        return self.workload["alerts"] / seconds if seconds else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "commit": self.commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workload": self.workload,
+            "options": self.options,
+            "incidents": self.incidents,
+            "alerts_per_second": self.alerts_per_second,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": {
+                stage.name: {
+                    "seconds": stage.seconds,
+                    "items": stage.items,
+                    "per_second": stage.per_second,
+                    "peak_rss_mb": stage.peak_rss_mb,
+                }
+                for stage in self.stages
+            },
+        }
+
+
+@contextmanager
+def _stage(result: BenchResult, name: str, items: int) -> Iterator[None]:
+    started = time.perf_counter()
+    yield
+    result.stages.append(
+        StageResult(name, time.perf_counter() - started, items, peak_rss_mb())
+    )
+
+
+def run_benchmark(
+    config: WorkloadConfig,
+    time_window: timedelta = timedelta(minutes=15),
+    min_score: int = 5,
+    retire_after: timedelta | None = None,
+    workers: int = 1,
+    workdir: Path | None = None,
+) -> BenchResult:
+    """Generate a workload and time each pipeline stage over it.
+
+    ``cluster`` includes assessing the incidents; ``blast_radius`` and
+    ``signals`` time the standalone list-based entry points over every
+    incident's alerts, and ``serialize`` the JSON output payload.
+    """
+    result = BenchResult(
+        workload=config.as_dict(),
+        options={
+            "time_window_seconds": time_window.total_seconds(),
+            "min_score": min_score,
+            "retire_after_seconds": retire_after.total_seconds() if retire_after else None,
+            "workers": workers,
+        },
+        commit=_commit(),
+    )
+    with tempfile.TemporaryDirectory(dir=workdir) as scratch:
+        path = Path(scratch) / "alerts.jsonl"
+        with _stage(result, "generate", config.alerts):
+            write_workload(path, config)
+        with _stage(result, "ingest", config.alerts):
+            alerts = ingest_jsonl(path, workers=workers)
+    with _stage(result, "cluster", len(alerts)):
+        incidents = cluster_alerts(
+            alerts, time_window, min_score, retire_after, workers=workers
+        )
+    result.incidents = len(incidents)
+    blasts = []
+    with _stage(result, "blast_radius", len(incidents)):
+        for incident in incidents:
+            blasts.append(compute_blast_radius(incident.alerts))
+    with _stage(result, "signals", len(incidents)):
+        for incident, blast in zip(incidents, blasts):
+            derive_signals(incident.alerts, blast)
+    with _stage(result, "serialize", len(incidents)):
+        for incident in incidents:
+            json.dumps(incident_payload(incident), sort_keys=True)
+    return result
+
+
+def write_results(path: Path, result: BenchResult) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result.as_dict(), indent=2, sort_keys=True) + "\n", encoding="utf-8")
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from math import ceil
+from typing import Iterable
 
+from socdedup import columnar
+from socdedup.aggregates import AlertAggregates
 from socdedup.models import Alert
 
 
@@ -30,12 +34,20 @@ def _window_minutes(start: datetime, end: datetime) -> int:
     return max(1, minutes)
 
 
-def _compute_blast_growth(alerts: list[Alert], host_times: list[datetime]) -> BlastGrowth:
-    if not host_times:
-        return BlastGrowth(False, 0, 0, 0, 0)
+@dataclass(frozen=True)
+class PeakHostWindow:
+    hosts: int
+    new_hosts: int
+    start_hosts: int
+    end_hosts: int
+    window_minutes: int
 
-    window = timedelta(minutes=10)
-    times = sorted(host_times)
+
+_GROWTH_WINDOW = timedelta(minutes=10)
+
+
+def _scan_peak(times: list[datetime]) -> tuple[int, int]:
+    window = _GROWTH_WINDOW
     max_new_hosts = 1
     best_start = 0
     best_end = 1
@@ -51,61 +63,120 @@ def _compute_blast_growth(alerts: list[Alert], host_times: list[datetime]) -> Bl
             max_new_hosts = new_hosts
             best_start = start_index
             best_end = end_index
+    return best_start, best_end
+
+
+def peak_host_window(host_times: list[datetime]) -> PeakHostWindow:
+    if not host_times:
+        return PeakHostWindow(0, 0, 0, 0, 0)
+
+    times = sorted(host_times)
+    if columnar.np is not None and len(times) >= columnar.COLUMNAR_MIN_HOSTS:
+        best_start, best_end = columnar.peak_window_bounds(times, _GROWTH_WINDOW)
+    else:
+        best_start, best_end = _scan_peak(times)
 
     if best_end > best_start:
         growth_window = _window_minutes(times[best_start], times[best_end - 1])
     else:
         growth_window = 0
 
-    start_hosts = best_start
-    end_hosts = best_end
-
-    incident_window = _window_minutes(min(a.timestamp for a in alerts), max(a.timestamp for a in alerts))
-    detected = max_new_hosts >= 5 or len(times) >= 5
+    return PeakHostWindow(len(times), best_end - best_start, best_start, best_end, growth_window)
+
+
+class HostWindowTracker:
+    """``peak_host_window`` kept up to date one first-seen time at a time.
+
+    The deque holds the hosts within the window of the newest one. Windows
+    starting before it can no longer grow, so only the best of them is
+    kept, which makes ``add`` amortized O(1). Times must arrive in order:
+    ``add`` refuses an earlier time and the caller rebuilds with
+    ``from_times``.
+    """
+
+    def __init__(self) -> None:
+        self.hosts = 0
+        self._active: deque[datetime] = deque()
+        self._active_start = 0
+        # (new hosts, start, end, first time, last time) of the best closed
+        # window; on ties the earlier start wins, as in the batch scan.
+        self._closed: tuple[int, int, int, datetime, datetime] | None = None
+
+    @classmethod
+    def from_times(cls, host_times: Iterable[datetime]) -> HostWindowTracker:
+        tracker = cls()
+        for time in sorted(host_times):
+            tracker.add(time)
+        return tracker
+
+    def add(self, time: datetime) -> bool:
+        active = self._active
+        if active and time < active[-1]:
+            return False
+        if active and time - active[0] > _GROWTH_WINDOW:
+            # The windows starting at the hosts about to leave all end just
+            # before this one, so the oldest of them is the largest.
+            count = len(active)
+            if self._closed is None or count > self._closed[0]:
+                start = self._active_start
+                self._closed = (count, start, start + count, active[0], active[-1])
+            while active and time - active[0] > _GROWTH_WINDOW:
+                active.popleft()
+                self._active_start += 1
+        active.append(time)
+        self.hosts += 1
+        return True
+
+    def peak(self) -> PeakHostWindow:
+        active = self._active
+        if not active:
+            return PeakHostWindow(0, 0, 0, 0, 0)
+        count, start = len(active), self._active_start
+        end, first, last = start + count, active[0], active[-1]
+        if self._closed is not None and self._closed[0] >= count:
+            count, start, end, first, last = self._closed
+        return PeakHostWindow(self.hosts, count, start, end, _window_minutes(first, last))
+
+
+def _compute_blast_growth(
+    aggregates: AlertAggregates,
+    peak: PeakHostWindow | None = None,
+) -> BlastGrowth:
+    if peak is None:
+        peak = peak_host_window(aggregates.host_times)
+    if not peak.hosts:
+        return BlastGrowth(False, 0, 0, 0, 0)
 
-    if detected and max_new_hosts < 5:
-        start_hosts = 0
-        end_hosts = len(times)
-        growth_window = incident_window
-        max_new_hosts = len(times)
+    assert aggregates.first_time is not None and aggregates.last_time is not None
+    detected = peak.new_hosts >= 5 or peak.hosts >= 5
 
-    return BlastGrowth(detected, growth_window, start_hosts, end_hosts, max_new_hosts)
+    if detected and peak.new_hosts < 5:
+        incident_window = _window_minutes(aggregates.first_time, aggregates.last_time)
+        return BlastGrowth(detected, incident_window, 0, peak.hosts, peak.hosts)
 
+    return BlastGrowth(
+        detected,
+        peak.window_minutes,
+        peak.start_hosts,
+        peak.end_hosts,
+        peak.new_hosts,
+    )
 
-def compute_blast_radius(alerts: list[Alert]) -> BlastRadius:
-    if not alerts:
-        return BlastRadius(
-            unique_hosts=set(),
-            unique_users=set(),
-            privileged_users=set(),
-            techniques=set(),
-            blast_growth=BlastGrowth(False, 0, 0, 0, 0),
-        )
-
-    unique_hosts: set[str] = set()
-    unique_users: set[str] = set()
-    privileged_users: set[str] = set()
-    techniques: set[str] = set()
-    host_times: list[datetime] = []
-
-    for alert in alerts:
-        if alert.host:
-            if alert.host not in unique_hosts:
-                host_times.append(alert.timestamp)
-            unique_hosts.add(alert.host)
-        if alert.user:
-            unique_users.add(alert.user)
-            if alert.user.lower().startswith("admin"):
-                privileged_users.add(alert.user)
-        if alert.mitre_technique:
-            techniques.add(alert.mitre_technique)
-
-    blast_growth = _compute_blast_growth(alerts, host_times)
 
+def blast_radius_from_aggregates(
+    aggregates: AlertAggregates,
+    peak: PeakHostWindow | None = None,
+) -> BlastRadius:
+    # The sets are shared with the aggregates rather than copied, so this
+    # stays O(1) apart from the growth window when ``peak`` is supplied.
     return BlastRadius(
-        unique_hosts=unique_hosts,
-        unique_users=unique_users,
-        privileged_users=privileged_users,
-        techniques=techniques,
-        blast_growth=blast_growth,
+        unique_hosts=aggregates.hosts,
+        unique_users=aggregates.users,
+        privileged_users=aggregates.privileged_users,
+        techniques=aggregates.techniques,
+        blast_growth=_compute_blast_growth(aggregates, peak),
     )
+
+
+def compute_blast_radius(alerts: list[Alert]) -> BlastRadius:
+    return blast_radius_from_aggregates(columnar.aggregate_alerts(alerts))
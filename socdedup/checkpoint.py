@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from socdedup.batch import MICROSECOND, StringTable, epoch_micros, from_epoch_micros
+from socdedup.models import Alert, FoldedAlert, construct_alert
+
+_MAGIC = b"SDCKPT"
+_VERSION = 1
+_HEADER = struct.Struct("<6sH")
+_NONE = -1
+_ALERT = struct.Struct("<qiiiiiiI")
+_I32 = struct.Struct("<i")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+
+
+@dataclass
+class TombstoneSnapshot:
+    ordinal: int
+    incident_id: str
+    hosts: set[str]
+    users: set[str]
+    ips: set[str]
+    techniques: set[str]
+    latest: Alert
+
+
+@dataclass
+class EngineSnapshot:
+    """Everything a ``ClusterEngine`` needs to continue a stream.
+
+    Clusters keep their alerts in arrival order so aggregates and the entity
+    indexes are rebuilt on load rather than stored.
+    """
+
+    time_window: timedelta
+    min_score: int
+    retire_after: timedelta | None
+    counter: int
+    last_timestamp: datetime | None
+    retired_incidents: int = 0
+    late_alerts: int = 0
+    peak_active_clusters: int = 0
+    clusters: list[tuple[int, str, list[Alert]]] = field(default_factory=list)
+    recency: list[int] = field(default_factory=list)
+    tombstones: list[TombstoneSnapshot] = field(default_factory=list)
+
+
+def _micros(value: datetime | timedelta | None) -> int:
+    if value is None:
+        return _NONE
+    if isinstance(value, datetime):
+        return epoch_micros(value)
+    return value // MICROSECOND
+
+
+class _Encoder:
+    def __init__(self) -> None:
+        self.table = StringTable()
+        self.body = bytearray()
+
+    def u32(self, value: int) -> None:
+        self.body += _U32.pack(value)
+
+    def i64(self, value: int) -> None:
+        self.body += _I64.pack(value)
+
+    def string(self, value: str | None) -> None:
+        self.body += _I32.pack(self.table.encode(value))
+
+    def strings(self, values: set[str]) -> None:
+        self.u32(len(values))
+        for value in sorted(values):
+            self.string(value)
+
+    def alert(self, alert: Alert) -> None:
+        encode = self.table.encode
+        extra = dict(alert.model_extra or {})
+        occurrences = 0
+        if isinstance(alert, FoldedAlert):
+            occurrences = alert.occurrences
+        payload = b""
+        if alert.raw or extra:
+            payload = json.dumps([alert.raw, extra], separators=(",", ":")).encode("utf-8")
+        self.body += _ALERT.pack(
+            _micros(alert.timestamp),
+            encode(alert.source_ip),
+            encode(alert.dest_ip),
+            encode(alert.user),
+            encode(alert.host),
+            encode(alert.alert_type),
+            encode(alert.mitre_technique),
+            occurrences,
+        )
+        if occurrences:
+            self.i64(_micros(alert.last_seen))
+        self.u32(len(payload))
+        self.body += payload
+
+
+class _Decoder:
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.offset = 0
+        self.values: list[str] = []
+
+    def u32(self) -> int:
+        (value,) = _U32.unpack_from(self.data, self.offset)
+        self.offset += _U32.size
+        return value
+
+    def i64(self) -> int:
+        (value,) = _I64.unpack_from(self.data, self.offset)
+        self.offset += _I64.size
+        return value
+
+    def raw_bytes(self) -> bytes:
+        length = self.u32()
+        value = bytes(self.data[self.offset : self.offset + length])
+        self.offset += length
+        return value
+
+    def lookup(self, string_id: int) -> str | None:
+        return None if string_id == _NONE else self.values[string_id]
+
+    def string(self) -> str | None:
+        (string_id,) = _I32.unpack_from(self.data, self.offset)
+        self.offset += _I32.size
+        return self.lookup(string_id)
+
+    def strings(self) -> set[str]:
+        return {self.string() or "" for _ in range(self.u32())}
+
+    def timestamp(self) -> datetime | None:
+        micros = self.i64()
+        return None if micros == _NONE else from_epoch_micros(micros)
+
+    def alert(self) -> Alert:
+        micros, source_ip, dest_ip, user, host, alert_type, technique, occurrences = (
+            _ALERT.unpack_from(self.data, self.offset)
+        )
+        self.offset += _ALERT.size
+        last_seen = self.timestamp() if occurrences else None
+        payload = self.raw_bytes()
+        raw: dict[str, Any] = {}
+        extra: dict[str, Any] = {}
+        if payload:
+            raw, extra = json.loads(payload)
+        fields = {
+            "timestamp": from_epoch_micros(micros),
+            "source_ip": self.lookup(source_ip),
+            "dest_ip": self.lookup(dest_ip),
+            "user": self.lookup(user),
+            "host": self.lookup(host),
+            "alert_type": self.lookup(alert_type),
+            "mitre_technique": self.lookup(technique),
+            "raw": raw,
+        }
+        if occurrences:
+            return FoldedAlert.model_construct(
+                **fields, **extra, occurrences=occurrences, last_seen=last_seen
+            )
+        if extra:
+            return Alert.model_construct(**fields, **extra)
+        return construct_alert(fields)
+
+
+def write_checkpoint(path: Path, snapshot: EngineSnapshot) -> None:
+    encoder = _Encoder()
+    encoder.i64(_micros(snapshot.time_window))
+    encoder.i64(snapshot.min_score)
+    encoder.i64(_micros(snapshot.retire_after))
+    encoder.i64(snapshot.counter)
+    encoder.i64(_micros(snapshot.last_timestamp))
+    encoder.i64(snapshot.retired_incidents)
+    encoder.i64(snapshot.late_alerts)
+    encoder.i64(snapshot.peak_active_clusters)
+
+    encoder.u32(len(snapshot.clusters))
+    for ordinal, incident_id, alerts in snapshot.clusters:
+        encoder.u32(ordinal)
+        encoder.string(incident_id)
+        encoder.u32(len(alerts))
+        for alert in alerts:
+            encoder.alert(alert)
+    encoder.u32(len(snapshot.recency))
+    for ordinal in snapshot.recency:
+        encoder.u32(ordinal)
+    encoder.u32(len(snapshot.tombstones))
+    for tombstone in snapshot.tombstones:
+        encoder.u32(tombstone.ordinal)
+        encoder.string(tombstone.incident_id)
+        for values in (tombstone.hosts, tombstone.users, tombstone.ips, tombstone.techniques):
+            encoder.strings(values)
+        encoder.alert(tombstone.latest)
+
+    # The string table goes first so decoding is a single forward pass.
+    strings = bytearray(_U32.pack(len(encoder.table)))
+    for value in encoder.table.values:
+        encoded = value.encode("utf-8")
+        strings += _U32.pack(len(encoded)) + encoded
+    body = zlib.compress(bytes(strings + encoder.body), 6)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_name(path.name + ".tmp")
+    with staging.open("wb") as handle:
+        handle.write(_HEADER.pack(_MAGIC, _VERSION))
+        handle.write(body)
+    os.replace(staging, path)
+
+
+def read_checkpoint(path: Path) -> EngineSnapshot:
+    data = path.read_bytes()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"not a socdedup checkpoint: {path}")
+    magic, version = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError(f"not a socdedup checkpoint: {path}")
+    if version != _VERSION:
+        raise ValueError(f"unsupported checkpoint version {version}: {path}")
+    try:
+        decoder = _Decoder(zlib.decompress(data[_HEADER.size :]))
+    except zlib.error as exc:
+        raise ValueError(f"corrupt checkpoint: {path}") from exc
+
+    try:
+        snapshot = _decode(decoder)
+    except (struct.error, IndexError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"corrupt checkpoint: {path}") from exc
+    if decoder.offset != len(decoder.data):
+        raise ValueError(f"corrupt checkpoint: {path}")
+    return snapshot
+
+
+def _decode(decoder: _Decoder) -> EngineSnapshot:
+    decoder.values = [decoder.raw_bytes().decode("utf-8") for _ in range(decoder.u32())]
+    time_window = decoder.i64() * MICROSECOND
+    min_score = decoder.i64()
+    retire_micros = decoder.i64()
+    snapshot = EngineSnapshot(
+        time_window=time_window,
+        min_score=min_score,
+        retire_after=None if retire_micros == _NONE else retire_micros * MICROSECOND,
+        counter=decoder.i64(),
+        last_timestamp=decoder.timestamp(),
+        retired_incidents=decoder.i64(),
+        late_alerts=decoder.i64(),
+        peak_active_clusters=decoder.i64(),
+    )
+    for _ in range(decoder.u32()):
+        ordinal = decoder.u32()
+        incident_id = decoder.string()
+        alerts = [decoder.alert() for _ in range(decoder.u32())]
+        snapshot.clusters.append((ordinal, incident_id or "", alerts))
+    snapshot.recency = [decoder.u32() for _ in range(decoder.u32())]
+    for _ in range(decoder.u32()):
+        ordinal = decoder.u32()
+        incident_id = decoder.string() or ""
+        hosts, users, ips, techniques = (decoder.strings() for _ in range(4))
+        snapshot.tombstones.append(
+            TombstoneSnapshot(
+                ordinal, incident_id, hosts, users, ips, techniques, decoder.alert()
+            )
+        )
+    return snapshot
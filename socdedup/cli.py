@@ -1,14 +1,49 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import sqlite3
+from contextlib import ExitStack
 from datetime import timedelta
+from functools import partial
 from pathlib import Path
+from typing import Iterable, Iterator, TextIO
 
 import typer
 
-from socdedup.clustering import cluster_alerts
-from socdedup.ingest import ingest_csv, ingest_json
-from socdedup.models import Incident
+from socdedup.aggregates import is_privileged_user
+from socdedup.bench import run_benchmark, write_results
+from socdedup.clustering import ClusteringStats, DecisionChange, iter_incidents
+from socdedup.metrics import MetricsExporter, MetricsRegistry, PipelineMetrics, recording
+from socdedup.models import Alert, Incident, occurrences
+from socdedup.partition import PartitionPlan, cluster_partitioned
+from socdedup.profiling import Profiler, profiling, stage
+from socdedup.serve import IncidentService, run_server
+from socdedup.sharding import ShardReport, cluster_sharded
+from socdedup.sources import (
+    ALERT_SUFFIXES,
+    expand_inputs,
+    load_alerts,
+    merge_sources,
+    merge_streams,
+    read_sources,
+    source_positions,
+    stream_alerts,
+)
+from socdedup.store import (
+    AlertsMode,
+    IncidentStore,
+    IncidentWriter,
+    JsonIncidentIndex,
+    OutputFormat,
+    StaleIndexError,
+    incident_payload,
+)
+from socdedup.workload import WorkloadConfig, write_workload
+
+_STORE_SUFFIXES = {".db", ".sqlite", ".sqlite3"}
+_OUTPUT_DIR = Path("data/out")
+_LINES_SUFFIXES = {".jsonl", ".ndjson"}
 
 app = typer.Typer(add_completion=False)
 incidents_app = typer.Typer(add_completion=False)
@@ -26,16 +61,99 @@ def _parse_time_window(value: str) -> timedelta:
 
 
 def _load_alerts(path: Path):
-    if path.suffix.lower() == ".json":
-        return ingest_json(path)
-    if path.suffix.lower() == ".csv":
-        return ingest_csv(path)
-    raise typer.BadParameter("unsupported file type")
+    if path.suffix.lower() not in ALERT_SUFFIXES:
+        raise typer.BadParameter("unsupported file type")
+    try:
+        return load_alerts(path)
+    except ValueError as exc:
+        raise typer.BadParameter(f"{path}: {exc}") from exc
+
+
+def _write_change(handle: TextIO, change: DecisionChange) -> None:
+    handle.write(json.dumps(change.as_dict(), sort_keys=True) + "\n")
+    handle.flush()
+
+
+def _count_ingested(alerts: Iterable[Alert], metrics: PipelineMetrics) -> Iterator[Alert]:
+    for alert in alerts:
+        metrics.alerts_ingested.inc()
+        yield alert
+
+
+def _start_metrics(
+    stack: ExitStack, path: str | None, interval: str
+) -> PipelineMetrics | None:
+    if not path:
+        return None
+    seconds = _parse_time_window(interval).total_seconds()
+    if seconds <= 0:
+        raise typer.BadParameter("metrics interval must be positive")
+    metrics = PipelineMetrics(MetricsRegistry())
+    stack.enter_context(MetricsExporter(metrics.registry, Path(path), seconds))
+    stack.enter_context(recording(metrics))
+    return metrics
+
+
+def _track_positions(alerts: Iterable[Alert], positions: dict[int, int]) -> Iterator[Alert]:
+    for position, alert in enumerate(alerts):
+        positions[id(alert)] = position
+        yield alert
+
+
+_SUMMARY_HEADER = "incident_id alerts hosts users ips techniques confidence"
+
+
+def _alert_count(incident: Incident) -> int:
+    return sum(occurrences(alert) for alert in incident.alerts)
+
+
+def _summary_line(incident: Incident) -> str:
+    return (
+        f"{incident.incident_id} {_alert_count(incident)} {len(incident.entities.hosts)} "
+        f"{len(incident.entities.users)} {len(incident.entities.ips)} "
+        f"{len(incident.techniques)} {incident.confidence.value}"
+    )
+
+
+def _scan_incidents(path: Path) -> Iterator[dict]:
+    if path.suffix.lower() in _LINES_SUFFIXES:
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from json.loads(path.read_text(encoding="utf-8"))
+
+
+def _find_incident(path: str, incident_id: str) -> Incident:
+    input_path = Path(path)
+    if not input_path.exists():
+        raise typer.BadParameter(f"incidents file not found: {input_path}")
+    if input_path.suffix.lower() in _STORE_SUFFIXES:
+        try:
+            found = IncidentStore(input_path).get(incident_id)
+        except (ValueError, sqlite3.DatabaseError) as exc:
+            raise typer.BadParameter(str(exc)) from exc
+        if found is None:
+            raise typer.BadParameter(f"incident not found: {incident_id}")
+        return found
+    try:
+        found = JsonIncidentIndex(input_path).get(incident_id)
+    except StaleIndexError:
+        pass
+    else:
+        if found is None:
+            raise typer.BadParameter(f"incident not found: {incident_id}")
+        return found
+    for item in _scan_incidents(input_path):
+        if item.get("incident_id") == incident_id:
+            return Incident.model_validate(item)
+    raise typer.BadParameter(f"incident not found: {incident_id}")
 
 
 @app.command()
 def ingest(path: str) -> None:
-    """Ingest alerts from JSON or CSV and print a sample."""
+    """Ingest alerts from JSON, JSON Lines or CSV and print a sample."""
     input_path = Path(path)
     alerts = _load_alerts(input_path)
     typer.echo(f"alerts={len(alerts)}")
@@ -45,92 +163,362 @@ def ingest(path: str) -> None:
 
 @app.command()
 def cluster(
-    path: str,
+    paths: list[str] = typer.Argument(...),
     time_window: str = typer.Option("15m", "--time-window"),
     min_score: int = typer.Option(5, "--min-score"),
+    retire_after: str | None = typer.Option(None, "--retire-after"),
+    presorted: bool = typer.Option(False, "--presorted"),
+    workers: int = typer.Option(1, "--workers", min=1),
+    transitions: str | None = typer.Option(None, "--transitions"),
+    store: str = typer.Option("data/out/incidents.db", "--store"),
+    output_format: OutputFormat = typer.Option(OutputFormat.JSON, "--output-format"),
+    alerts_mode: AlertsMode = typer.Option(AlertsMode.FULL, "--alerts"),
+    drop_raw: bool = typer.Option(False, "--drop-raw"),
+    fold_window: str | None = typer.Option(None, "--fold-window"),
+    resume: str | None = typer.Option(None, "--resume"),
+    checkpoint: str | None = typer.Option(None, "--checkpoint"),
+    shards: int = typer.Option(1, "--shards", min=1),
+    shard_overlap: str | None = typer.Option(None, "--shard-overlap"),
+    exact: bool = typer.Option(False, "--exact"),
+    partition: bool = typer.Option(False, "--partition"),
+    profile: str | None = typer.Option(None, "--profile"),
+    metrics_file: str | None = typer.Option(None, "--metrics-file"),
+    metrics_interval: str = typer.Option("15s", "--metrics-interval"),
 ) -> None:
-    """Cluster alerts into incidents and write output."""
-    input_path = Path(path)
-    alerts = _load_alerts(input_path)
+    """Cluster alerts into incidents and write output.
+
+    Several inputs are merged by timestamp; files already in order are not
+    sorted again.
+    """
+    # Directories and patterns skip the files this command writes, so a
+    # rerun over a data directory does not read its earlier output.
+    outputs = [_OUTPUT_DIR, Path(store)]
+    outputs.extend(Path(path) for path in (transitions, checkpoint, profile, metrics_file) if path)
+    try:
+        input_paths = expand_inputs(paths, exclude=outputs)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc)) from exc
+    merged = len(input_paths) > 1
+    profiler = Profiler() if profile else None
+    # Alert ids are zero-based positions in the input, in file order, with
+    # several files counted through them in argument order.
+    positions: dict[int, int] = {}
+    tracked = positions if alerts_mode == AlertsMode.IDS else None
+    if presorted:
+        if merged:
+            alerts = merge_streams(input_paths, tracked)
+        else:
+            alerts = stream_alerts(input_paths[0])
+        if profiler is not None:
+            alerts = profiler.timed("ingest", alerts)
+    elif merged:
+        with stage(profiler, "ingest") as timing:
+            try:
+                sources = read_sources(input_paths)
+            except ValueError as exc:
+                raise typer.BadParameter(str(exc)) from exc
+        if timing is not None:
+            timing.items = sum(len(source.alerts) for source in sources)
+        if tracked is not None:
+            source_positions(sources, tracked)
+        alerts = merge_sources(sources)
+    else:
+        with stage(profiler, "ingest") as timing:
+            alerts = _load_alerts(input_paths[0])
+        if timing is not None:
+            timing.items = len(alerts)
+    if tracked is not None and not merged:
+        alerts = _track_positions(alerts, tracked)
     window = _parse_time_window(time_window)
-    incidents = cluster_alerts(alerts, window, min_score)
-
-    output_path = Path("data/out/incidents.json")
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    payload = [incident.model_dump(mode="json") for incident in incidents]
-    with output_path.open("w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2, sort_keys=True)
-
-    typer.echo("incident_id alerts hosts users ips techniques confidence")
-    for incident in incidents:
-        hosts = len(incident.entities.hosts)
-        users = len(incident.entities.users)
-        ips = len(incident.entities.ips)
-        techniques = len(incident.techniques)
+    horizon = _parse_time_window(retire_after) if retire_after else None
+    fold = _parse_time_window(fold_window) if fold_window else None
+    if fold and alerts_mode == AlertsMode.IDS:
+        # Representatives stand for alerts the positions were recorded on.
+        raise typer.BadParameter("--alerts ids cannot be combined with --fold-window")
+    if resume and alerts_mode == AlertsMode.IDS:
+        # Restored alerts come from an earlier run's input.
+        raise typer.BadParameter("--alerts ids cannot be combined with --resume")
+    if resume and not Path(resume).exists():
+        raise typer.BadParameter(f"checkpoint not found: {resume}")
+    if shards > 1 and (transitions or fold or resume or checkpoint):
+        raise typer.BadParameter(
+            "--shards cannot be combined with --transitions, --fold-window or checkpoints"
+        )
+    if partition and (shards > 1 or transitions or fold or resume or checkpoint):
+        raise typer.BadParameter(
+            "--partition cannot be combined with --shards, --transitions, --fold-window "
+            "or checkpoints"
+        )
+    stats = ClusteringStats()
+    report: ShardReport | None = None
+    plan: PartitionPlan | None = None
+    with ExitStack() as stack:
+        stack.enter_context(profiling(profiler))
+        metrics = _start_metrics(stack, metrics_file, metrics_interval)
+        if metrics is not None:
+            if isinstance(alerts, list):
+                metrics.alerts_ingested.inc(len(alerts))
+            else:
+                alerts = _count_ingested(alerts, metrics)
+        on_change = None
+        if transitions:
+            transitions_path = Path(transitions)
+            transitions_path.parent.mkdir(parents=True, exist_ok=True)
+            handle = stack.enter_context(transitions_path.open("w", encoding="utf-8"))
+            on_change = partial(_write_change, handle)
+        # Incidents are written as they are emitted, so with --retire-after
+        # memory follows the active clusters rather than the whole run.
+        output_path = _OUTPUT_DIR / f"incidents.{output_format.value}"
+        incidents_file = stack.enter_context(IncidentWriter(output_path, output_format))
+        store_writer = stack.enter_context(IncidentStore(Path(store)).writer())
+        written = 0
+        try:
+            incidents: Iterable[Incident]
+            if shards > 1:
+                with stage(profiler, "cluster"):
+                    incidents, report = cluster_sharded(
+                        alerts,
+                        window,
+                        min_score,
+                        shards,
+                        retire_after=horizon,
+                        overlap=_parse_time_window(shard_overlap) if shard_overlap else None,
+                        exact=exact,
+                        workers=workers,
+                        stats=stats,
+                    )
+            elif partition:
+                with stage(profiler, "cluster"):
+                    incidents, plan = cluster_partitioned(
+                        alerts, window, min_score, horizon, stats, workers=workers
+                    )
+            else:
+                incidents = iter_incidents(
+                    alerts,
+                    window,
+                    min_score,
+                    retire_after=horizon,
+                    stats=stats,
+                    presorted=presorted or merged,
+                    workers=workers,
+                    on_change=on_change,
+                    fold_window=fold,
+                    resume_from=Path(resume) if resume else None,
+                    checkpoint_to=Path(checkpoint) if checkpoint else None,
+                )
+            if profiler is not None:
+                incidents = profiler.timed("cluster", incidents, size=_alert_count)
+            if tracked is not None and presorted and merged:
+                # Positions in one file depend on how many alerts the files
+                # before it hold, known once all of them have been read.
+                incidents = list(incidents)
+            for incident in incidents:
+                with stage(profiler, "payload", 1):
+                    payload = incident_payload(
+                        incident, alerts_mode, drop_raw=drop_raw, positions=positions
+                    )
+                if tracked is not None:
+                    for alert in incident.alerts:
+                        del tracked[id(alert)]
+                with stage(profiler, "write_incidents", 1):
+                    incidents_file.add(payload)
+                with stage(profiler, "write_store", 1):
+                    store_writer.add(payload)
+                if not written:
+                    typer.echo(_SUMMARY_HEADER)
+                written += 1
+                typer.echo(_summary_line(incident))
+        except ValueError as exc:
+            raise typer.BadParameter(str(exc)) from exc
+
+    if not written:
+        typer.echo(_SUMMARY_HEADER)
+    if horizon is not None:
+        typer.echo(
+            f"retired={stats.retired_incidents} late_alerts={stats.late_alerts} "
+            f"peak_active={stats.peak_active_clusters}"
+        )
+    if report is not None:
+        for line in report.lines():
+            typer.echo(line)
+    if plan is not None:
+        typer.echo(plan.describe())
+    if profiler is not None:
+        profiler.count("incidents", written)
+        profiler.count("bytes_written.incidents", output_path.stat().st_size)
+        profiler.count("bytes_written.store", Path(store).stat().st_size)
+        profiler.write(Path(profile))
+        typer.echo(f"profile={profile}")
+
+
+def _workload_config(
+    alerts: int,
+    seed: int,
+    hosts: int,
+    users: int,
+    ips: int,
+    duration: str,
+    noise: float,
+    sprays: int,
+    lateral: int,
+    blast_growth: int,
+) -> WorkloadConfig:
+    return WorkloadConfig(
+        alerts=alerts,
+        seed=seed,
+        hosts=hosts,
+        users=users,
+        ips=ips,
+        duration=_parse_time_window(duration),
+        noise=noise,
+        sprays=sprays,
+        lateral=lateral,
+        blast_growth=blast_growth,
+    )
+
+
+@app.command()
+def generate(
+    path: str,
+    alerts: int = typer.Option(10_000, "--alerts", min=1),
+    seed: int = typer.Option(0, "--seed"),
+    hosts: int = typer.Option(500, "--hosts", min=1),
+    users: int = typer.Option(200, "--users", min=1),
+    ips: int = typer.Option(300, "--ips", min=1),
+    duration: str = typer.Option("24h", "--duration"),
+    noise: float = typer.Option(0.95, "--noise", min=0.0, max=1.0),
+    sprays: int = typer.Option(5, "--sprays", min=0),
+    lateral: int = typer.Option(5, "--lateral", min=0),
+    blast_growth: int = typer.Option(5, "--blast-growth", min=0),
+) -> None:
+    """Write a seeded synthetic alert workload as JSON Lines."""
+    config = _workload_config(
+        alerts, seed, hosts, users, ips, duration, noise, sprays, lateral, blast_growth
+    )
+    written = write_workload(Path(path), config)
+    typer.echo(f"alerts={written} path={path}")
+
+
+@app.command()
+def bench(
+    alerts: int = typer.Option(10_000, "--alerts", min=1),
+    seed: int = typer.Option(0, "--seed"),
+    hosts: int = typer.Option(500, "--hosts", min=1),
+    users: int = typer.Option(200, "--users", min=1),
+    ips: int = typer.Option(300, "--ips", min=1),
+    duration: str = typer.Option("24h", "--duration"),
+    noise: float = typer.Option(0.95, "--noise", min=0.0, max=1.0),
+    sprays: int = typer.Option(5, "--sprays", min=0),
+    lateral: int = typer.Option(5, "--lateral", min=0),
+    blast_growth: int = typer.Option(5, "--blast-growth", min=0),
+    time_window: str = typer.Option("15m", "--time-window"),
+    min_score: int = typer.Option(5, "--min-score"),
+    retire_after: str | None = typer.Option(None, "--retire-after"),
+    workers: int = typer.Option(1, "--workers", min=1),
+    output: str = typer.Option("data/out/bench.json", "--output"),
+) -> None:
+    """Benchmark each pipeline stage on a synthetic workload."""
+    config = _workload_config(
+        alerts, seed, hosts, users, ips, duration, noise, sprays, lateral, blast_growth
+    )
+    result = run_benchmark(
+        config,
+        _parse_time_window(time_window),
+        min_score,
+        _parse_time_window(retire_after) if retire_after else None,
+        workers,
+    )
+    write_results(Path(output), result)
+
+    typer.echo("stage seconds items per_second peak_rss_mb")
+    for stage in result.stages:
+        rss = "-" if stage.peak_rss_mb is None else f"{stage.peak_rss_mb:.1f}"
         typer.echo(
-            f"{incident.incident_id} {len(incident.alerts)} {hosts} {users} {ips} "
-            f"{techniques} {incident.confidence.value}"
+            f"{stage.name} {stage.seconds:.3f} {stage.items} {stage.per_second:.0f} {rss}"
         )
+    typer.echo(f"incidents={result.incidents} alerts_per_second={result.alerts_per_second:.0f}")
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8787, "--port"),
+    unix_socket: str | None = typer.Option(None, "--unix-socket"),
+    time_window: str = typer.Option("15m", "--time-window"),
+    min_score: int = typer.Option(5, "--min-score"),
+    retire_after: str | None = typer.Option(None, "--retire-after"),
+    track_decisions: bool = typer.Option(False, "--track-decisions"),
+    closed_path: str = typer.Option("data/out/closed_incidents.jsonl", "--closed-path"),
+    metrics_file: str | None = typer.Option(None, "--metrics-file"),
+    metrics_interval: str = typer.Option("15s", "--metrics-interval"),
+) -> None:
+    """Run the alert intake daemon over HTTP or a Unix socket."""
+    window = _parse_time_window(time_window)
+    horizon = _parse_time_window(retire_after) if retire_after else None
+    with ExitStack() as stack:
+        _start_metrics(stack, metrics_file, metrics_interval)
+        closed_output = None
+        if horizon is not None:
+            output_path = Path(closed_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            closed_output = stack.enter_context(output_path.open("a", encoding="utf-8"))
+        service = IncidentService(
+            window,
+            min_score,
+            retire_after=horizon,
+            track_decisions=track_decisions,
+            closed_output=closed_output,
+        )
+        endpoint = unix_socket or f"http://{host}:{port}"
+        typer.echo(f"serving on {endpoint}")
+        try:
+            asyncio.run(run_server(service, host=host, port=port, unix_socket=unix_socket))
+        except KeyboardInterrupt:
+            pass
+        except ValueError as exc:
+            raise typer.BadParameter(str(exc)) from exc
 
 
 @incidents_app.command("show")
 def incidents_show(
     incident_id: str,
     explain: bool = typer.Option(False, "--explain"),
-    path: str = typer.Option("data/out/incidents.json", "--path"),
+    path: str = typer.Option("data/out/incidents.db", "--path"),
 ) -> None:
     """Show a single incident by ID."""
-    input_path = Path(path)
-    if not input_path.exists():
-        raise typer.BadParameter(f"incidents file not found: {input_path}")
-    payload = json.loads(input_path.read_text(encoding="utf-8"))
-    incidents = [Incident.model_validate(item) for item in payload]
-    for incident in incidents:
-        if incident.incident_id == incident_id:
-            typer.echo(f"Incident: {incident.incident_id}")
-            typer.echo(f"Confidence: {incident.confidence.value}")
-            if explain:
-                typer.echo("Reasoning:")
-                for line in incident.reasoning:
-                    typer.echo(f"- {line}")
-                privileged_users = {
-                    alert.user
-                    for alert in incident.alerts
-                    if alert.user and alert.user.lower().startswith("admin")
-                }
-                typer.echo(
-                    f"Blast radius: hosts={len(incident.entities.hosts)} "
-                    f"users={len(incident.entities.users)} "
-                    f"privileged_users={len(privileged_users)}"
-                )
-            return
-    raise typer.BadParameter(f"incident not found: {incident_id}")
+    incident = _find_incident(path, incident_id)
+    typer.echo(f"Incident: {incident.incident_id}")
+    typer.echo(f"Confidence: {incident.confidence.value}")
+    if explain:
+        typer.echo("Reasoning:")
+        for line in incident.reasoning:
+            typer.echo(f"- {line}")
+        # Users come from the entities so compact output modes without
+        # embedded alerts explain the same way.
+        privileged_users = {user for user in incident.entities.users if is_privileged_user(user)}
+        typer.echo(
+            f"Blast radius: hosts={len(incident.entities.hosts)} "
+            f"users={len(incident.entities.users)} "
+            f"privileged_users={len(privileged_users)}"
+        )
 
 
 @incidents_app.command("replay")
 def incidents_replay(
     incident_id: str,
-    path: str = typer.Option("data/out/incidents.json", "--path"),
+    path: str = typer.Option("data/out/incidents.db", "--path"),
 ) -> None:
     """Show decision replay for a single incident by ID."""
-    input_path = Path(path)
-    if not input_path.exists():
-        raise typer.BadParameter(f"incidents file not found: {input_path}")
-    payload = json.loads(input_path.read_text(encoding="utf-8"))
-    incidents = [Incident.model_validate(item) for item in payload]
-    for incident in incidents:
-        if incident.incident_id == incident_id:
-            if incident.decision_replay is None:
-                raise typer.BadParameter(f"decision replay not found: {incident_id}")
-            replay = incident.decision_replay
-            typer.echo(f"Action: {replay.action}")
-            typer.echo(f"Urgency: {replay.urgency}")
-            typer.echo("Justification:")
-            for line in replay.justification:
-                typer.echo(f"- {line}")
-            typer.echo(f"Human-in-the-loop: {replay.human_in_the_loop}")
-            return
-    raise typer.BadParameter(f"incident not found: {incident_id}")
+    incident = _find_incident(path, incident_id)
+    if incident.decision_replay is None:
+        raise typer.BadParameter(f"decision replay not found: {incident_id}")
+    replay = incident.decision_replay
+    typer.echo(f"Action: {replay.action}")
+    typer.echo(f"Urgency: {replay.urgency}")
+    typer.echo("Justification:")
+    for line in replay.justification:
+        typer.echo(f"- {line}")
+    typer.echo(f"Human-in-the-loop: {replay.human_in_the_loop}")
 
 
 app.add_typer(incidents_app, name="incidents")
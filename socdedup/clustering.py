@@ -1,38 +1,247 @@
 from __future__ import annotations
 
+import heapq
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from datetime import timedelta
-from typing import Iterable
+from functools import lru_cache
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Iterable, Iterator
 
-from socdedup.blast_radius import compute_blast_radius
+from socdedup import scoring
+from socdedup.batch import AlertBatch
+from socdedup.checkpoint import (
+    EngineSnapshot,
+    TombstoneSnapshot,
+    read_checkpoint,
+    write_checkpoint,
+)
+from socdedup.aggregates import AlertAggregates
+from socdedup.blast_radius import (
+    BlastGrowth,
+    BlastRadius,
+    HostWindowTracker,
+    PeakHostWindow,
+    blast_radius_from_aggregates,
+)
 from socdedup.confidence import assess_confidence
-from socdedup.decision import assess_decision
-from socdedup.models import Alert, EntitiesSummary, Incident
-from socdedup.reasoning import derive_signals
+from socdedup.decision import ResponseAction, assess_decision
+from socdedup.folding import fold_alerts
+from socdedup.models import (
+    Alert,
+    Confidence,
+    DecisionReplay,
+    EntitiesSummary,
+    Incident,
+    last_seen,
+)
+from socdedup.metrics import current_metrics
+from socdedup.profiling import current_profiler
+from socdedup.reasoning import ReasoningSignals, signals_from_aggregates
 
 
 @dataclass
 class ClusterState:
     incident_id: str
     alerts: list[Alert] = field(default_factory=list)
-    hosts: set[str] = field(default_factory=set)
-    users: set[str] = field(default_factory=set)
-    ips: set[str] = field(default_factory=set)
-    techniques: set[str] = field(default_factory=set)
+    aggregates: AlertAggregates = field(default_factory=AlertAggregates)
     latest_time: Alert | None = None
+    host_window: HostWindowTracker | None = None
+    blast_growth: BlastGrowth | None = None
+    signals: ReasoningSignals | None = None
+    assessment: tuple[Confidence, list[str], DecisionReplay] | None = None
+    # last_seen(latest_time), kept next to it for the scoring loops.
+    latest_seen: datetime | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.latest_time is not None:
+            self.latest_seen = last_seen(self.latest_time)
+
+    @property
+    def hosts(self) -> set[str]:
+        return self.aggregates.hosts
+
+    @property
+    def users(self) -> set[str]:
+        return self.aggregates.users
+
+    @property
+    def ips(self) -> set[str]:
+        return self.aggregates.ips
+
+    @property
+    def techniques(self) -> set[str]:
+        return self.aggregates.techniques
 
     def add_alert(self, alert: Alert) -> None:
         self.alerts.append(alert)
-        if alert.host:
-            self.hosts.add(alert.host)
-        if alert.user:
-            self.users.add(alert.user)
-        if alert.source_ip:
-            self.ips.add(alert.source_ip)
-        if alert.mitre_technique:
-            self.techniques.add(alert.mitre_technique)
-        if self.latest_time is None or alert.timestamp > self.latest_time.timestamp:
+        self.aggregates.add(alert)
+        # A folded alert was last seen at its last copy, not its first.
+        seen = last_seen(alert)
+        if self.latest_seen is None or seen > self.latest_seen:
             self.latest_time = alert
+            self.latest_seen = seen
+
+    def reassess(self) -> None:
+        # The peak new-host window only moves when a host is first seen,
+        # and then in amortized O(1); everything else is O(1) on the
+        # aggregates.
+        aggregates = self.aggregates
+        host_times = aggregates.host_times
+        window = self.host_window
+        if window is None:
+            window = self.host_window = HostWindowTracker()
+        for position in range(window.hosts, len(host_times)):
+            if not window.add(host_times[position]):
+                # A host first seen out of timestamp order: start over sorted.
+                window = self.host_window = HostWindowTracker.from_times(host_times)
+                break
+        blast, signals, assessment = _evaluate(aggregates, window.peak())
+        self.blast_growth = blast.blast_growth
+        self.signals = signals
+        self.assessment = assessment
+
+
+@dataclass(frozen=True)
+class DecisionChange:
+    incident_id: str
+    timestamp: datetime
+    alerts: int
+    previous_confidence: Confidence | None
+    confidence: Confidence
+    previous_action: str | None
+    action: str
+    urgency: str
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "incident_id": self.incident_id,
+            "timestamp": self.timestamp.isoformat(),
+            "alerts": self.alerts,
+            "previous_confidence": self.previous_confidence.value
+            if self.previous_confidence
+            else None,
+            "confidence": self.confidence.value,
+            "previous_action": self.previous_action,
+            "action": self.action,
+            "urgency": self.urgency,
+        }
+
+
+_ENTITY_WEIGHTS: tuple[tuple[str, int], ...] = (
+    ("host", 2),
+    ("user", 2),
+    ("source_ip", 1),
+    ("mitre_technique", 3),
+)
+_TIME_BONUS = 1
+
+
+def _cluster_entities(cluster: ClusterState) -> tuple[tuple[str, set[str]], ...]:
+    return (
+        ("host", cluster.hosts),
+        ("user", cluster.users),
+        ("source_ip", cluster.ips),
+        ("mitre_technique", cluster.techniques),
+    )
+
+
+class EntityIndex:
+    def __init__(self) -> None:
+        self._postings: dict[str, dict[str, set[int]]] = {
+            field_name: {} for field_name, _ in _ENTITY_WEIGHTS
+        }
+        self._fields = [
+            (field_name, weight, self._postings[field_name]) for field_name, weight in _ENTITY_WEIGHTS
+        ]
+
+    def add(self, ordinal: int, alert: Alert) -> None:
+        for field_name, _, postings in self._fields:
+            value = getattr(alert, field_name)
+            if value:
+                owners = postings.get(value)
+                if owners is None:
+                    postings[value] = {ordinal}
+                else:
+                    owners.add(ordinal)
+
+    def add_cluster(self, ordinal: int, cluster: ClusterState) -> None:
+        for field_name, values in _cluster_entities(cluster):
+            postings = self._postings[field_name]
+            for value in values:
+                postings.setdefault(value, set()).add(ordinal)
+
+    def remove(self, ordinal: int, cluster: ClusterState) -> None:
+        for field_name, values in _cluster_entities(cluster):
+            postings = self._postings[field_name]
+            for value in values:
+                owners = postings.get(value)
+                if owners is None:
+                    continue
+                owners.discard(ordinal)
+                if not owners:
+                    del postings[value]
+
+    def postings(self, alert: Alert) -> list[tuple[int, set[int]]]:
+        """The weight and owning ordinals of each entity the alert carries."""
+        postings: list[tuple[int, set[int]]] = []
+        for field_name, weight, owned in self._fields:
+            value = getattr(alert, field_name)
+            if value:
+                owners = owned.get(value)
+                if owners:
+                    postings.append((weight, owners))
+        return postings
+
+    def candidates(self, alert: Alert, min_entity_score: int) -> dict[int, int]:
+        postings = self.postings(alert)
+        return _entity_scores(postings, _matching(postings, min_entity_score))
+
+
+def _matching(postings: list[tuple[int, set[int]]], min_entity_score: int) -> set[int]:
+    # Only clusters sharing a set of entities heavy enough to reach the
+    # threshold can qualify, so intersect those posting lists (in C; each
+    # intersection walks the smaller side).
+    matched: set[int] = set()
+    if not postings:
+        return matched
+    for positions in _qualifying_sets(tuple([weight for weight, _ in postings]), min_entity_score):
+        owners = postings[positions[0]][1]
+        for position in positions[1:]:
+            owners = owners & postings[position][1]
+        matched |= owners
+    return matched
+
+
+def _entity_scores(postings: list[tuple[int, set[int]]], matched: set[int]) -> dict[int, int]:
+    scores = dict.fromkeys(matched, 0)
+    if scores:
+        for weight, owners in postings:
+            for ordinal in owners & matched:
+                scores[ordinal] += weight
+    return scores
+
+
+@lru_cache(maxsize=None)
+def _qualifying_sets(
+    weights: tuple[int, ...], min_entity_score: int
+) -> tuple[tuple[int, ...], ...]:
+    # Minimal sets of posting positions whose weights reach the threshold;
+    # every qualifying cluster appears in all lists of at least one of them.
+    reaching = [
+        frozenset(position for position in range(len(weights)) if mask >> position & 1)
+        for mask in range(1, 1 << len(weights))
+        if sum(weight for position, weight in enumerate(weights) if mask >> position & 1)
+        >= min_entity_score
+    ]
+    return tuple(
+        tuple(sorted(positions))
+        for positions in reaching
+        if not any(other < positions for other in reaching)
+    )
 
 
 def _score_alert(alert: Alert, cluster: ClusterState, time_window: timedelta) -> int:
@@ -45,61 +254,598 @@ def _score_alert(alert: Alert, cluster: ClusterState, time_window: timedelta) ->
         score += 1
     if alert.mitre_technique and alert.mitre_technique in cluster.techniques:
         score += 3
-    if cluster.latest_time is not None:
-        delta = abs(alert.timestamp - cluster.latest_time.timestamp)
+    if cluster.latest_seen is not None:
+        delta = abs(alert.timestamp - cluster.latest_seen)
         if delta <= time_window:
             score += 1
     return score
 
 
-def cluster_alerts(
-    alerts: Iterable[Alert],
+def _best_cluster_exhaustive(
+    alert: Alert,
+    clusters: dict[int, ClusterState],
+    time_window: timedelta,
+) -> tuple[int, int | None]:
+    best_score = -1
+    best_ordinal: int | None = None
+    for ordinal, cluster in clusters.items():
+        score = _score_alert(alert, cluster, time_window)
+        if score > best_score:
+            best_score = score
+            best_ordinal = ordinal
+    return best_score, best_ordinal
+
+
+def _best_cluster_indexed(
+    alert: Alert,
+    clusters: dict[int, ClusterState],
+    index: EntityIndex,
     time_window: timedelta,
     min_score: int,
-) -> list[Incident]:
-    sorted_alerts = sorted(alerts, key=lambda a: a.timestamp)
-    clusters: list[ClusterState] = []
-    counter = 1
+) -> tuple[int, int | None]:
+    return _best_of_candidates(
+        alert, clusters, index.candidates(alert, min_score - _TIME_BONUS), time_window
+    )
 
-    for alert in sorted_alerts:
-        best_score = -1
-        best_cluster: ClusterState | None = None
-        for cluster in clusters:
-            score = _score_alert(alert, cluster, time_window)
-            if score > best_score:
-                best_score = score
-                best_cluster = cluster
-
-        if best_cluster is not None and best_score >= min_score:
-            best_cluster.add_alert(alert)
-            continue
-
-        incident_id = f"INC-{counter:04d}"
-        counter += 1
-        new_cluster = ClusterState(incident_id=incident_id)
-        new_cluster.add_alert(alert)
-        clusters.append(new_cluster)
-
-    incidents: list[Incident] = []
-    for cluster in clusters:
-        blast = compute_blast_radius(cluster.alerts)
-        signals = derive_signals(cluster.alerts, blast)
+
+def _best_of_candidates(
+    alert: Alert,
+    clusters: dict[int, ClusterState],
+    candidates: dict[int, int],
+    time_window: timedelta,
+) -> tuple[int, int | None]:
+    best_score = -1
+    best_ordinal: int | None = None
+    timestamp = alert.timestamp
+    # Ties go to the earliest created cluster, exactly as in the exhaustive
+    # scan that visits clusters in creation order.
+    for ordinal, entity_score in candidates.items():
+        latest = clusters[ordinal].latest_seen
+        score = entity_score
+        if latest is not None and abs(timestamp - latest) <= time_window:
+            score += _TIME_BONUS
+        if score > best_score or (
+            score == best_score and best_ordinal is not None and ordinal < best_ordinal
+        ):
+            best_score = score
+            best_ordinal = ordinal
+    return best_score, best_ordinal
+
+
+@dataclass
+class ClusteringStats:
+    retired_incidents: int = 0
+    late_alerts: int = 0
+    peak_active_clusters: int = 0
+
+
+class ClusterEngine:
+    """Greedy incremental clustering over a timestamp-ordered alert stream.
+
+    With ``retire_after`` set, clusters whose latest alert falls that far
+    behind the stream are handed back from ``add_alert`` for finalization
+    and dropped. Their entity sets are kept for one more horizon so that
+    alerts which would still have joined them are counted in
+    ``stats.late_alerts``.
+
+    With ``on_change`` set, the touched cluster is reassessed after every
+    alert and a ``DecisionChange`` is passed to the callback whenever its
+    confidence or recommended action moves. New incidents only report
+    when they open above LOW / MONITOR.
+    """
+
+    def __init__(
+        self,
+        time_window: timedelta,
+        min_score: int,
+        retire_after: timedelta | None = None,
+        stats: ClusteringStats | None = None,
+        on_change: Callable[[DecisionChange], None] | None = None,
+    ) -> None:
+        self.time_window = time_window
+        self.min_score = min_score
+        self.retire_after = retire_after
+        self.on_change = on_change
+        self.stats = stats if stats is not None else ClusteringStats()
+        self.clusters: dict[int, ClusterState] = {}
+        self.index = EntityIndex()
+        self.counter = 1
+        # A cluster sharing no entity with the alert scores at most the time
+        # bonus, so below that threshold every cluster has to be considered.
+        self._exhaustive = min_score <= _TIME_BONUS
+        # Clusters by latest time, then by when they were last touched. A
+        # folded alert can move a cluster's latest time past later alerts,
+        # so this is a heap; entries superseded by a later touch are
+        # skipped when they surface.
+        self._recency: list[tuple[datetime, int, int]] = []
+        self._touched: dict[int, int] = {}
+        self._touches = 0
+        self._retired: dict[int, ClusterState] = {}
+        self._retired_index = EntityIndex()
+        self.last_timestamp: datetime | None = None
+        self.profiler = current_profiler()
+        self.metrics = current_metrics()
+        self._scorer: scoring.ArrayScorer | None = None
+
+    def _best(
+        self,
+        alert: Alert,
+        clusters: dict[int, ClusterState],
+        index: EntityIndex,
+        scorer: scoring.ArrayScorer | None = None,
+    ) -> tuple[int, int | None]:
+        profiler = self.profiler
+        if self._exhaustive:
+            if profiler is not None:
+                profiler.observe("clusters_scored", len(clusters))
+            if scorer is not None and len(clusters) >= scoring.BATCH_MIN_CANDIDATES:
+                return scorer.best(alert.timestamp, index.postings(alert), None)
+            return _best_cluster_exhaustive(alert, clusters, self.time_window)
+        if profiler is None and scorer is None:
+            return _best_cluster_indexed(alert, clusters, index, self.time_window, self.min_score)
+        min_entity_score = self.min_score - _TIME_BONUS
+        postings = index.postings(alert)
+        matched = _matching(postings, min_entity_score)
+        if profiler is not None:
+            # The postings an alert touches bound the work before
+            # intersection; the survivors are the clusters actually scored.
+            profiler.observe("candidate_postings", sum(len(owners) for _, owners in postings))
+            profiler.observe("clusters_scored", len(matched))
+        if scorer is not None and len(matched) >= scoring.BATCH_MIN_CANDIDATES:
+            return scorer.best(alert.timestamp, postings, min_entity_score)
+        return _best_of_candidates(
+            alert, clusters, _entity_scores(postings, matched), self.time_window
+        )
+
+    def _active_scorer(self) -> scoring.ArrayScorer | None:
+        # With NumPy, once many clusters are active, large candidate sets
+        # are scored in one vectorized pass. The scorer is built on first
+        # need and kept in step with the active clusters after that.
+        if self._scorer is None:
+            if scoring.np is None or len(self.clusters) < scoring.BATCH_MIN_CANDIDATES:
+                return None
+            self._scorer = scoring.ArrayScorer(self.time_window)
+            for ordinal, cluster in self.clusters.items():
+                assert cluster.latest_seen is not None
+                self._scorer.add(ordinal, cluster.latest_seen)
+        return self._scorer
+
+    def add_alert(self, alert: Alert) -> list[ClusterState]:
+        metrics = self.metrics
+        if metrics is None:
+            return self._add_alert(alert)
+        started = perf_counter()
+        retired = self._add_alert(alert)
+        metrics.cluster_latency.observe(perf_counter() - started)
+        metrics.active_clusters.set(len(self.clusters))
+        return retired
+
+    def _add_alert(self, alert: Alert) -> list[ClusterState]:
+        self.last_timestamp = alert.timestamp
+        if self.profiler is not None:
+            self.profiler.count("alerts_clustered")
+        retired = self._retire(alert.timestamp) if self.retire_after is not None else []
+
+        best_score, best_ordinal = self._best(
+            alert, self.clusters, self.index, self._active_scorer()
+        )
+        if self._retired:
+            late_score, late_ordinal = self._best(alert, self._retired, self._retired_index)
+            if late_ordinal is not None and late_score >= self.min_score and (
+                best_ordinal is None
+                or late_score > best_score
+                or (late_score == best_score and late_ordinal < best_ordinal)
+            ):
+                self.stats.late_alerts += 1
+
+        if best_ordinal is not None and best_score >= self.min_score:
+            ordinal = best_ordinal
+            cluster = self.clusters[ordinal]
+            cluster.add_alert(alert)
+            if self._scorer is not None:
+                assert cluster.latest_seen is not None
+                self._scorer.update(ordinal, cluster.latest_seen)
+        else:
+            ordinal = self.counter - 1
+            cluster = ClusterState(incident_id=f"INC-{self.counter:04d}")
+            self.counter += 1
+            cluster.add_alert(alert)
+            self.clusters[ordinal] = cluster
+            if self._scorer is not None:
+                self._scorer.add(ordinal, last_seen(alert))
+            if self.profiler is not None:
+                self.profiler.count("clusters_created")
+            if self.metrics is not None:
+                self.metrics.incidents_created.inc()
+            if len(self.clusters) > self.stats.peak_active_clusters:
+                self.stats.peak_active_clusters = len(self.clusters)
+        self.index.add(ordinal, alert)
+        if self.on_change is not None:
+            self._reassess(cluster, alert)
+        if self.retire_after is not None:
+            self._touch(ordinal, cluster)
+        return retired
+
+    def _touch(self, ordinal: int, cluster: ClusterState) -> None:
+        assert cluster.latest_seen is not None
+        self._touches += 1
+        self._touched[ordinal] = self._touches
+        heapq.heappush(self._recency, (cluster.latest_seen, self._touches, ordinal))
+
+    def advance(self, now: datetime) -> list[ClusterState]:
+        """Retire clusters and forget tombstones as an alert at ``now`` would,
+        for a stream that only holds part of the alerts."""
+        return self._retire(now) if self.retire_after is not None else []
+
+    def _reassess(self, cluster: ClusterState, alert: Alert) -> None:
+        assert self.on_change is not None
+        previous = cluster.assessment
+        cluster.reassess()
+        assert cluster.assessment is not None
+        confidence, _, decision_replay = cluster.assessment
+        if previous is None:
+            if confidence == Confidence.LOW and decision_replay.action == ResponseAction.MONITOR:
+                return
+            previous_confidence, previous_action = None, None
+        else:
+            previous_confidence, previous_action = previous[0], previous[2].action
+            if self.metrics is not None and confidence != previous_confidence:
+                self.metrics.confidence_transitions.inc(
+                    **{"from": previous_confidence.value, "to": confidence.value}
+                )
+            if confidence == previous_confidence and decision_replay.action == previous_action:
+                return
+        self.on_change(
+            DecisionChange(
+                incident_id=cluster.incident_id,
+                timestamp=alert.timestamp,
+                alerts=cluster.aggregates.count,
+                previous_confidence=previous_confidence,
+                confidence=confidence,
+                previous_action=previous_action,
+                action=decision_replay.action,
+                urgency=decision_replay.urgency,
+            )
+        )
+
+    def _retire(self, now: datetime) -> list[ClusterState]:
+        assert self.retire_after is not None
+        cutoff = now - self.retire_after
+        forget_cutoff = cutoff - self.retire_after
+        while self._retired:
+            ordinal, tombstone = next(iter(self._retired.items()))
+            if tombstone.latest_seen is None or tombstone.latest_seen >= forget_cutoff:
+                break
+            del self._retired[ordinal]
+            self._retired_index.remove(ordinal, tombstone)
+
+        retired: list[ClusterState] = []
+        while self._recency:
+            latest, touch, ordinal = self._recency[0]
+            if latest >= cutoff:
+                break
+            heapq.heappop(self._recency)
+            if self._touched.get(ordinal) != touch:
+                continue
+            cluster = self.clusters[ordinal]
+            del self._touched[ordinal]
+            del self.clusters[ordinal]
+            self.index.remove(ordinal, cluster)
+            if self._scorer is not None:
+                self._scorer.remove(ordinal)
+            tombstone = ClusterState(
+                incident_id=cluster.incident_id,
+                aggregates=AlertAggregates(
+                    hosts=cluster.hosts,
+                    users=cluster.users,
+                    ips=cluster.ips,
+                    techniques=cluster.techniques,
+                ),
+                latest_time=cluster.latest_time,
+            )
+            self._retired[ordinal] = tombstone
+            self._retired_index.add_cluster(ordinal, tombstone)
+            retired.append(cluster)
+        self.stats.retired_incidents += len(retired)
+        return retired
+
+    def snapshot(self) -> EngineSnapshot:
+        return EngineSnapshot(
+            time_window=self.time_window,
+            min_score=self.min_score,
+            retire_after=self.retire_after,
+            counter=self.counter,
+            last_timestamp=self.last_timestamp,
+            retired_incidents=self.stats.retired_incidents,
+            late_alerts=self.stats.late_alerts,
+            peak_active_clusters=self.stats.peak_active_clusters,
+            clusters=[
+                (ordinal, cluster.incident_id, cluster.alerts)
+                for ordinal, cluster in self.clusters.items()
+            ],
+            recency=[
+                ordinal
+                for _, touch, ordinal in sorted(self._recency)
+                if self._touched.get(ordinal) == touch
+            ],
+            tombstones=[
+                TombstoneSnapshot(
+                    ordinal,
+                    tombstone.incident_id,
+                    tombstone.hosts,
+                    tombstone.users,
+                    tombstone.ips,
+                    tombstone.techniques,
+                    tombstone.latest_time,
+                )
+                for ordinal, tombstone in self._retired.items()
+                if tombstone.latest_time is not None
+            ],
+        )
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot: EngineSnapshot,
+        stats: ClusteringStats | None = None,
+        on_change: Callable[[DecisionChange], None] | None = None,
+    ) -> ClusterEngine:
+        engine = cls(
+            snapshot.time_window,
+            snapshot.min_score,
+            retire_after=snapshot.retire_after,
+            stats=stats,
+            on_change=on_change,
+        )
+        engine.counter = snapshot.counter
+        engine.last_timestamp = snapshot.last_timestamp
+        engine.stats.retired_incidents = snapshot.retired_incidents
+        engine.stats.late_alerts = snapshot.late_alerts
+        engine.stats.peak_active_clusters = snapshot.peak_active_clusters
+        for ordinal, incident_id, alerts in snapshot.clusters:
+            cluster = ClusterState(incident_id=incident_id)
+            for alert in alerts:
+                cluster.add_alert(alert)
+            # Online mode compares against the last assessment, which only
+            # depends on the aggregates.
+            if on_change is not None:
+                cluster.reassess()
+            engine.clusters[ordinal] = cluster
+            engine.index.add_cluster(ordinal, cluster)
+        if snapshot.retire_after is not None:
+            for ordinal in snapshot.recency:
+                engine._touch(ordinal, engine.clusters[ordinal])
+        for tombstone in snapshot.tombstones:
+            state = ClusterState(
+                incident_id=tombstone.incident_id,
+                aggregates=AlertAggregates(
+                    hosts=tombstone.hosts,
+                    users=tombstone.users,
+                    ips=tombstone.ips,
+                    techniques=tombstone.techniques,
+                ),
+                latest_time=tombstone.latest,
+            )
+            engine._retired[tombstone.ordinal] = state
+            engine._retired_index.add_cluster(tombstone.ordinal, state)
+        return engine
+
+    def drain(self) -> list[ClusterState]:
+        remaining = list(self.clusters.values())
+        self.clusters.clear()
+        self.index = EntityIndex()
+        self._recency.clear()
+        self._touched.clear()
+        self._scorer = None
+        return remaining
+
+
+def _evaluate(
+    aggregates: AlertAggregates, peak: PeakHostWindow | None = None
+) -> tuple[BlastRadius, ReasoningSignals, tuple[Confidence, list[str], DecisionReplay]]:
+    profiler = current_profiler()
+    if profiler is None:
+        blast = blast_radius_from_aggregates(aggregates, peak)
+        signals = signals_from_aggregates(aggregates, blast)
         confidence, reasoning = assess_confidence(signals, blast)
         decision_replay = assess_decision(signals, blast, confidence)
-        entities = EntitiesSummary(
-            hosts=set(cluster.hosts),
-            users=set(cluster.users),
-            ips=set(cluster.ips),
+    else:
+        with profiler.stage("blast_radius", 1):
+            blast = blast_radius_from_aggregates(aggregates, peak)
+        with profiler.stage("reasoning", 1):
+            signals = signals_from_aggregates(aggregates, blast)
+        with profiler.stage("confidence", 1):
+            confidence, reasoning = assess_confidence(signals, blast)
+        with profiler.stage("decision", 1):
+            decision_replay = assess_decision(signals, blast, confidence)
+    return blast, signals, (confidence, reasoning, decision_replay)
+
+
+def _assess(aggregates: AlertAggregates) -> tuple[Confidence, list[str], DecisionReplay]:
+    return _evaluate(aggregates)[2]
+
+
+def _build_incident(
+    cluster: ClusterState,
+    assessment: tuple[Confidence, list[str], DecisionReplay],
+) -> Incident:
+    confidence, reasoning, decision_replay = assessment
+    entities = EntitiesSummary(
+        hosts=set(cluster.hosts),
+        users=set(cluster.users),
+        ips=set(cluster.ips),
+    )
+    return Incident(
+        incident_id=cluster.incident_id,
+        alerts=[a if isinstance(a, Alert) else a.to_alert() for a in cluster.alerts],
+        techniques=set(cluster.techniques),
+        entities=entities,
+        confidence=confidence,
+        reasoning=reasoning,
+        decision_replay=decision_replay,
+    )
+
+
+def finalize_cluster(cluster: ClusterState) -> Incident:
+    metrics = current_metrics()
+    started = perf_counter() if metrics is not None else 0.0
+    if cluster.assessment is not None:
+        incident = _build_incident(cluster, cluster.assessment)
+    else:
+        incident = _build_incident(cluster, _assess(cluster.aggregates))
+    if metrics is not None:
+        metrics.finalize_latency.observe(perf_counter() - started)
+    return incident
+
+
+_FINALIZE_CHUNK_SIZE = 64
+
+
+def _assess_chunk(
+    chunk: list[AlertAggregates],
+) -> list[tuple[Confidence, list[str], DecisionReplay]]:
+    return [_assess(aggregates) for aggregates in chunk]
+
+
+def _collect_chunk(chunk: list[ClusterState], future: Future) -> Iterator[Incident]:
+    for cluster, assessment in zip(chunk, future.result()):
+        yield _build_incident(cluster, assessment)
+
+
+def _finalize_all(clusters: Iterable[ClusterState], workers: int) -> Iterator[Incident]:
+    if workers <= 1:
+        for cluster in clusters:
+            yield finalize_cluster(cluster)
+        return
+
+    # Workers only see the aggregates and return the assessment; incidents
+    # are assembled here so alerts never cross the process boundary.
+    iterator = iter(clusters)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque[tuple[list[ClusterState], Future]] = deque()
+        while chunk := list(islice(iterator, _FINALIZE_CHUNK_SIZE)):
+            aggregates = [cluster.aggregates for cluster in chunk]
+            pending.append((chunk, pool.submit(_assess_chunk, aggregates)))
+            # Bound the number of in-flight chunks so retired clusters are
+            # still released while clustering continues.
+            while len(pending) > 2 * workers:
+                yield from _collect_chunk(*pending.popleft())
+        while pending:
+            yield from _collect_chunk(*pending.popleft())
+
+
+def _check_sorted(
+    alerts: Iterable[Alert],
+    previous: datetime | None = None,
+    message: str = "presorted alerts must be in timestamp order",
+) -> Iterator[Alert]:
+    for alert in alerts:
+        if previous is not None and alert.timestamp < previous:
+            raise ValueError(message)
+        previous = alert.timestamp
+        yield alert
+
+
+def iter_incidents(
+    alerts: Iterable[Alert],
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None = None,
+    stats: ClusteringStats | None = None,
+    presorted: bool = False,
+    workers: int = 1,
+    on_change: Callable[[DecisionChange], None] | None = None,
+    fold_window: timedelta | None = None,
+    resume_from: Path | None = None,
+    checkpoint_to: Path | None = None,
+) -> Iterator[Incident]:
+    if fold_window is not None and (resume_from is not None or checkpoint_to is not None):
+        raise ValueError("folding cannot be combined with checkpoints")
+    if resume_from is not None:
+        snapshot = read_checkpoint(resume_from)
+        if (snapshot.time_window, snapshot.min_score, snapshot.retire_after) != (
+            time_window,
+            min_score,
+            retire_after,
+        ):
+            raise ValueError("checkpoint was written with different clustering options")
+        engine = ClusterEngine.from_snapshot(snapshot, stats=stats, on_change=on_change)
+    else:
+        engine = ClusterEngine(
+            time_window,
+            min_score,
+            retire_after=retire_after,
+            stats=stats,
+            on_change=on_change,
         )
-        incident = Incident(
-            incident_id=cluster.incident_id,
-            alerts=cluster.alerts,
-            techniques=set(cluster.techniques),
-            entities=entities,
-            confidence=confidence,
-            reasoning=reasoning,
-            decision_replay=decision_replay,
+    ordered: Iterable[Alert] = (
+        _check_sorted(alerts) if presorted else sorted(alerts, key=lambda a: a.timestamp)
+    )
+    if fold_window is not None:
+        ordered = fold_alerts(ordered, fold_window)
+    if engine.last_timestamp is not None:
+        ordered = _check_sorted(
+            ordered, engine.last_timestamp, "alerts must not predate the checkpoint"
         )
-        incidents.append(incident)
 
-    return incidents
+    def clusters() -> Iterator[ClusterState]:
+        for alert in ordered:
+            yield from engine.add_alert(alert)
+        # Snapshot before draining: the active clusters are what the next
+        # run continues from.
+        if checkpoint_to is not None:
+            write_checkpoint(checkpoint_to, engine.snapshot())
+        yield from engine.drain()
+
+    # Online assessments are already current, so there is nothing to fan out.
+    yield from _finalize_all(clusters(), workers if on_change is None else 1)
+
+
+def cluster_alerts(
+    alerts: Iterable[Alert],
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None = None,
+    stats: ClusteringStats | None = None,
+    presorted: bool = False,
+    workers: int = 1,
+    on_change: Callable[[DecisionChange], None] | None = None,
+    fold_window: timedelta | None = None,
+    resume_from: Path | None = None,
+    checkpoint_to: Path | None = None,
+) -> list[Incident]:
+    return list(
+        iter_incidents(
+            alerts,
+            time_window,
+            min_score,
+            retire_after=retire_after,
+            stats=stats,
+            presorted=presorted,
+            workers=workers,
+            on_change=on_change,
+            fold_window=fold_window,
+            resume_from=resume_from,
+            checkpoint_to=checkpoint_to,
+        )
+    )
+
+
+def cluster_batch(
+    batch: AlertBatch,
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None = None,
+    stats: ClusteringStats | None = None,
+    workers: int = 1,
+) -> list[Incident]:
+    rows = (batch.row(index) for index in batch.sorted_rows())
+    return cluster_alerts(
+        rows,
+        time_window,
+        min_score,
+        retire_after=retire_after,
+        stats=stats,
+        presorted=True,
+        workers=workers,
+    )
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from itertools import islice, repeat
+from operator import itemgetter, le
+from typing import Sequence
+
+from socdedup.aggregates import AlertAggregates, is_privileged_user
+from socdedup.batch import MICROSECOND, epoch_micros, np
+from socdedup.models import Alert, FoldedAlert
+
+# Below these sizes building the arrays costs more than the Python loops.
+COLUMNAR_MIN_ALERTS = 2048
+COLUMNAR_MIN_HOSTS = 512
+
+
+def _micros(times: Sequence[datetime]) -> np.ndarray:
+    return np.fromiter(map(epoch_micros, times), dtype=np.int64, count=len(times))
+
+
+def _first_seen(values: list[str | None]) -> dict[str, int]:
+    # Position of each value's first occurrence, in order of appearance:
+    # filling the dict back to front leaves the earliest position.
+    first = dict(zip(reversed(values), range(len(values) - 1, -1, -1)))
+    first.pop(None, None)
+    first.pop("", None)
+    return dict(sorted(first.items(), key=itemgetter(1)))
+
+
+def _codes(values: list[str | None], ids: dict[str, int]) -> np.ndarray:
+    return np.fromiter(map(ids.get, values, repeat(-1)), dtype=np.int64, count=len(values))
+
+
+def use_columnar(alerts: Sequence[Alert]) -> bool:
+    """Whether ``aggregate_alerts`` takes the vectorized path for these."""
+    if np is None or len(alerts) < COLUMNAR_MIN_ALERTS:
+        return False
+    # Folded alerts span a time range, which the columns do not carry.
+    return not any(issubclass(kind, FoldedAlert) for kind in set(map(type, alerts)))
+
+
+def aggregate_alerts(alerts: Sequence[Alert]) -> AlertAggregates:
+    """``AlertAggregates.from_alerts``, column at a time for large inputs.
+
+    Entities are read into plain columns, reduced with set and dict
+    builtins and integer-encoded for the user and host pairing; per-user
+    time bounds are grouped over int64 timestamps unless the alerts are
+    already in time order. The result equals the one built alert by alert.
+    """
+    if not use_columnar(alerts):
+        return AlertAggregates.from_alerts(alerts)
+
+    timestamps = [alert.timestamp for alert in alerts]
+    hosts = [alert.host for alert in alerts]
+    users = [alert.user for alert in alerts]
+    techniques = [alert.mitre_technique for alert in alerts]
+
+    host_first = _first_seen(hosts)
+    user_first = _first_seen(users)
+    technique_set = {technique for technique in techniques if technique}
+    alert_types = {alert.alert_type for alert in alerts}
+    aggregates = AlertAggregates(
+        count=len(alerts),
+        hosts=set(host_first),
+        users=set(user_first),
+        ips={alert.source_ip for alert in alerts if alert.source_ip},
+        techniques=technique_set,
+        privileged_users={user for user in user_first if is_privileged_user(user)},
+        host_times=[timestamps[position] for position in host_first.values()],
+        first_time=min(timestamps),
+        last_time=max(timestamps),
+        # is_credential_spray_indicator over the distinct values.
+        credential_indicator=any(technique.startswith("T1110") for technique in technique_set)
+        or any("failed login" in alert_type.lower() for alert_type in alert_types),
+        lateral_t1021=any(technique.startswith("T1021") for technique in technique_set),
+    )
+    technique_times = [
+        timestamp for timestamp, technique in zip(timestamps, techniques) if technique
+    ]
+    if technique_times:
+        aggregates.technique_bounds = (min(technique_times), max(technique_times))
+    if not user_first:
+        return aggregates
+
+    user_ids = {user: code for code, user in enumerate(user_first)}
+    user_codes = _codes(users, user_ids)
+    if all(map(le, timestamps, islice(timestamps, 1, None))):
+        # In time order a user's first and last alerts are its bounds.
+        last = dict(zip(users, range(len(users))))
+        aggregates.user_bounds = {
+            user: (timestamps[first], timestamps[last[user]])
+            for user, first in user_first.items()
+        }
+    else:
+        # Sort rows by user, then time: each user's run starts at its
+        # earliest alert and ends at its latest.
+        order = np.lexsort((_micros(timestamps), user_codes))
+        order = order[np.searchsorted(user_codes[order], 0) :]
+        starts = np.searchsorted(user_codes[order], np.arange(len(user_ids)))
+        ends = np.append(starts[1:], len(order)) - 1
+        aggregates.user_bounds = {
+            user: (timestamps[first], timestamps[last])
+            for user, first, last in zip(user_first, order[starts].tolist(), order[ends].tolist())
+        }
+
+    # Distinct (user, host) pairs in order of first appearance drive the
+    # fan-out; ranks follow that order as in the incremental tracking.
+    host_codes = _codes(hosts, {host: code for code, host in enumerate(host_first)})
+    paired = np.flatnonzero((user_codes >= 0) & (host_codes >= 0))
+    _, first_pairs = np.unique(
+        user_codes[paired] * len(host_first) + host_codes[paired], return_index=True
+    )
+    user_hosts = aggregates.user_hosts
+    user_ranks = aggregates.user_ranks
+    for position in np.sort(paired[first_pairs]).tolist():
+        user = users[position]
+        owned = user_hosts.get(user)
+        if owned is None:
+            owned = user_hosts[user] = set()
+            user_ranks[user] = len(user_ranks)
+        owned.add(hosts[position])
+    for user, owned in user_hosts.items():
+        # The earliest ranked user with the most hosts wins ties.
+        if len(owned) > aggregates.lateral_hosts:
+            aggregates.lateral_user = user
+            aggregates.lateral_hosts = len(owned)
+    return aggregates
+
+
+def peak_window_bounds(times: Sequence[datetime], window: timedelta) -> tuple[int, int]:
+    """Start and end positions of the first largest window in sorted ``times``.
+
+    Every start's window ends at the first time more than ``window`` after
+    it, so one ``searchsorted`` finds them all.
+    """
+    micros = _micros(times)
+    ends = np.searchsorted(micros, micros + window // MICROSECOND, side="right")
+    start = int(np.argmax(ends - np.arange(len(micros))))
+    return start, int(ends[start])
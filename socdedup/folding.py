@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Hashable, Iterable, Iterator
+
+from socdedup.models import Alert, FoldedAlert
+
+
+def fold_key(alert: Alert) -> Hashable:
+    return (
+        alert.host,
+        alert.user,
+        alert.source_ip,
+        alert.dest_ip,
+        alert.mitre_technique,
+        alert.alert_type,
+    )
+
+
+@dataclass
+class _Run:
+    key: Hashable
+    first: Alert
+    occurrences: int
+    last_seen: datetime
+
+
+def _representative(run: _Run) -> Alert:
+    first = run.first
+    if run.occurrences == 1:
+        return first
+    fields = {name: getattr(first, name) for name in Alert.model_fields}
+    return FoldedAlert.model_construct(
+        **fields,
+        **(first.model_extra or {}),
+        occurrences=run.occurrences,
+        last_seen=run.last_seen,
+    )
+
+
+def fold_alerts(alerts: Iterable[Alert], window: timedelta) -> Iterator[Alert]:
+    """Collapse alerts sharing a ``fold_key`` into one ``FoldedAlert``.
+
+    Expects a timestamp-ordered stream. A run covers every copy within
+    ``window`` of its first one and keeps that copy's ``raw``. Runs are
+    released once the window has passed, in order of their first copy, so
+    the output stays timestamp-ordered.
+    """
+    pending: deque[_Run] = deque()
+    open_runs: dict[Hashable, _Run] = {}
+    for alert in alerts:
+        timestamp = alert.timestamp
+        while pending and timestamp - pending[0].first.timestamp > window:
+            run = pending.popleft()
+            del open_runs[run.key]
+            yield _representative(run)
+
+        key = fold_key(alert)
+        run = open_runs.get(key)
+        if run is None:
+            run = open_runs[key] = _Run(key, alert, 1, timestamp)
+            pending.append(run)
+        else:
+            run.occurrences += 1
+            run.last_seen = timestamp
+    for run in pending:
+        yield _representative(run)
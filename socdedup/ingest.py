@@ -1,36 +1,29 @@
 from __future__ import annotations
 
 import csv
+import io
 import json
-from datetime import datetime, timezone
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, TextIO
 
-from socdedup.models import Alert
+from socdedup.models import Alert, construct_alert, parse_timestamp
 
 
+_SOURCE_IP_FIELDS = ["src_ip", "source_ip", "ip"]
+_DEST_IP_FIELDS = ["dest_ip", "dst_ip", "destination_ip"]
+_USER_FIELDS = ["user", "username", "account"]
+_HOST_FIELDS = ["host", "hostname", "computer"]
 _TIMESTAMP_FIELDS = ["timestamp", "time", "event_time", "@timestamp"]
 _ALERT_TYPE_FIELDS = ["alert_type", "type", "name", "signature"]
 _MITRE_FIELDS = ["mitre_technique", "mitre", "technique"]
 
 
-def _parse_timestamp(value: Any) -> datetime:
-    if isinstance(value, datetime):
-        dt = value
-    elif isinstance(value, (int, float)):
-        dt = datetime.fromtimestamp(value, tz=timezone.utc)
-    elif isinstance(value, str):
-        text = value.strip()
-        if text.endswith("Z"):
-            text = text[:-1] + "+00:00"
-        dt = datetime.fromisoformat(text)
-    else:
-        raise ValueError("Unsupported timestamp format")
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
-
-
 def _get_first(data: dict[str, Any], keys: list[str]) -> Any | None:
     for key in keys:
         if key in data and data[key] not in (None, ""):
@@ -38,30 +31,54 @@ def _get_first(data: dict[str, Any], keys: list[str]) -> Any | None:
     return None
 
 
+def _is_plain(*values: Any) -> bool:
+    for value in values:
+        if value is not None and type(value) is not str:
+            return False
+    return True
+
+
 def _normalize_alert(data: dict[str, Any]) -> Alert:
-    source_ip = _get_first(data, ["src_ip", "source_ip", "ip"])
-    dest_ip = _get_first(data, ["dest_ip", "dst_ip", "destination_ip"])
-    user = _get_first(data, ["user", "username", "account"])
-    host = _get_first(data, ["host", "hostname", "computer"])
+    return _build_alert(
+        data,
+        _get_first(data, _SOURCE_IP_FIELDS),
+        _get_first(data, _DEST_IP_FIELDS),
+        _get_first(data, _USER_FIELDS),
+        _get_first(data, _HOST_FIELDS),
+        _get_first(data, _TIMESTAMP_FIELDS),
+        _get_first(data, _ALERT_TYPE_FIELDS),
+        _get_first(data, _MITRE_FIELDS),
+    )
+
 
-    ts_value = _get_first(data, _TIMESTAMP_FIELDS)
+def _build_alert(
+    data: dict[str, Any],
+    source_ip: Any,
+    dest_ip: Any,
+    user: Any,
+    host: Any,
+    ts_value: Any,
+    alert_type: Any,
+    mitre_technique: Any,
+) -> Alert:
     if ts_value is None:
         raise ValueError("Missing timestamp")
 
-    alert_type = _get_first(data, _ALERT_TYPE_FIELDS) or "unknown"
-    mitre_technique = _get_first(data, _MITRE_FIELDS)
-
-    alert = Alert(
-        timestamp=_parse_timestamp(ts_value),
-        source_ip=source_ip,
-        dest_ip=dest_ip,
-        user=user,
-        host=host,
-        alert_type=str(alert_type),
-        mitre_technique=str(mitre_technique) if mitre_technique else None,
-        raw=data,
-    )
-    return alert
+    fields = {
+        "timestamp": parse_timestamp(ts_value),
+        "source_ip": source_ip,
+        "dest_ip": dest_ip,
+        "user": user,
+        "host": host,
+        "alert_type": str(alert_type or "unknown"),
+        "mitre_technique": str(mitre_technique) if mitre_technique else None,
+        "raw": data,
+    }
+    # Everything above is already normalized; only entity values of an
+    # unexpected type still need pydantic to validate (and reject) them.
+    if _is_plain(source_ip, dest_ip, user, host) and None not in data:
+        return construct_alert(fields)
+    return Alert(**fields)
 
 
 def ingest_json(path: str | Path) -> list[Alert]:
@@ -85,11 +102,452 @@ def ingest_json(path: str | Path) -> list[Alert]:
     return alerts
 
 
-def ingest_csv(path: str | Path) -> list[Alert]:
+_STREAM_CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+# Decode errors this close to the end of the buffer may be a literal,
+# number or escape cut by the read; a surrogate pair escape is the longest.
+_TRUNCATION_TAIL = 12
+_MAX_RECORD_SIZE = 16 << 20
+
+
+class _JsonStream:
+    def __init__(self, handle: TextIO, chunk_size: int = _STREAM_CHUNK_SIZE) -> None:
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._dropped = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        chunk = self._handle.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        if self._pos:
+            self._dropped += len(self._buffer[: self._pos].encode("utf-8"))
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+        self._buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._chunk_size):
+                return ""
+
+    def offset(self, pos: int) -> int:
+        """Byte offset in the file of buffer position ``pos``."""
+        return self._dropped + len(self._buffer[:pos].encode("utf-8"))
+
+    def _refill(self, size: int) -> bool:
+        # Reads on while the value being decoded fits the record size cap.
+        if len(self._buffer) - self._pos > _MAX_RECORD_SIZE:
+            raise ValueError(
+                f"Invalid JSON at byte {self.offset(self._pos)}: "
+                f"record exceeds {_MAX_RECORD_SIZE} characters"
+            )
+        return self._fill(size)
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON at byte {self.offset(self._pos)}: expected '{char}'")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as exc:
+                # Only an error the end of the buffer may have caused is
+                # worth reading more for; anything else is malformed input.
+                truncated = exc.msg.startswith("Unterminated string") or (
+                    len(self._buffer) - exc.pos <= _TRUNCATION_TAIL
+                )
+                if not truncated or not self._refill(size):
+                    raise ValueError(
+                        f"Invalid JSON at byte {self.offset(exc.pos)}: {exc.msg}"
+                    ) from exc
+                size *= 2
+                continue
+            # A number or literal cut at the buffer edge decodes as a shorter
+            # prefix, so only accept it once a delimiter follows it.
+            if (
+                not isinstance(value, (dict, list, str))
+                and (end == len(self._buffer) or self._buffer[end] not in _DELIMITERS)
+                and self._refill(size)
+            ):
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_array(stream: _JsonStream) -> Iterator[Any]:
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() == ",":
+            stream.expect(",")
+            continue
+        stream.expect("]")
+        return
+
+
+def iter_json(path: str | Path) -> Iterator[Alert]:
+    """Yield alerts from a JSON export without loading the whole document.
+
+    Accepts the same bare-list and ``{"alerts": [...]}`` layouts as
+    ``ingest_json``. Peak memory is one 64 KiB read buffer, the alert
+    being decoded and the bounded timestamp memo, independent of file size.
+    A malformed alert fails at once with its byte offset, and an alert
+    larger than 16 MiB of text is rejected rather than buffered.
+    """
     path = Path(path)
+    with path.open("r", encoding="utf-8") as handle:
+        stream = _JsonStream(handle)
+        head = stream.peek()
+        if head == "{":
+            stream.expect("{")
+            found = False
+            while stream.peek() != "}":
+                key = stream.value()
+                stream.expect(":")
+                if key == "alerts" and stream.peek() == "[":
+                    found = True
+                    break
+                stream.value()
+                if stream.peek() == ",":
+                    stream.expect(",")
+            if not found:
+                raise ValueError("JSON payload must be a list of alerts")
+        elif head != "[":
+            raise ValueError("JSON payload must be a list of alerts")
+
+        for item in _iter_array(stream):
+            if not isinstance(item, dict):
+                raise ValueError("Alert must be an object")
+            yield _normalize_alert(item)
+
+
+class _CsvColumns:
+    """Where each alert field lives in rows under one CSV header.
+
+    Resolved once per file, so a row costs a few list lookups instead of
+    ``_get_first`` probing a dict per candidate key. As with
+    ``csv.DictReader``, a repeated column name means its last occurrence.
+    Rows not matching the header width go through the dict path.
+    """
+
+    def __init__(self, fieldnames: list[str]) -> None:
+        self.fieldnames = fieldnames
+        positions = {name: index for index, name in enumerate(fieldnames)}
+        self.fields: tuple[tuple[int, ...], ...] = tuple(
+            tuple(positions[key] for key in keys if key in positions)
+            for keys in (
+                _SOURCE_IP_FIELDS,
+                _DEST_IP_FIELDS,
+                _USER_FIELDS,
+                _HOST_FIELDS,
+                _TIMESTAMP_FIELDS,
+                _ALERT_TYPE_FIELDS,
+                _MITRE_FIELDS,
+            )
+        )
+        # Usually each field has at most one column, and one itemgetter
+        # reads them all; absent fields read an empty cell appended past
+        # the header.
+        self.pick: Callable[[list[str]], tuple[str, ...]] | None = None
+        if all(len(columns) <= 1 for columns in self.fields):
+            self.pick = itemgetter(
+                *(columns[0] if columns else len(fieldnames) for columns in self.fields)
+            )
+
+    def alert(self, row: list[str]) -> Alert:
+        fieldnames = self.fieldnames
+        if len(row) != len(fieldnames):
+            return _normalize_alert(_csv_record(fieldnames, row))
+        record = dict(zip(fieldnames, row))
+        row.append("")
+        if self.pick is not None:
+            source_ip, dest_ip, user, host, ts_value, alert_type, mitre = self.pick(row)
+            return _build_alert(
+                record,
+                source_ip or None,
+                dest_ip or None,
+                user or None,
+                host or None,
+                ts_value or None,
+                alert_type,
+                mitre,
+            )
+        values = []
+        for columns in self.fields:
+            value = None
+            for column in columns:
+                if row[column]:
+                    value = row[column]
+                    break
+            values.append(value)
+        return _build_alert(record, *values)
+
+
+def _csv_record(fieldnames: list[str], row: list[str]) -> dict[Any, Any]:
+    # csv.DictReader's handling of short and long rows.
+    record: dict[Any, Any] = dict(zip(fieldnames, row))
+    if len(fieldnames) < len(row):
+        record[None] = row[len(fieldnames) :]
+    else:
+        for key in fieldnames[len(row) :]:
+            record[key] = None
+    return record
+
+
+# A carriage return not followed by a newline also ends a line.
+_LONE_CR = re.compile(r"(?<=\r)(?!\n)")
+
+
+class _LineFeed:
+    """Decoded lines for ``csv.reader`` that track the bytes consumed, so a
+    record's end is known as a file offset."""
+
+    def __init__(self, handle: BinaryIO, position: int) -> None:
+        self.handle = handle
+        self.position = position
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.handle:
+            text = line.decode("utf-8")
+            if "\r" in text and _LONE_CR.search(text.rstrip("\r\n")):
+                for piece in _LONE_CR.split(text):
+                    if piece:
+                        self.position += len(piece.encode("utf-8"))
+                        yield piece
+                continue
+            self.position += len(line)
+            yield text
+
+
+def _csv_header(path: Path) -> tuple[list[str] | None, int, int]:
+    with path.open("rb") as handle:
+        feed = _LineFeed(handle, 0)
+        reader = csv.reader(feed)
+        fieldnames = next(reader, None)
+        return fieldnames, feed.position, reader.line_num
+
+
+@dataclass
+class _CsvChunk:
+    start: int
+    end: int = 0
+    lines: int = 0
+    alerts: list[Alert] = field(default_factory=list)
+    error: tuple[int, str] | None = None
+
+
+def _parse_csv_range(path: str, fieldnames: list[str], start: int, stop: int) -> _CsvChunk:
+    # Parses the records starting before ``stop``; the last one may run
+    # past it, and only then are lines read one at a time.
+    columns = _CsvColumns(fieldnames)
+    chunk = _CsvChunk(start)
+    stop = max(start, stop)
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        lines = io.StringIO(handle.read(stop - start).decode("utf-8"), newline="").readlines()
+        tail = _LineFeed(handle, stop)
+        reader = csv.reader(chain(lines, tail))
+        alerts = chunk.alerts
+        while reader.line_num < len(lines):
+            line = reader.line_num + 1
+            try:
+                row = next(reader)
+                if row:
+                    alerts.append(columns.alert(row))
+            except (ValueError, csv.Error) as exc:
+                chunk.error = (line, str(exc))
+                break
+        chunk.end, chunk.lines = tail.position, reader.line_num
+    return chunk
+
+
+_CSV_BLOCK_BYTES = 4 << 20
+_CSV_PARALLEL_MIN_BYTES = 4 << 20
+
+
+def ingest_csv(path: str | Path, workers: int | None = None) -> list[Alert]:
+    """Parse CSV alerts with a header row naming the fields.
+
+    Files above a few MiB are split at line starts and parsed across a
+    process pool. A split can land inside a quoted field spanning lines;
+    each chunk must begin where the previous one's last record ended, and
+    one that does not is parsed again from there. Alerts keep file order,
+    and the first bad row is reported by the line it starts on.
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    fieldnames, start, lines_before = _csv_header(path)
+    if fieldnames is None:
+        return []
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or size - start < _CSV_PARALLEL_MIN_BYTES:
+        # Blocks bound the decoded text held at once.
+        blocks = max(1, (size - start) // _CSV_BLOCK_BYTES)
+        boundaries = _line_boundaries(path, size, blocks, start)
+        return _collect_csv(
+            (
+                _parse_csv_range(str(path), fieldnames, chunk_start, chunk_stop)
+                for chunk_start, chunk_stop in zip(boundaries, boundaries[1:])
+            ),
+            boundaries[1:],
+            str(path),
+            fieldnames,
+            start,
+            lines_before,
+        )
+
+    boundaries = _line_boundaries(path, size, workers * 4, start)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_parse_csv_range, str(path), fieldnames, chunk_start, chunk_stop)
+            for chunk_start, chunk_stop in zip(boundaries, boundaries[1:])
+        ]
+        try:
+            return _collect_csv(
+                (future.result() for future in futures),
+                boundaries[1:],
+                str(path),
+                fieldnames,
+                start,
+                lines_before,
+            )
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _collect_csv(
+    chunks: Iterable[_CsvChunk],
+    stops: list[int],
+    path: str,
+    fieldnames: list[str],
+    start: int,
+    lines_before: int,
+) -> list[Alert]:
+    alerts: list[Alert] = []
+    for chunk, stop in zip(chunks, stops):
+        if chunk.start != start:
+            # The split fell inside a record: resume where it really begins.
+            chunk = _parse_csv_range(path, fieldnames, start, stop)
+        if chunk.error is not None:
+            line_offset, message = chunk.error
+            raise ValueError(f"line {lines_before + line_offset}: {message}")
+        alerts.extend(chunk.alerts)
+        start, lines_before = chunk.end, lines_before + chunk.lines
+    return alerts
+
+
+_JSONL_PARALLEL_MIN_BYTES = 4 << 20
+
+
+def _parse_jsonl_line(line: bytes) -> Alert | None:
+    if not line.strip():
+        return None
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"invalid JSON: {exc.msg}") from exc
+    if not isinstance(item, dict):
+        raise ValueError("Alert must be an object")
+    return _normalize_alert(item)
+
+
+def iter_jsonl(path: str | Path) -> Iterator[Alert]:
+    path = Path(path)
+    with path.open("rb") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            try:
+                alert = _parse_jsonl_line(line)
+            except ValueError as exc:
+                raise ValueError(f"line {line_number}: {exc}") from exc
+            if alert is not None:
+                yield alert
+
+
+def _line_boundaries(path: Path, size: int, chunks: int, start: int = 0) -> list[int]:
+    boundaries = [start]
+    with path.open("rb") as handle:
+        for index in range(1, chunks):
+            handle.seek(start + (size - start) * index // chunks)
+            handle.readline()
+            offset = handle.tell()
+            if boundaries[-1] < offset < size:
+                boundaries.append(offset)
+    boundaries.append(size)
+    return boundaries
+
+
+def _parse_jsonl_range(
+    path: str, start: int, end: int
+) -> tuple[list[Alert], int, tuple[int, str] | None]:
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    lines = data.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    alerts: list[Alert] = []
+    for offset, line in enumerate(lines, start=1):
+        try:
+            alert = _parse_jsonl_line(line)
+        except ValueError as exc:
+            return alerts, len(lines), (offset, str(exc))
+        if alert is not None:
+            alerts.append(alert)
+    return alerts, len(lines), None
+
+
+def ingest_jsonl(path: str | Path, workers: int | None = None) -> list[Alert]:
+    """Parse newline-delimited JSON alerts, one object per line.
+
+    Files above a few MiB are split into line-aligned byte ranges parsed
+    across a process pool. Alerts keep file order, and the first malformed
+    line in the file is reported by its line number.
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or size < _JSONL_PARALLEL_MIN_BYTES:
+        return list(iter_jsonl(path))
+
+    boundaries = _line_boundaries(path, size, workers * 4)
     alerts: list[Alert] = []
-    with path.open("r", encoding="utf-8", newline="") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            alerts.append(_normalize_alert(row))
+    lines_before = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_parse_jsonl_range, str(path), start, end)
+            for start, end in zip(boundaries, boundaries[1:])
+        ]
+        for future in futures:
+            chunk_alerts, line_count, error = future.result()
+            if error is not None:
+                for pending in futures:
+                    pending.cancel()
+                line_offset, message = error
+                raise ValueError(f"line {lines_before + line_offset}: {message}")
+            alerts.extend(chunk_alerts)
+            lines_before += line_count
     return alerts
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+_LATENCY_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+@dataclass
+class Counter:
+    name: str
+    help: str
+    values: dict[Labels, float] = field(default_factory=dict)
+
+    def inc(self, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self) -> Iterator[str]:
+        values = sorted(self.values.items()) or [((), 0)]
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+@dataclass
+class Gauge:
+    name: str
+    help: str
+    values: dict[Labels, float] = field(default_factory=dict)
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[tuple(sorted(labels.items()))] = value
+
+    def samples(self) -> Iterator[str]:
+        values = sorted(self.values.items()) or [((), 0)]
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+@dataclass
+class Histogram:
+    name: str
+    help: str
+    buckets: tuple[float, ...] = _LATENCY_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        # One slot per bucket plus the overflow above the largest bound.
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), self.counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}'
+        yield f"{self.name}_sum {_format_value(self.sum)}"
+        yield f"{self.name}_count {self.count}"
+
+
+Metric = Counter | Gauge | Histogram
+_TYPES = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.setdefault(metric.name, metric)
+        if type(existing) is not type(metric):
+            raise ValueError(f"metric {metric.name} is already registered as another type")
+        return existing
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._register(Gauge(name, help))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple[float, ...] = _LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """The registry in Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {_TYPES[type(metric)]}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        # The textfile collector may read at any time, so swap in whole files.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        staging.write_text(self.render(), encoding="utf-8")
+        os.replace(staging, path)
+
+
+class PipelineMetrics:
+    """The metrics clustering reports while a registry is recording."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.alerts_ingested = registry.counter(
+            "socdedup_alerts_ingested_total", "Alerts read from the input."
+        )
+        self.incidents_created = registry.counter(
+            "socdedup_incidents_created_total", "Clusters opened by the engine."
+        )
+        self.confidence_transitions = registry.counter(
+            "socdedup_confidence_transitions_total",
+            "Confidence changes of open incidents, by old and new level.",
+        )
+        self.active_clusters = registry.gauge(
+            "socdedup_active_clusters", "Clusters currently open in the engine."
+        )
+        self.cluster_latency = registry.histogram(
+            "socdedup_cluster_alert_seconds", "Time to place one alert into a cluster."
+        )
+        self.finalize_latency = registry.histogram(
+            "socdedup_finalize_incident_seconds", "Time to assess and build one incident."
+        )
+
+
+_current: PipelineMetrics | None = None
+
+
+def current_metrics() -> PipelineMetrics | None:
+    return _current
+
+
+@contextmanager
+def recording(metrics: PipelineMetrics | None) -> Iterator[PipelineMetrics | None]:
+    """Make ``metrics`` the one instrumented code reports to."""
+    global _current
+    previous, _current = _current, metrics
+    try:
+        yield metrics
+    finally:
+        _current = previous
+
+
+class MetricsExporter:
+    """Rewrites ``path`` from ``registry`` every ``interval`` seconds on a
+    daemon thread, and once more on ``stop``."""
+
+    def __init__(self, registry: MetricsRegistry, path: Path, interval: float) -> None:
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.registry.write(self.path)
+
+    def start(self) -> MetricsExporter:
+        self.registry.write(self.path)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.registry.write(self.path)
+
+    def __enter__(self) -> MetricsExporter:
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
@@ -2,9 +2,37 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 from enum import Enum
+from functools import lru_cache
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
+
+
+_TIMESTAMP_CACHE_SIZE = 1 << 13
+
+
+def _as_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=_TIMESTAMP_CACHE_SIZE)
+def _parse_scalar_timestamp(value: str | int | float) -> datetime:
+    if isinstance(value, str):
+        text = value.strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        return _as_utc(datetime.fromisoformat(text))
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def parse_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return _as_utc(value)
+    if isinstance(value, (str, int, float)):
+        return _parse_scalar_timestamp(value)
+    raise ValueError("Unsupported timestamp format")
 
 
 class Alert(BaseModel):
@@ -22,20 +50,44 @@ class Alert(BaseModel):
     @field_validator("timestamp", mode="before")
     @classmethod
     def ensure_utc(cls, value: Any) -> datetime:
-        if isinstance(value, datetime):
-            dt = value
-        elif isinstance(value, str):
-            text = value.strip()
-            if text.endswith("Z"):
-                text = text[:-1] + "+00:00"
-            dt = datetime.fromisoformat(text)
-        elif isinstance(value, (int, float)):
-            dt = datetime.fromtimestamp(value, tz=timezone.utc)
-        else:
+        if not isinstance(value, (datetime, str, int, float)):
             raise ValueError("timestamp must be a datetime")
-        if dt.tzinfo is None:
-            return dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc)
+        return parse_timestamp(value)
+
+
+_ALERT_FIELDS = frozenset(Alert.model_fields)
+
+
+def construct_alert(fields: dict[str, Any]) -> Alert:
+    # Equivalent to Alert.model_construct for a complete, already normalized
+    # field dict, without its per-call default and alias handling.
+    alert = Alert.__new__(Alert)
+    object.__setattr__(alert, "__dict__", fields)
+    object.__setattr__(alert, "__pydantic_fields_set__", set(_ALERT_FIELDS))
+    object.__setattr__(alert, "__pydantic_extra__", {})
+    object.__setattr__(alert, "__pydantic_private__", None)
+    return alert
+
+
+class FoldedAlert(Alert):
+    """Representative of ``occurrences`` alerts sharing a fold key, seen
+    from ``timestamp`` through ``last_seen``."""
+
+    occurrences: int
+    last_seen: datetime
+
+    @field_validator("last_seen", mode="before")
+    @classmethod
+    def ensure_last_seen_utc(cls, value: Any) -> datetime:
+        return parse_timestamp(value)
+
+
+def occurrences(alert: Alert) -> int:
+    return alert.occurrences if isinstance(alert, FoldedAlert) else 1
+
+
+def last_seen(alert: Alert) -> datetime:
+    return alert.last_seen if isinstance(alert, FoldedAlert) else alert.timestamp
 
 
 class EntitiesSummary(BaseModel):
@@ -43,6 +95,10 @@ class EntitiesSummary(BaseModel):
     users: set[str] = Field(default_factory=set)
     ips: set[str] = Field(default_factory=set)
 
+    @field_serializer("hosts", "users", "ips", when_used="json")
+    def sorted_entities(self, value: set[str]) -> list[str]:
+        return sorted(value)
+
 
 class Confidence(str, Enum):
     LOW = "LOW"
@@ -52,13 +108,21 @@ class Confidence(str, Enum):
 
 class Incident(BaseModel):
     incident_id: str
-    alerts: list[Alert]
+    alerts: list[FoldedAlert | Alert] = Field(default_factory=list)
+    # Set instead of ``alerts`` by the compact output modes: input positions
+    # of the alerts (``ids``) and/or just how many there were.
+    alert_ids: list[int] | None = None
+    alert_count: int | None = None
     techniques: set[str] = Field(default_factory=set)
     entities: EntitiesSummary = Field(default_factory=EntitiesSummary)
     confidence: Confidence = Confidence.LOW
     reasoning: list[str] = Field(default_factory=list)
     decision_replay: "DecisionReplay | None" = None
 
+    @field_serializer("techniques", when_used="json")
+    def sorted_techniques(self, value: set[str]) -> list[str]:
+        return sorted(value)
+
 
 class DecisionReplay(BaseModel):
     action: str
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from socdedup.clustering import (
+    _ENTITY_WEIGHTS,
+    _TIME_BONUS,
+    ClusterEngine,
+    ClusterState,
+    ClusteringStats,
+    _finalize_all,
+    cluster_alerts,
+)
+from socdedup.models import Alert, Incident
+
+
+@dataclass
+class PartitionPlan:
+    """Entity-connected components of a stream, packed into worker bins.
+
+    Alerts in different components share no host, user, source IP or
+    technique, even transitively, so above the time bonus they can never
+    land in the same cluster and are clustered independently.
+    """
+
+    components: int = 0
+    largest: int = 0
+    # Global alert positions per bin, each in stream order.
+    bins: list[list[int]] = field(default_factory=list)
+    reason: str = ""
+
+    @property
+    def parallel(self) -> bool:
+        return len(self.bins) > 1
+
+    def describe(self) -> str:
+        if not self.parallel:
+            return f"partition: sequential ({self.reason})"
+        return f"partition: components={self.components} largest={self.largest} bins={len(self.bins)}"
+
+
+def entity_components(alerts: list[Alert]) -> list[int]:
+    """Label every alert with its connected component (union-find)."""
+    keys: dict[tuple[str, str], int] = {}
+    parent: list[int] = []
+
+    def find(node: int) -> int:
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    labels: list[int] = []
+    for alert in alerts:
+        root = -1
+        for field_name, _ in _ENTITY_WEIGHTS:
+            value = getattr(alert, field_name)
+            if not value:
+                continue
+            node = keys.get((field_name, value))
+            if node is None:
+                node = keys[(field_name, value)] = len(parent)
+                parent.append(node)
+            node = find(node)
+            if root < 0:
+                root = node
+            elif node != root:
+                parent[node] = root
+        if root < 0:
+            # No entities at all: the alert can only ever found its own cluster.
+            root = len(parent)
+            parent.append(root)
+        labels.append(root)
+    return [find(label) for label in labels]
+
+
+def plan_partitions(alerts: list[Alert], min_score: int, workers: int) -> PartitionPlan:
+    if min_score <= _TIME_BONUS:
+        return PartitionPlan(reason=f"min_score {min_score} can be reached by the time bonus alone")
+    if workers <= 1:
+        return PartitionPlan(reason="a single worker")
+    members: dict[int, list[int]] = {}
+    for position, label in enumerate(entity_components(alerts)):
+        members.setdefault(label, []).append(position)
+    components = sorted(members.values(), key=len, reverse=True)
+    plan = PartitionPlan(components=len(components), largest=len(components[0]) if components else 0)
+    if len(components) <= 1:
+        plan.reason = "no independent components"
+        return plan
+
+    # Largest first into the least loaded bin; ties go to the lowest bin so
+    # the plan is deterministic.
+    loads = [(0, slot) for slot in range(min(workers, len(components)))]
+    bins: list[list[int]] = [[] for _ in loads]
+    for component in components:
+        load, slot = heapq.heappop(loads)
+        bins[slot].extend(component)
+        heapq.heappush(loads, (load + len(component), slot))
+    plan.bins = [sorted(positions) for positions in bins]
+    return plan
+
+
+@dataclass
+class _BinResult:
+    clusters: list[list[int]]
+    late_alerts: int
+
+
+def _cluster_bin(
+    alerts: list[Alert],
+    positions: list[int],
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None,
+    ticks: list[datetime | None],
+) -> _BinResult:
+    stats = ClusteringStats()
+    engine = ClusterEngine(time_window, min_score, retire_after=retire_after, stats=stats)
+    global_positions = {id(alert): position for alert, position in zip(alerts, positions)}
+    released: list[ClusterState] = []
+    for alert, tick in zip(alerts, ticks):
+        if tick is not None:
+            # The whole stream had alerts from other bins in between: retire
+            # at the last of them, so tombstones are forgotten on the global
+            # timeline before this alert checks for late matches.
+            released.extend(engine.advance(tick))
+        released.extend(engine.add_alert(alert))
+    released.extend(engine.drain())
+    clusters = [[global_positions[id(alert)] for alert in cluster.alerts] for cluster in released]
+    return _BinResult(clusters, stats.late_alerts)
+
+
+def _ticks(positions: list[int], ordered: list[Alert]) -> list[datetime | None]:
+    # Time of the global alert just before each bin alert, when that alert
+    # belongs to another bin.
+    previous = [-1, *positions]
+    return [
+        ordered[position - 1].timestamp if position - 1 != before else None
+        for position, before in zip(positions, previous)
+    ]
+
+
+def _release_order(
+    clusters: list[list[int]], ordered: list[Alert], retire_after: timedelta | None
+) -> tuple[list[int], list[int]]:
+    # Recreates when a single engine over the whole stream would have
+    # released each cluster: at the first alert more than ``retire_after``
+    # past its latest one, least recently touched first, and the rest on
+    # drain in creation order.
+    end = len(ordered)
+    if retire_after is None:
+        retire_at = [end] * len(clusters)
+    else:
+        timestamps = [alert.timestamp for alert in ordered]
+        retire_at = [
+            bisect_right(timestamps, ordered[cluster[-1]].timestamp + retire_after)
+            for cluster in clusters
+        ]
+    order = sorted(
+        range(len(clusters)),
+        key=lambda i: (retire_at[i], clusters[i][-1] if retire_at[i] < end else clusters[i][0]),
+    )
+    return order, retire_at
+
+
+def _peak_active(clusters: list[list[int]], retire_at: list[int], end: int) -> int:
+    # A cluster is active from its first alert until the alert that retires
+    # it; the engine records the peak right after creating one.
+    changes = [0] * (end + 1)
+    for cluster, retired in zip(clusters, retire_at):
+        changes[cluster[0]] += 1
+        changes[retired] -= 1
+    founded = {cluster[0] for cluster in clusters}
+    peak = active = 0
+    for position in range(end):
+        active += changes[position]
+        if position in founded:
+            peak = max(peak, active)
+    return peak
+
+
+def cluster_partitioned(
+    alerts: Iterable[Alert],
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None = None,
+    stats: ClusteringStats | None = None,
+    workers: int = 1,
+) -> tuple[list[Incident], PartitionPlan]:
+    """Cluster independent entity components on separate cores.
+
+    The result, including incident ids, release order and stats, is the
+    same as ``cluster_alerts``. Falls back to it when ``min_score`` is
+    within the time bonus or the stream does not decompose.
+    """
+    ordered = sorted(alerts, key=lambda alert: alert.timestamp)
+    plan = plan_partitions(ordered, min_score, workers)
+    if not plan.parallel:
+        incidents = cluster_alerts(
+            ordered, time_window, min_score, retire_after, stats, presorted=True, workers=workers
+        )
+        return incidents, plan
+
+    with ProcessPoolExecutor(max_workers=len(plan.bins)) as pool:
+        futures = [
+            pool.submit(
+                _cluster_bin,
+                [ordered[position] for position in positions],
+                positions,
+                time_window,
+                min_score,
+                retire_after,
+                _ticks(positions, ordered) if retire_after is not None else [None] * len(positions),
+            )
+            for positions in plan.bins
+        ]
+        results = [future.result() for future in futures]
+
+    clusters = [cluster for result in results for cluster in result.clusters]
+    order, retire_at = _release_order(clusters, ordered, retire_after)
+    if stats is not None:
+        end = len(ordered)
+        stats.late_alerts += sum(result.late_alerts for result in results)
+        stats.retired_incidents += sum(1 for retired in retire_at if retired < end)
+        stats.peak_active_clusters = max(
+            stats.peak_active_clusters, _peak_active(clusters, retire_at, end)
+        )
+
+    founders = sorted(range(len(clusters)), key=lambda i: clusters[i][0])
+    names = {i: f"INC-{number:04d}" for number, i in enumerate(founders, start=1)}
+    states: list[ClusterState] = []
+    for i in order:
+        state = ClusterState(incident_id=names[i])
+        for position in clusters[i]:
+            state.add_alert(ordered[position])
+        states.append(state)
+    return list(_finalize_all(states, workers)), plan
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageTiming:
+    wall: float = 0.0
+    cpu: float = 0.0
+    calls: int = 0
+    items: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "wall_seconds": self.wall,
+            "cpu_seconds": self.cpu,
+            "calls": self.calls,
+            "items": self.items,
+        }
+
+
+@dataclass
+class Distribution:
+    count: int = 0
+    total: int = 0
+    max: int = 0
+
+    def observe(self, value: int) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+@dataclass
+class Profiler:
+    """Stage timings, counters and per-item distributions for one run.
+
+    Stages nest: ``cluster`` includes the ``blast_radius``, ``reasoning``,
+    ``confidence`` and ``decision`` time spent assessing its incidents.
+    Work done in worker processes is only visible in the enclosing stage.
+    """
+
+    stages: dict[str, StageTiming] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+    distributions: dict[str, Distribution] = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0) -> Iterator[StageTiming]:
+        timing = self.stages.get(name)
+        if timing is None:
+            timing = self.stages[name] = StageTiming()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield timing
+        finally:
+            timing.wall += time.perf_counter() - wall
+            timing.cpu += time.process_time() - cpu
+            timing.calls += 1
+            timing.items += items
+
+    def timed(
+        self, name: str, items: Iterable[T], size: Callable[[T], int] | None = None
+    ) -> Iterator[T]:
+        # Charges only the time spent producing each item, so a lazily
+        # read input is separated from the work done on it downstream.
+        # ``size`` weighs an item for the stage's item count.
+        iterator = iter(items)
+        while True:
+            with self.stage(name) as timing:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    timing.calls -= 1
+                    return
+                timing.items += 1 if size is None else size(item)
+            yield item
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: int) -> None:
+        distribution = self.distributions.get(name)
+        if distribution is None:
+            distribution = self.distributions[name] = Distribution()
+        distribution.observe(value)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "stages": {name: timing.as_dict() for name, timing in self.stages.items()},
+            "counters": dict(self.counters),
+            "distributions": {
+                name: distribution.as_dict()
+                for name, distribution in self.distributions.items()
+            },
+        }
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+_current: Profiler | None = None
+
+
+def current_profiler() -> Profiler | None:
+    return _current
+
+
+@contextmanager
+def profiling(profiler: Profiler | None) -> Iterator[Profiler | None]:
+    """Make ``profiler`` the one instrumented code reports to."""
+    global _current
+    previous, _current = _current, profiler
+    try:
+        yield profiler
+    finally:
+        _current = previous
+
+
+def stage(profiler: Profiler | None, name: str, items: int = 0) -> ContextManager[Any]:
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, items)
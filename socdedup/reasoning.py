@@ -4,6 +4,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from math import ceil
 
+from socdedup.aggregates import AlertAggregates
+from socdedup.columnar import aggregate_alerts
 from socdedup.blast_radius import BlastRadius
 from socdedup.models import Alert
 
@@ -51,46 +53,31 @@ def _window_minutes(start: datetime, end: datetime) -> int:
     return max(1, minutes)
 
 
-def _has_credential_spray_indicators(alerts: list[Alert]) -> bool:
-    for alert in alerts:
-        if alert.mitre_technique and alert.mitre_technique.startswith("T1110"):
-            return True
-        if "failed login" in alert.alert_type.lower():
-            return True
-    return False
+def _bounds_window(bounds: tuple[datetime, datetime] | None) -> int:
+    if bounds is None:
+        return 0
+    return _window_minutes(bounds[0], bounds[1])
 
 
-def _credential_spray_window(alerts: list[Alert]) -> int:
-    if not alerts:
+def _credential_spray_window(aggregates: AlertAggregates) -> int:
+    if aggregates.first_time is None or aggregates.last_time is None:
         return 0
-    start = min(a.timestamp for a in alerts)
-    end = max(a.timestamp for a in alerts)
-    return _window_minutes(start, end)
+    return _window_minutes(aggregates.first_time, aggregates.last_time)
 
 
-def _lateral_movement_window(alerts: list[Alert], user: str) -> int:
-    user_alerts = [a for a in alerts if a.user == user]
-    if not user_alerts:
-        return 0
-    start = min(a.timestamp for a in user_alerts)
-    end = max(a.timestamp for a in user_alerts)
-    return _window_minutes(start, end)
+def _lateral_movement_window(aggregates: AlertAggregates, user: str) -> int:
+    return _bounds_window(aggregates.user_bounds.get(user))
 
 
-def _technique_window(alerts: list[Alert]) -> int:
-    tech_alerts = [a for a in alerts if a.mitre_technique]
-    if not tech_alerts:
-        return 0
-    start = min(a.timestamp for a in tech_alerts)
-    end = max(a.timestamp for a in tech_alerts)
-    return _window_minutes(start, end)
+def _technique_window(aggregates: AlertAggregates) -> int:
+    return _bounds_window(aggregates.technique_bounds)
 
 
-def derive_signals(alerts: list[Alert], blast: BlastRadius) -> ReasoningSignals:
-    source_ips = len({a.source_ip for a in alerts if a.source_ip})
-    users = len({a.user for a in alerts if a.user})
-    credential_window = _credential_spray_window(alerts)
-    credential_indicator = _has_credential_spray_indicators(alerts)
+def signals_from_aggregates(aggregates: AlertAggregates, blast: BlastRadius) -> ReasoningSignals:
+    source_ips = len(aggregates.ips)
+    users = len(aggregates.users)
+    credential_window = _credential_spray_window(aggregates)
+    credential_indicator = aggregates.credential_indicator
     credential_spray_pattern = CredentialSprayPattern(
         detected=users >= 5 and source_ips <= 2 and credential_indicator,
         source_ips=source_ips,
@@ -98,21 +85,11 @@ def derive_signals(alerts: list[Alert], blast: BlastRadius) -> ReasoningSignals:
         window_minutes=credential_window,
     )
 
-    user_hosts: dict[str, set[str]] = {}
-    for alert in alerts:
-        if not alert.user or not alert.host:
-            continue
-        user_hosts.setdefault(alert.user, set()).add(alert.host)
-
-    best_user: str | None = None
-    best_hosts = 0
-    for user, hosts in user_hosts.items():
-        if len(hosts) > best_hosts:
-            best_hosts = len(hosts)
-            best_user = user
-
-    technique_t1021 = 1 if any(t.startswith("T1021") for t in blast.techniques) else 0
-    lateral_window = _lateral_movement_window(alerts, best_user) if best_user else 0
+    best_user = aggregates.lateral_user
+    best_hosts = aggregates.lateral_hosts
+
+    technique_t1021 = 1 if aggregates.lateral_t1021 else 0
+    lateral_window = _lateral_movement_window(aggregates, best_user) if best_user else 0
     lateral_movement_pattern = LateralMovementPattern(
         detected=best_hosts >= 3
         and (len(blast.unique_users) == 1 or technique_t1021 == 1),
@@ -126,7 +103,7 @@ def derive_signals(alerts: list[Alert], blast: BlastRadius) -> ReasoningSignals:
     technique_progression = TechniqueProgression(
         detected=technique_count >= 2,
         techniques=technique_count,
-        window_minutes=_technique_window(alerts),
+        window_minutes=_technique_window(aggregates),
     )
 
     privileged_context = PrivilegedContext(
@@ -140,3 +117,7 @@ def derive_signals(alerts: list[Alert], blast: BlastRadius) -> ReasoningSignals:
         technique_progression=technique_progression,
         privileged_context=privileged_context,
     )
+
+
+def derive_signals(alerts: list[Alert], blast: BlastRadius) -> ReasoningSignals:
+    return signals_from_aggregates(aggregate_alerts(alerts), blast)
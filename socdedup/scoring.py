@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from socdedup.batch import MICROSECOND, epoch_micros, np
+
+NUMPY_AVAILABLE = np is not None
+# Below this many clusters to score, the per-call array setup costs more
+# than the Python loop it replaces.
+BATCH_MIN_CANDIDATES = 256
+
+_INITIAL_SLOTS = 1024
+
+
+class ArrayScorer:
+    """Latest alert times of the active clusters in NumPy arrays.
+
+    Clusters live in reusable slots; entity membership comes from the
+    engine's posting lists, which are scattered into a dense score vector
+    per alert. ``best`` then picks the highest score, ties going to the
+    lowest ordinal exactly as the pure-Python scans do.
+    """
+
+    def __init__(self, time_window: timedelta) -> None:
+        assert np is not None
+        self.window = time_window // MICROSECOND
+        self._latest = np.zeros(_INITIAL_SLOTS, dtype=np.int64)
+        self._ordinals = np.full(_INITIAL_SLOTS, -1, dtype=np.int64)
+        self._slots: dict[int, int] = {}
+        self._free: list[int] = []
+        self._used = 0
+        # Latest times moved since the last ``best``. Most alerts never get
+        # scored here, so the array is only brought up to date on demand.
+        self._moved: dict[int, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _grow_slots(self) -> None:
+        size = len(self._latest) * 2
+        self._latest = np.resize(self._latest, size)
+        ordinals = np.full(size, -1, dtype=np.int64)
+        ordinals[: self._used] = self._ordinals[: self._used]
+        self._ordinals = ordinals
+
+    def add(self, ordinal: int, latest: datetime) -> None:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._used == len(self._latest):
+                self._grow_slots()
+            slot = self._used
+            self._used += 1
+        self._slots[ordinal] = slot
+        self._ordinals[slot] = ordinal
+        self._latest[slot] = epoch_micros(latest)
+
+    def update(self, ordinal: int, latest: datetime) -> None:
+        self._moved[ordinal] = latest
+
+    def remove(self, ordinal: int) -> None:
+        self._moved.pop(ordinal, None)
+        slot = self._slots.pop(ordinal)
+        self._ordinals[slot] = -1
+        self._free.append(slot)
+
+    def best(
+        self,
+        timestamp: datetime,
+        postings: list[tuple[int, set[int]]],
+        min_entity_score: int | None,
+    ) -> tuple[int, int | None]:
+        """Best active cluster for an alert with these ``postings``.
+
+        With ``min_entity_score`` of None every active cluster competes;
+        otherwise only those whose shared entities reach it, as
+        ``EntityIndex.candidates`` selects them.
+        """
+        if not self._slots:
+            return -1, None
+        if self._moved:
+            for ordinal, latest in self._moved.items():
+                self._latest[self._slots[ordinal]] = epoch_micros(latest)
+            self._moved.clear()
+        used = self._used
+        entity = np.zeros(used, dtype=np.int64)
+        slots = self._slots
+        for weight, owners in postings:
+            # Owners are active clusters, so each has a slot; memory stays
+            # with the clusters open now, not every ordinal handed out.
+            owned = np.fromiter(map(slots.__getitem__, owners), dtype=np.intp, count=len(owners))
+            entity[owned] += weight
+
+        live = self._ordinals[:used] >= 0
+        if min_entity_score is not None:
+            live &= entity >= min_entity_score
+        scores = entity + (np.abs(self._latest[:used] - epoch_micros(timestamp)) <= self.window)
+        scores[~live] = -1
+        best = int(scores.max())
+        if best < 0:
+            return -1, None
+        tied = np.flatnonzero(scores == best)
+        return best, int(self._ordinals[tied].min())
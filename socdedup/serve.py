@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import json
+import logging
+import stat
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+from socdedup.clustering import (
+    ClusterEngine,
+    ClusteringStats,
+    ClusterState,
+    DecisionChange,
+    finalize_cluster,
+)
+from socdedup.ingest import _normalize_alert
+from socdedup.metrics import current_metrics
+from socdedup.models import Alert, Confidence, DecisionReplay
+from socdedup.store import incident_payload
+
+_LOG = logging.getLogger(__name__)
+_MAX_BODY_BYTES = 64 << 20
+_NDJSON_TYPES = {"application/x-ndjson", "application/jsonl", "application/json-lines"}
+_RECENT_CHANGES = 1000
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _decode_alerts(body: bytes, content_type: str) -> list[Alert]:
+    try:
+        if content_type.split(";", 1)[0].strip().lower() in _NDJSON_TYPES:
+            records: Any = [json.loads(line) for line in body.splitlines() if line.strip()]
+        elif body.strip():
+            payload = json.loads(body)
+            if isinstance(payload, dict) and "alerts" in payload:
+                records = payload["alerts"]
+            else:
+                records = payload
+        else:
+            records = []
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+        raise ServiceError(400, f"invalid JSON: {exc}") from exc
+    if not isinstance(records, list):
+        raise ServiceError(400, "JSON payload must be a list of alerts")
+
+    alerts: list[Alert] = []
+    for position, item in enumerate(records):
+        if not isinstance(item, dict):
+            raise ServiceError(400, f"alert {position}: Alert must be an object")
+        try:
+            alerts.append(_normalize_alert(item))
+        except ValueError as exc:
+            raise ServiceError(400, f"alert {position}: {exc}") from exc
+    alerts.sort(key=lambda a: a.timestamp)
+    return alerts
+
+
+@contextmanager
+def _collector_paused() -> Iterator[None]:
+    # A batch allocates several objects per alert and frees almost none of
+    # them, so the cyclic collector would otherwise keep rescanning the
+    # growing incident state while it is ingested.
+    if not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+class IncidentService:
+    """Persistent clustering state behind the ``serve`` endpoints.
+
+    Every accepted batch is normalized as a whole before any alert reaches
+    the engine, so a rejected batch leaves the state untouched. Alerts are
+    clustered in timestamp order within a batch and in arrival order
+    across batches.
+    """
+
+    def __init__(
+        self,
+        time_window: timedelta,
+        min_score: int,
+        retire_after: timedelta | None = None,
+        track_decisions: bool = False,
+        closed_output: TextIO | None = None,
+    ) -> None:
+        self.stats = ClusteringStats()
+        self.changes: deque[DecisionChange] = deque(maxlen=_RECENT_CHANGES)
+        self.engine = ClusterEngine(
+            time_window,
+            min_score,
+            retire_after=retire_after,
+            stats=self.stats,
+            on_change=self.changes.append if track_decisions else None,
+        )
+        self.closed_output = closed_output
+        self.alerts_ingested = 0
+        self._by_id: dict[str, ClusterState] = {}
+
+    def ingest(self, body: bytes, content_type: str = "application/json") -> dict[str, Any]:
+        with _collector_paused():
+            alerts = _decode_alerts(body, content_type)
+            created, closed = self._add_alerts(alerts)
+        self.alerts_ingested += len(alerts)
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.alerts_ingested.inc(len(alerts))
+        return {
+            "accepted": len(alerts),
+            "created": created,
+            "closed": closed,
+            "open_incidents": len(self.engine.clusters),
+        }
+
+    def _add_alerts(self, alerts: list[Alert]) -> tuple[int, int]:
+        engine = self.engine
+        add_alert = engine.add_alert
+        created = 0
+        closed = 0
+        for alert in alerts:
+            counter = engine.counter
+            for cluster in add_alert(alert):
+                self._close(cluster)
+                closed += 1
+            if engine.counter != counter:
+                cluster = engine.clusters[counter - 1]
+                self._by_id[cluster.incident_id] = cluster
+                created += 1
+        return created, closed
+
+    def _close(self, cluster: ClusterState) -> None:
+        del self._by_id[cluster.incident_id]
+        if self.closed_output is not None:
+            payload = incident_payload(finalize_cluster(cluster))
+            self.closed_output.write(json.dumps(payload, sort_keys=True) + "\n")
+            self.closed_output.flush()
+
+    def _assessment(
+        self, cluster: ClusterState
+    ) -> tuple[Confidence, list[str], DecisionReplay]:
+        # Without decision tracking the stored assessment may be stale.
+        if cluster.assessment is None or self.engine.on_change is None:
+            cluster.reassess()
+        assert cluster.assessment is not None
+        return cluster.assessment
+
+    def _cluster(self, incident_id: str) -> ClusterState:
+        cluster = self._by_id.get(incident_id)
+        if cluster is None:
+            raise ServiceError(404, f"incident not found: {incident_id}")
+        return cluster
+
+    def open_incidents(self) -> dict[str, Any]:
+        incidents = []
+        for cluster in self._by_id.values():
+            confidence, _, decision_replay = self._assessment(cluster)
+            incidents.append(
+                {
+                    "incident_id": cluster.incident_id,
+                    "alerts": cluster.aggregates.count,
+                    "hosts": len(cluster.hosts),
+                    "users": len(cluster.users),
+                    "ips": len(cluster.ips),
+                    "techniques": len(cluster.techniques),
+                    "confidence": confidence.value,
+                    "action": decision_replay.action,
+                }
+            )
+        return {"incidents": incidents}
+
+    def show(self, incident_id: str) -> dict[str, Any]:
+        cluster = self._cluster(incident_id)
+        confidence, reasoning, _ = self._assessment(cluster)
+        return {
+            "incident_id": cluster.incident_id,
+            "confidence": confidence.value,
+            "reasoning": reasoning,
+            "blast_radius": {
+                "hosts": len(cluster.hosts),
+                "users": len(cluster.users),
+                "privileged_users": len(cluster.aggregates.privileged_users),
+            },
+        }
+
+    def replay(self, incident_id: str) -> dict[str, Any]:
+        _, _, decision_replay = self._assessment(self._cluster(incident_id))
+        return decision_replay.model_dump(mode="json")
+
+    def recent_changes(self) -> dict[str, Any]:
+        return {"changes": [change.as_dict() for change in self.changes]}
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "alerts_ingested": self.alerts_ingested,
+            "open_incidents": len(self.engine.clusters),
+            "retired_incidents": self.stats.retired_incidents,
+            "late_alerts": self.stats.late_alerts,
+        }
+
+    def dispatch(
+        self,
+        method: str,
+        target: str,
+        body: bytes = b"",
+        content_type: str = "application/json",
+    ) -> dict[str, Any]:
+        parts = [part for part in target.split("?", 1)[0].split("/") if part]
+        if parts == ["alerts"]:
+            if method != "POST":
+                raise ServiceError(405, "use POST for /alerts")
+            return self.ingest(body, content_type)
+        if method != "GET":
+            raise ServiceError(405, f"use GET for {target}")
+        if parts == ["status"]:
+            return self.status()
+        if parts == ["changes"]:
+            return self.recent_changes()
+        if parts == ["incidents"]:
+            return self.open_incidents()
+        if len(parts) == 2 and parts[0] == "incidents":
+            return self.show(parts[1])
+        if len(parts) == 3 and parts[0] == "incidents" and parts[2] == "replay":
+            return self.replay(parts[1])
+        raise ServiceError(404, f"no route for {target}")
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> tuple[str, str, dict[str, str], bytes] | None:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError as exc:
+        raise ServiceError(400, "malformed request line") from exc
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError as exc:
+        raise ServiceError(400, "invalid Content-Length") from exc
+    if length > _MAX_BODY_BYTES:
+        raise ServiceError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status: int, payload: dict[str, Any], keep_alive: bool) -> bytes:
+    body = json.dumps(payload, sort_keys=True).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def _handle_connection(
+    service: IncidentService,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                content_type = headers.get("content-type", "application/json")
+                status, payload = 200, service.dispatch(method, target, body, content_type)
+            except ServiceError as exc:
+                status, payload = exc.status, {"error": str(exc)}
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception:
+                _LOG.exception("request failed")
+                status, payload = 500, {"error": "internal error"}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def run_server(
+    service: IncidentService,
+    host: str = "127.0.0.1",
+    port: int = 8787,
+    unix_socket: str | None = None,
+    ready: asyncio.Future[Any] | None = None,
+) -> None:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await _handle_connection(service, reader, writer)
+
+    if unix_socket:
+        path = Path(unix_socket)
+        try:
+            mode = path.lstat().st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            # Only a stale socket from an earlier run may be replaced.
+            if not stat.S_ISSOCK(mode):
+                raise ValueError(f"refusing to replace {path}: not a socket")
+            path.unlink()
+        server = await asyncio.start_unix_server(handle, path=unix_socket)
+    else:
+        server = await asyncio.start_server(handle, host=host, port=port)
+    async with server:
+        if ready is not None:
+            # Resolves to the bound address, so port=0 can be used in tests.
+            ready.set_result(server.sockets[0].getsockname())
+        await server.serve_forever()
@@ -0,0 +1,411 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from socdedup.clustering import (
+    _TIME_BONUS,
+    ClusterEngine,
+    ClusterState,
+    ClusteringStats,
+    EntityIndex,
+    _best_cluster_exhaustive,
+    _best_cluster_indexed,
+    _finalize_all,
+    cluster_alerts,
+)
+from socdedup.models import Alert, Incident
+
+
+@dataclass(frozen=True)
+class BoundaryReport:
+    timestamp: datetime
+    clean: bool
+    straddling: int = 0
+    mismatched: int = 0
+    hidden_matches: int = 0
+
+    @property
+    def may_differ(self) -> bool:
+        return not self.clean and (self.mismatched > 0 or self.hidden_matches > 0)
+
+    def describe(self) -> str:
+        when = self.timestamp.isoformat()
+        if self.clean:
+            return f"{when}: clean cut, identical to sequential"
+        verdict = "may differ" if self.may_differ else "no divergence detected"
+        return (
+            f"{when}: {verdict} (straddling={self.straddling} "
+            f"mismatched={self.mismatched} hidden_matches={self.hidden_matches})"
+        )
+
+
+@dataclass
+class ShardReport:
+    """Where a sharded run can differ from sequential clustering.
+
+    At a clean cut every cluster has retired and been forgotten before the
+    next shard starts, so nothing crosses it. Elsewhere the next shard only
+    sees the overlap: ``mismatched`` counts its clusters whose overlap
+    alerts were grouped differently by the previous shard and
+    ``hidden_matches`` counts its new clusters whose first alert would have
+    scored ``min_score`` against an earlier cluster as a whole, not just
+    the part of it inside the overlap.
+    Both are first-order checks; stats are approximate at such boundaries.
+    """
+
+    mode: str
+    shards: int
+    boundaries: list[BoundaryReport] = field(default_factory=list)
+    note: str = ""
+
+    @property
+    def exact(self) -> bool:
+        return all(boundary.clean for boundary in self.boundaries)
+
+    def lines(self) -> list[str]:
+        lines = [f"mode={self.mode} shards={self.shards}"]
+        if self.note:
+            lines.append(self.note)
+        lines.extend(boundary.describe() for boundary in self.boundaries)
+        return lines
+
+
+@dataclass
+class _ShardResult:
+    # Global alert positions per cluster, in the order the engine released
+    # the clusters.
+    clusters: list[list[int]]
+    stats: ClusteringStats
+    # How many of ``clusters`` were still open at the end of the shard.
+    open_at_end: int = 0
+
+
+def _cluster_shard(
+    alerts: list[Alert],
+    offset: int,
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None,
+    retire_at_end: bool,
+) -> _ShardResult:
+    stats = ClusteringStats()
+    engine = ClusterEngine(time_window, min_score, retire_after=retire_after, stats=stats)
+    positions: dict[int, int] = {}
+    released: list[ClusterState] = []
+    for position, alert in enumerate(alerts):
+        positions[id(alert)] = offset + position
+        released.extend(engine.add_alert(alert))
+    open_at_end = len(engine.clusters)
+    if retire_at_end and retire_after is not None and engine.last_timestamp is not None:
+        # The next shard starts more than two horizons later, so its first
+        # alert retires everything still open, in recency order.
+        released.extend(engine._retire(engine.last_timestamp + retire_after + timedelta.resolution))
+    released.extend(engine.drain())
+    clusters = [[positions[id(alert)] for alert in cluster.alerts] for cluster in released]
+    return _ShardResult(clusters, stats, open_at_end)
+
+
+def _late_at_cut(
+    alert: Alert, closed: list[ClusterState], time_window: timedelta, min_score: int
+) -> bool:
+    # The first alert after a cut is the only one that still sees the
+    # clusters the cut retired, and nothing is open yet to beat them.
+    clusters = dict(enumerate(closed))
+    if min_score <= _TIME_BONUS:
+        score, ordinal = _best_cluster_exhaustive(alert, clusters, time_window)
+    else:
+        index = EntityIndex()
+        for ordinal, cluster in clusters.items():
+            index.add_cluster(ordinal, cluster)
+        score, ordinal = _best_cluster_indexed(alert, clusters, index, time_window, min_score)
+    return ordinal is not None and score >= min_score
+
+
+def _run_shards(
+    ordered: list[Alert],
+    ranges: list[tuple[int, int]],
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None,
+    retire_at_end: bool,
+    workers: int,
+) -> list[_ShardResult]:
+    arguments = [
+        (
+            ordered[start:end],
+            start,
+            time_window,
+            min_score,
+            retire_after,
+            retire_at_end and position < len(ranges) - 1,
+        )
+        for position, (start, end) in enumerate(ranges)
+    ]
+    if workers <= 1:
+        return [_cluster_shard(*args) for args in arguments]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_cluster_shard, *args) for args in arguments]
+        return [future.result() for future in futures]
+
+
+def _clean_cuts(ordered: list[Alert], shards: int, gap: timedelta) -> list[int]:
+    gaps = [
+        position
+        for position in range(1, len(ordered))
+        if ordered[position].timestamp - ordered[position - 1].timestamp > gap
+    ]
+    cuts: list[int] = []
+    for shard in range(1, shards):
+        target = shard * len(ordered) // shards
+        slot = bisect_left(gaps, target)
+        nearby = [gaps[i] for i in (slot - 1, slot) if 0 <= i < len(gaps)]
+        if nearby:
+            cut = min(nearby, key=lambda position: abs(position - target))
+            if cut not in cuts:
+                cuts.append(cut)
+    return sorted(cuts)
+
+
+def _even_cuts(ordered: list[Alert], shards: int) -> list[int]:
+    timestamps = [alert.timestamp for alert in ordered]
+    cuts: list[int] = []
+    for shard in range(1, shards):
+        # Never split alerts sharing a timestamp across shards.
+        cut = bisect_left(timestamps, timestamps[shard * len(ordered) // shards])
+        if 0 < cut and cut not in cuts:
+            cuts.append(cut)
+    return cuts
+
+
+def _state(ordered: list[Alert], positions: list[int], incident_id: str = "") -> ClusterState:
+    state = ClusterState(incident_id=incident_id)
+    for position in positions:
+        state.add_alert(ordered[position])
+    return state
+
+
+def _merge_stats(stats: ClusteringStats | None, results: list[_ShardResult]) -> None:
+    if stats is None:
+        return
+    stats.retired_incidents += sum(result.stats.retired_incidents for result in results)
+    stats.late_alerts += sum(result.stats.late_alerts for result in results)
+    stats.peak_active_clusters = max(
+        [stats.peak_active_clusters] + [result.stats.peak_active_clusters for result in results]
+    )
+
+
+def _number(clusters: list[list[int]]) -> dict[int, str]:
+    # Incidents are numbered in creation order, i.e. by their first alert.
+    order = sorted(range(len(clusters)), key=lambda position: clusters[position][0])
+    return {position: f"INC-{number:04d}" for number, position in enumerate(order, start=1)}
+
+
+def _exact(
+    ordered: list[Alert],
+    shards: int,
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta,
+    workers: int,
+    stats: ClusteringStats | None,
+) -> tuple[list[ClusterState], ShardReport] | None:
+    cuts = _clean_cuts(ordered, shards, 2 * retire_after)
+    if not cuts:
+        return None
+    bounds = [0, *cuts, len(ordered)]
+    ranges = list(zip(bounds, bounds[1:]))
+    results = _run_shards(
+        ordered, ranges, time_window, min_score, retire_after, True, min(workers, len(ranges))
+    )
+    _merge_stats(stats, results)
+    released = [cluster for result in results for cluster in result.clusters]
+    names = _number(released)
+    states = [_state(ordered, cluster, names[i]) for i, cluster in enumerate(released)]
+    if stats is not None:
+        end = 0
+        for result, cut in zip(results, cuts):
+            end += len(result.clusters)
+            closed = states[end - result.open_at_end : end]
+            stats.late_alerts += _late_at_cut(ordered[cut], closed, time_window, min_score)
+    report = ShardReport(
+        mode="exact",
+        shards=len(ranges),
+        boundaries=[BoundaryReport(ordered[cut].timestamp, clean=True) for cut in cuts],
+    )
+    return states, report
+
+
+def _sharded(
+    ordered: list[Alert],
+    shards: int,
+    time_window: timedelta,
+    min_score: int,
+    retire_after: timedelta | None,
+    overlap: timedelta,
+    workers: int,
+    stats: ClusteringStats | None,
+) -> tuple[list[ClusterState], ShardReport]:
+    cuts = _even_cuts(ordered, shards)
+    timestamps = [alert.timestamp for alert in ordered]
+    starts = [0] + [bisect_left(timestamps, timestamps[cut] - overlap) for cut in cuts]
+    cores = [0, *cuts]
+    ends = [*cuts, len(ordered)]
+    results = _run_shards(
+        ordered,
+        list(zip(starts, ends)),
+        time_window,
+        min_score,
+        retire_after,
+        False,
+        min(workers, len(cores)),
+    )
+    _merge_stats(stats, results)
+
+    merger = _Merger(ordered, time_window, min_score, retire_after)
+    report = ShardReport(mode="sharded", shards=len(cores))
+    for shard, result in enumerate(results):
+        boundary = merger.merge(result.clusters, starts[shard], cores[shard])
+        if shard:
+            report.boundaries.append(boundary)
+
+    order = sorted(range(len(merger.states)), key=lambda position: merger.members[position][0])
+    states = [merger.states[position] for position in order]
+    for number, state in enumerate(states, start=1):
+        state.incident_id = f"INC-{number:04d}"
+    return states, report
+
+
+class _Merger:
+    """Stitches shard clusters onto the clusters of the shards before them."""
+
+    def __init__(
+        self,
+        ordered: list[Alert],
+        time_window: timedelta,
+        min_score: int,
+        retire_after: timedelta | None,
+    ) -> None:
+        self.ordered = ordered
+        self.time_window = time_window
+        self.min_score = min_score
+        self.retire_after = retire_after
+        self.members: list[list[int]] = []
+        self.states: list[ClusterState] = []
+        self.owner = [-1] * len(ordered)
+        # Every merged cluster as the previous shards left it.
+        self.index = EntityIndex()
+
+    def merge(self, clusters: list[list[int]], start: int, core: int) -> BoundaryReport:
+        overlap_groups: dict[int, set[int]] = {}
+        for position in range(start, core):
+            overlap_groups.setdefault(self.owner[position], set()).add(position)
+
+        straddling = mismatched = hidden_matches = 0
+        grown: list[tuple[int, list[int]]] = []
+        for cluster in clusters:
+            warm = [position for position in cluster if position < core]
+            tail = [position for position in cluster if position >= core]
+            if not tail:
+                continue
+            if warm:
+                straddling += 1
+                target = self.owner[warm[0]]
+                owners = {self.owner[position] for position in warm}
+                if owners != {target} or set(warm) != overlap_groups.get(target):
+                    mismatched += 1
+            else:
+                if self._hidden_match(self.ordered[tail[0]]):
+                    hidden_matches += 1
+                target = len(self.members)
+                self.members.append([])
+                self.states.append(ClusterState(incident_id=""))
+            grown.append((target, tail))
+
+        # Index only once the whole shard is placed, so each founder is
+        # checked against the state at the boundary.
+        for target, tail in grown:
+            state = self.states[target]
+            for position in tail:
+                alert = self.ordered[position]
+                self.owner[position] = target
+                state.add_alert(alert)
+                self.index.add(target, alert)
+            self.members[target].extend(tail)
+        return BoundaryReport(
+            self.ordered[core].timestamp,
+            clean=False,
+            straddling=straddling,
+            mismatched=mismatched,
+            hidden_matches=hidden_matches,
+        )
+
+    def _hidden_match(self, alert: Alert) -> bool:
+        # The shard only saw the overlap, so its founders may belong to an
+        # earlier cluster whose matching entities came before it.
+        for position, entity_score in self.index.candidates(
+            alert, self.min_score - _TIME_BONUS
+        ).items():
+            latest = self.states[position].latest_time
+            assert latest is not None
+            if self.retire_after is not None and latest.timestamp < alert.timestamp - self.retire_after:
+                continue
+            score = entity_score
+            if abs(alert.timestamp - latest.timestamp) <= self.time_window:
+                score += _TIME_BONUS
+            if score >= self.min_score:
+                return True
+        return False
+
+
+def cluster_sharded(
+    alerts: Iterable[Alert],
+    time_window: timedelta,
+    min_score: int,
+    shards: int,
+    retire_after: timedelta | None = None,
+    overlap: timedelta | None = None,
+    exact: bool = False,
+    workers: int = 1,
+    stats: ClusteringStats | None = None,
+) -> tuple[list[Incident], ShardReport]:
+    """Cluster time shards of the stream in parallel worker processes.
+
+    Each shard after the first also replays ``overlap`` (at least
+    ``time_window``) worth of preceding alerts, and its clusters that take
+    up those alerts are attached to the earlier cluster owning them. With
+    ``exact`` the stream is only cut at quiet gaps longer than twice
+    ``retire_after``, which cannot change the result; without such gaps it
+    runs sequentially.
+    """
+    overlap = time_window if overlap is None else overlap
+    if overlap < time_window:
+        raise ValueError("shard overlap must be at least the time window")
+    if shards < 1:
+        raise ValueError("shards must be at least 1")
+    ordered = sorted(alerts, key=lambda alert: alert.timestamp)
+
+    result: tuple[list[ClusterState], ShardReport] | None = None
+    note = ""
+    if shards > 1 and len(ordered) > 1:
+        if not exact:
+            result = _sharded(
+                ordered, shards, time_window, min_score, retire_after, overlap, workers, stats
+            )
+        elif retire_after is None:
+            note = "exact mode needs --retire-after to find safe cuts; ran sequentially"
+        else:
+            result = _exact(ordered, shards, time_window, min_score, retire_after, workers, stats)
+            if result is None:
+                note = "no gap longer than twice the retirement horizon; ran sequentially"
+
+    if result is None:
+        incidents = cluster_alerts(
+            ordered, time_window, min_score, retire_after, stats, presorted=True, workers=workers
+        )
+        return incidents, ShardReport(mode="sequential", shards=1, note=note)
+    states, report = result
+    return list(_finalize_all(states, workers)), report
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import glob
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from itertools import accumulate, islice
+from operator import attrgetter, le
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from socdedup.ingest import ingest_csv, ingest_json, ingest_jsonl, iter_json, iter_jsonl
+from socdedup.models import Alert
+
+ALERT_SUFFIXES = {".json", ".jsonl", ".ndjson", ".csv"}
+
+_GLOB_CHARS = "*?["
+_timestamp = attrgetter("timestamp")
+
+
+def load_alerts(path: Path, workers: int | None = None) -> list[Alert]:
+    """Read one alert file, picking the parser by suffix."""
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        return ingest_json(path)
+    if suffix == ".csv":
+        return ingest_csv(path, workers=workers)
+    if suffix in {".jsonl", ".ndjson"}:
+        return ingest_jsonl(path, workers=workers)
+    raise ValueError(f"unsupported file type: {path}")
+
+
+def stream_alerts(path: Path) -> Iterable[Alert]:
+    """Alerts of one file, lazily where the format allows it."""
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        return iter_json(path)
+    if suffix in {".jsonl", ".ndjson"}:
+        return iter_jsonl(path)
+    return load_alerts(path)
+
+
+def _excluded(path: Path, exclude: list[Path]) -> bool:
+    resolved = path.resolve()
+    return any(resolved == skipped or skipped in resolved.parents for skipped in exclude)
+
+
+def _directory_files(directory: Path, exclude: list[Path]) -> list[Path]:
+    return sorted(
+        path
+        for path in directory.rglob("*")
+        if path.is_file()
+        and path.suffix.lower() in ALERT_SUFFIXES
+        and not _excluded(path, exclude)
+    )
+
+
+def expand_inputs(arguments: Iterable[str], exclude: Iterable[Path] = ()) -> list[Path]:
+    """Alert files named by paths, directories and glob patterns.
+
+    Directories contribute their alert files recursively and patterns
+    their matches, each in sorted order, leaving out anything under
+    ``exclude`` such as the tool's own output. Files keep argument order
+    and a file named twice is read once.
+    """
+    skipped = [path.resolve() for path in exclude]
+    found: dict[Path, None] = {}
+    for argument in arguments:
+        path = Path(argument)
+        if path.is_dir():
+            matches = _directory_files(path, skipped)
+        elif not path.exists() and any(char in argument for char in _GLOB_CHARS):
+            matches = []
+            for match in map(Path, sorted(glob.glob(argument, recursive=True))):
+                if _excluded(match, skipped):
+                    continue
+                if match.is_dir():
+                    matches.extend(_directory_files(match, skipped))
+                elif match.suffix.lower() in ALERT_SUFFIXES:
+                    matches.append(match)
+        elif path.suffix.lower() in ALERT_SUFFIXES:
+            matches = [path]
+        else:
+            raise ValueError(f"unsupported file type: {path}")
+        if not matches:
+            raise ValueError(f"no alert files found: {argument}")
+        found.update(dict.fromkeys(matches))
+    return list(found)
+
+
+@dataclass
+class SourceFile:
+    """One input file's alerts in timestamp order.
+
+    ``order`` holds each alert's position in the file when the file had
+    to be sorted, and is None when it was already in order.
+    """
+
+    path: Path
+    alerts: list[Alert]
+    order: list[int] | None = None
+
+    def file_positions(self) -> Iterable[int]:
+        return range(len(self.alerts)) if self.order is None else self.order
+
+
+def _read_source(path: Path, workers: int | None = None) -> SourceFile:
+    try:
+        alerts = load_alerts(path, workers=workers)
+    except ValueError as exc:
+        raise ValueError(f"{path}: {exc}") from exc
+    times = [alert.timestamp for alert in alerts]
+    if all(map(le, times, islice(times, 1, None))):
+        return SourceFile(path, alerts)
+    # A stable sort of one file; the merge keeps it stable across files.
+    order = sorted(range(len(alerts)), key=times.__getitem__)
+    return SourceFile(path, [alerts[index] for index in order], order)
+
+
+def read_sources(paths: list[Path], workers: int | None = None) -> list[SourceFile]:
+    """Read alert files, several at once across a process pool.
+
+    Each file is checked for timestamp order as it is read and sorted on
+    its own only when it is not. Parse errors name the file they are in.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(paths) <= 1:
+        return [_read_source(path, workers) for path in paths]
+    # The pool already spans the files; large files must not start pools
+    # of their own inside its workers.
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(partial(_read_source, workers=1), paths))
+
+
+def merge_sources(sources: list[SourceFile]) -> Iterator[Alert]:
+    """Alerts of all files in timestamp order, merged lazily.
+
+    Equal timestamps keep file and argument order, so the result matches
+    a stable sort of the files concatenated.
+    """
+    return heapq.merge(*(source.alerts for source in sources), key=_timestamp)
+
+
+def source_positions(sources: list[SourceFile], positions: dict[int, int]) -> None:
+    """Record each alert's position in the files concatenated."""
+    offset = 0
+    for source in sources:
+        for index, alert in zip(source.file_positions(), source.alerts):
+            positions[id(alert)] = offset + index
+        offset += len(source.alerts)
+
+
+def merge_streams(
+    paths: list[Path], positions: dict[int, int] | None = None
+) -> Iterator[Alert]:
+    """Merge files already in timestamp order without loading them first.
+
+    With ``positions``, alert positions in the files concatenated are
+    recorded once the last file has been read.
+    """
+    counts = [0] * len(paths)
+    located: dict[int, tuple[int, int]] = {}
+
+    def numbered(number: int, path: Path) -> Iterator[Alert]:
+        try:
+            for index, alert in enumerate(stream_alerts(path)):
+                if positions is not None:
+                    located[id(alert)] = (number, index)
+                counts[number] = index + 1
+                yield alert
+        except ValueError as exc:
+            raise ValueError(f"{path}: {exc}") from exc
+
+    yield from heapq.merge(
+        *(numbered(number, path) for number, path in enumerate(paths)), key=_timestamp
+    )
+    if positions is not None:
+        offsets = list(accumulate(counts, initial=0))
+        for key, (number, index) in located.items():
+            positions[key] = offsets[number] + index
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import sqlite3
+import struct
+from enum import Enum
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Mapping
+
+from socdedup.models import FoldedAlert, Incident, occurrences
+
+_SCHEMA_VERSION = 1
+_WRITE_BATCH_SIZE = 5000
+_SCHEMA = """
+CREATE TABLE incidents (
+    incident_id TEXT PRIMARY KEY,
+    confidence TEXT NOT NULL,
+    alerts INTEGER NOT NULL,
+    payload TEXT NOT NULL
+) WITHOUT ROWID
+"""
+_SLIM_ALERT_FIELDS = frozenset(FoldedAlert.model_fields) - {"raw"}
+_COMPACT_FIELDS = {"alert_ids", "alert_count"}
+_INDEX_MAGIC = b"SDIDX001"
+# magic, JSON size, JSON mtime_ns, entry count, incident_id width
+_INDEX_HEADER = struct.Struct("<8sQqQI")
+_INDEX_SPAN = struct.Struct("<QQ")
+
+
+class OutputFormat(str, Enum):
+    JSON = "json"
+    JSONL = "jsonl"
+
+
+class AlertsMode(str, Enum):
+    FULL = "full"
+    IDS = "ids"
+    NONE = "none"
+
+
+def incident_payload(
+    incident: Incident,
+    alerts: AlertsMode = AlertsMode.FULL,
+    drop_raw: bool = False,
+    positions: Mapping[int, int] | None = None,
+) -> dict[str, Any]:
+    """JSON-mode dict for one incident in the requested alerts mode.
+
+    ``ids`` replaces the embedded alerts with their input positions, looked
+    up in ``positions`` by ``id(alert)``. ``drop_raw`` strips ``raw`` and
+    any extra fields from embedded alerts.
+    """
+    if alerts == AlertsMode.FULL:
+        if drop_raw:
+            return incident.model_dump(
+                mode="json",
+                include={
+                    name: ({"__all__": _SLIM_ALERT_FIELDS} if name == "alerts" else True)
+                    for name in Incident.model_fields
+                    if name not in _COMPACT_FIELDS
+                },
+            )
+        return incident.model_dump(mode="json", exclude=_COMPACT_FIELDS)
+
+    payload = incident.model_dump(mode="json", exclude={"alerts", *_COMPACT_FIELDS})
+    payload["alert_count"] = sum(occurrences(alert) for alert in incident.alerts)
+    if alerts == AlertsMode.IDS:
+        if positions is None:
+            raise ValueError("alert positions are required for --alerts ids")
+        payload["alert_ids"] = [positions[id(alert)] for alert in incident.alerts]
+    return payload
+
+
+class IncidentStore:
+    """SQLite file keyed by ``incident_id``.
+
+    ``write`` rebuilds the whole store next to the target and swaps it in,
+    so readers never see a half-written run. Lookups fetch and validate a
+    single row.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def write(self, payloads: Iterable[dict[str, Any]]) -> int:
+        with self.writer() as writer:
+            for payload in payloads:
+                writer.add(payload)
+        return writer.written
+
+    def writer(self) -> StoreWriter:
+        """Add incidents one at a time; the store is swapped in on a clean exit."""
+        return StoreWriter(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self.path.exists():
+            raise FileNotFoundError(self.path)
+        connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != _SCHEMA_VERSION:
+            connection.close()
+            raise ValueError(f"unsupported incident store version {version}: {self.path}")
+        return connection
+
+    def get(self, incident_id: str) -> Incident | None:
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT payload FROM incidents WHERE incident_id = ?", (incident_id,)
+            ).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        return Incident.model_validate_json(row[0])
+
+    def __len__(self) -> int:
+        connection = self._connect()
+        try:
+            (count,) = connection.execute("SELECT COUNT(*) FROM incidents").fetchone()
+        finally:
+            connection.close()
+        return count
+
+
+class StoreWriter:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.staging = path.with_name(path.name + ".tmp")
+        self.written = 0
+        self._rows: list[tuple[str, str, int, str]] = []
+        self._connection: sqlite3.Connection | None = None
+
+    def __enter__(self) -> StoreWriter:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.staging.unlink(missing_ok=True)
+        connection = self._connection = sqlite3.connect(self.staging)
+        try:
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.execute(_SCHEMA)
+        except BaseException:
+            self._discard()
+            raise
+        return self
+
+    def add(self, payload: dict[str, Any]) -> None:
+        self._rows.append(
+            (
+                payload["incident_id"],
+                payload["confidence"],
+                payload.get("alert_count", len(payload.get("alerts", ()))),
+                json.dumps(payload, sort_keys=True, separators=(",", ":")),
+            )
+        )
+        if len(self._rows) >= _WRITE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        assert self._connection is not None
+        with self._connection:
+            self._connection.executemany("INSERT INTO incidents VALUES (?, ?, ?, ?)", self._rows)
+        self.written += len(self._rows)
+        self._rows.clear()
+
+    def _discard(self) -> None:
+        assert self._connection is not None
+        self._connection.close()
+        self.staging.unlink(missing_ok=True)
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        assert self._connection is not None
+        if exc_type is not None:
+            self._discard()
+            return
+        try:
+            self._flush()
+            self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        except BaseException:
+            self._discard()
+            raise
+        self._connection.close()
+        os.replace(self.staging, self.path)
+
+
+class StaleIndexError(Exception):
+    pass
+
+
+def index_path_for(json_path: Path) -> Path:
+    return json_path.with_name(json_path.name + ".idx")
+
+
+class IncidentWriter:
+    """Write incidents one at a time as one JSON document (byte-identical
+    to ``json.dump(indent=2, sort_keys=True)``) or as compact JSON Lines,
+    plus a sidecar mapping each incident_id to its byte span.
+
+    Output goes to a staging file that replaces ``path`` on a clean exit.
+    """
+
+    def __init__(self, path: Path, output_format: OutputFormat = OutputFormat.JSON) -> None:
+        self.path = path
+        self.output_format = output_format
+        self.staging = path.with_name(path.name + ".tmp")
+        self._spans: list[tuple[bytes, int, int]] = []
+        self._offset = 0
+        self._handle: BinaryIO | None = None
+
+    def __enter__(self) -> IncidentWriter:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.staging.open("wb")
+        return self
+
+    def add(self, item: dict[str, Any]) -> None:
+        handle = self._handle
+        assert handle is not None
+        key = item["incident_id"].encode("utf-8")
+        if self.output_format == OutputFormat.JSONL:
+            line = json.dumps(item, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            self._spans.append((key, self._offset, len(line)))
+            self._offset += handle.write(line + b"\n")
+            return
+        self._offset += handle.write(b",\n  " if self._spans else b"[\n  ")
+        # Nested lines pick up the list's indentation; string values never
+        # contain a raw newline, so this is byte-identical.
+        text = json.dumps(item, indent=2, sort_keys=True).replace("\n", "\n  ")
+        length = handle.write(text.encode("utf-8"))
+        self._spans.append((key, self._offset, length))
+        self._offset += length
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        handle = self._handle
+        assert handle is not None
+        if exc_type is not None:
+            handle.close()
+            self.staging.unlink(missing_ok=True)
+            return
+        if self.output_format == OutputFormat.JSON:
+            handle.write(b"\n]" if self._spans else b"[]")
+        handle.close()
+        os.replace(self.staging, self.path)
+        self._write_index()
+
+    def _write_index(self) -> None:
+        stat = self.path.stat()
+        spans = sorted(self._spans)
+        width = max((len(key) for key, _, _ in spans), default=0)
+        index = index_path_for(self.path)
+        staging = index.with_name(index.name + ".tmp")
+        with staging.open("wb") as handle:
+            handle.write(
+                _INDEX_HEADER.pack(_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(spans), width)
+            )
+            for key, offset, length in spans:
+                handle.write(key.ljust(width, b"\0"))
+                handle.write(_INDEX_SPAN.pack(offset, length))
+        os.replace(staging, index)
+
+
+def write_incidents(
+    path: Path,
+    payload: Iterable[dict[str, Any]],
+    output_format: OutputFormat = OutputFormat.JSON,
+) -> None:
+    with IncidentWriter(path, output_format) as writer:
+        for item in payload:
+            writer.add(item)
+
+
+class JsonIncidentIndex:
+    """Point lookups into an incidents JSON or JSON Lines file through its
+    sidecar.
+
+    Entries are fixed-width records sorted by incident_id, so a lookup is a
+    binary search over the mmapped sidecar followed by one slice of the
+    mmapped JSON. ``StaleIndexError`` means the caller should scan instead.
+    """
+
+    def __init__(self, json_path: Path) -> None:
+        self.json_path = json_path
+        self.index_path = index_path_for(json_path)
+
+    def get(self, incident_id: str) -> Incident | None:
+        try:
+            with self.index_path.open("rb") as handle:
+                if os.fstat(handle.fileno()).st_size < _INDEX_HEADER.size:
+                    raise StaleIndexError("sidecar index truncated")
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                    span = self._find(index, incident_id.encode("utf-8"))
+        except FileNotFoundError as exc:
+            raise StaleIndexError("sidecar index missing") from exc
+        if span is None:
+            return None
+
+        offset, length = span
+        with self.json_path.open("rb") as handle:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                raw = data[offset : offset + length]
+        try:
+            incident = Incident.model_validate_json(raw)
+        except ValueError as exc:
+            raise StaleIndexError("sidecar index does not match incidents file") from exc
+        if incident.incident_id != incident_id:
+            raise StaleIndexError("sidecar index does not match incidents file")
+        return incident
+
+    def _find(self, index: mmap.mmap, key: bytes) -> tuple[int, int] | None:
+        magic, size, mtime_ns, count, width = _INDEX_HEADER.unpack_from(index, 0)
+        stat = self.json_path.stat()
+        if magic != _INDEX_MAGIC or (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            raise StaleIndexError("sidecar index is stale")
+        record = width + _INDEX_SPAN.size
+        if len(index) != _INDEX_HEADER.size + count * record:
+            raise StaleIndexError("sidecar index truncated")
+        if len(key) > width:
+            return None
+        key = key.ljust(width, b"\0")
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            start = _INDEX_HEADER.size + middle * record
+            probe = index[start : start + width]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return _INDEX_SPAN.unpack_from(index, start + width)
+        return None
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import heapq
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+_BACKGROUND = (
+    ("Port Scan", "T1046", "low"),
+    ("Suspicious DNS Query", "T1071.004", "low"),
+    ("Failed Login", "T1110", "low"),
+    ("Malware Detected", "T1204", "medium"),
+    ("Policy Violation", None, "low"),
+)
+_SPRAY = ("Failed Login", "T1110.003", "medium")
+_LATERAL = ("Remote Service Execution", "T1021.002", "high")
+_BLAST = ("Ransomware Behavior", "T1486", "high")
+
+
+@dataclass
+class WorkloadConfig:
+    """Shape of a synthetic alert stream.
+
+    ``noise`` is the share of background alerts; the rest is split evenly
+    over the injected scenarios, each a short burst around a random time.
+    """
+
+    alerts: int = 10_000
+    seed: int = 0
+    hosts: int = 500
+    users: int = 200
+    ips: int = 300
+    duration: timedelta = timedelta(hours=24)
+    noise: float = 0.95
+    sprays: int = 5
+    lateral: int = 5
+    blast_growth: int = 5
+    start: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "alerts": self.alerts,
+            "seed": self.seed,
+            "hosts": self.hosts,
+            "users": self.users,
+            "ips": self.ips,
+            "duration_seconds": self.duration.total_seconds(),
+            "noise": self.noise,
+            "sprays": self.sprays,
+            "lateral": self.lateral,
+            "blast_growth": self.blast_growth,
+            "start": self.start.isoformat(),
+        }
+
+
+def _alert(
+    timestamp: datetime,
+    kind: tuple[str, str | None, str],
+    host: str,
+    user: str,
+    source_ip: str,
+    dest_ip: str,
+) -> dict[str, Any]:
+    alert_type, technique, severity = kind
+    return {
+        # Fixed precision, so the strings sort like the timestamps.
+        "timestamp": timestamp.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "alert_type": alert_type,
+        "host": host,
+        "user": user,
+        "src_ip": source_ip,
+        "dest_ip": dest_ip,
+        "mitre_technique": technique,
+        "severity": severity,
+    }
+
+
+class _Entities:
+    def __init__(self, config: WorkloadConfig, rng: random.Random) -> None:
+        self.config = config
+        self.rng = rng
+
+    def host(self) -> str:
+        return f"host-{self.rng.randrange(self.config.hosts):05d}"
+
+    def user(self) -> str:
+        # A few accounts are privileged, as in most estates.
+        index = self.rng.randrange(self.config.users)
+        return f"admin_{index:04d}" if index % 50 == 0 else f"user_{index:05d}"
+
+    def ip(self) -> str:
+        index = self.rng.randrange(self.config.ips)
+        return f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+
+def _background(
+    config: WorkloadConfig, count: int, rng: random.Random
+) -> Iterator[dict[str, Any]]:
+    entities = _Entities(config, rng)
+    step = config.duration / max(count, 1)
+    for position in range(count):
+        # One alert per equal slice keeps the stream ordered without a sort.
+        timestamp = config.start + step * (position + rng.random())
+        yield _alert(
+            timestamp,
+            rng.choice(_BACKGROUND),
+            entities.host(),
+            entities.user(),
+            entities.ip(),
+            entities.ip(),
+        )
+
+
+def _spray(config: WorkloadConfig, size: int, rng: random.Random) -> list[dict[str, Any]]:
+    entities = _Entities(config, rng)
+    begin = config.start + config.duration * rng.random()
+    target, attacker = entities.host(), f"203.0.113.{rng.randrange(1, 255)}"
+    return [
+        _alert(
+            begin + timedelta(seconds=5 * step),
+            _SPRAY,
+            target,
+            entities.user(),
+            attacker,
+            "10.0.0.1",
+        )
+        for step in range(size)
+    ]
+
+
+def _lateral(config: WorkloadConfig, size: int, rng: random.Random) -> list[dict[str, Any]]:
+    entities = _Entities(config, rng)
+    begin = config.start + config.duration * rng.random()
+    user, origin = f"admin_{rng.randrange(1000):04d}", entities.ip()
+    return [
+        _alert(
+            begin + timedelta(seconds=30 * step),
+            _LATERAL,
+            entities.host(),
+            user,
+            origin,
+            entities.ip(),
+        )
+        for step in range(size)
+    ]
+
+
+def _blast_growth(config: WorkloadConfig, size: int, rng: random.Random) -> list[dict[str, Any]]:
+    entities = _Entities(config, rng)
+    begin = config.start + config.duration * rng.random()
+    user, origin = entities.user(), entities.ip()
+    # Hosts join faster and faster: the n-th new host after ~sqrt(n) minutes.
+    return [
+        _alert(
+            begin + timedelta(minutes=step**0.5),
+            _BLAST,
+            entities.host(),
+            user,
+            origin,
+            entities.ip(),
+        )
+        for step in range(size)
+    ]
+
+
+def generate_alerts(config: WorkloadConfig) -> Iterator[dict[str, Any]]:
+    """Yield raw alert dicts in timestamp order; the same config always
+    yields the same stream."""
+    rng = random.Random(config.seed)
+    scenarios = [
+        (_spray, config.sprays),
+        (_lateral, config.lateral),
+        (_blast_growth, config.blast_growth),
+    ]
+    total = sum(count for _, count in scenarios)
+    injected = 0 if total == 0 else round(config.alerts * (1 - config.noise))
+    bursts: list[dict[str, Any]] = []
+    made = 0
+    for builder, count in scenarios:
+        for _ in range(count):
+            size = (injected - made) // total
+            total -= 1
+            made += size
+            bursts.extend(builder(config, size, random.Random(rng.getrandbits(64))))
+    bursts.sort(key=lambda alert: alert["timestamp"])
+    background = _background(config, config.alerts - made, random.Random(rng.getrandbits(64)))
+    yield from heapq.merge(background, bursts, key=lambda alert: alert["timestamp"])
+
+
+def write_workload(path: Path, config: WorkloadConfig) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with path.open("w", encoding="utf-8") as handle:
+        for alert in generate_alerts(config):
+            handle.write(json.dumps(alert, separators=(",", ":")) + "\n")
+            written += 1
+    return written
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from socdedup.batch import AlertBatch, StringTable
+from socdedup.clustering import cluster_alerts, cluster_batch
+from socdedup.ingest import _normalize_alert
+from socdedup.models import Alert
+
+
+def _alert(ts, host, user, ip, tech, alert_type="Test"):
+    return Alert(
+        timestamp=ts,
+        host=host,
+        user=user,
+        source_ip=ip,
+        dest_ip=None,
+        alert_type=alert_type,
+        mitre_technique=tech,
+        raw={"id": ts.isoformat()},
+    )
+
+
+def _alerts() -> list[Alert]:
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    alerts = []
+    for i in range(40):
+        alerts.append(
+            _alert(
+                base + timedelta(minutes=(i * 7) % 50, microseconds=i),
+                f"host-{i % 6}",
+                "admin_ops" if i % 5 == 0 else f"user{i % 4}",
+                f"10.0.0.{i % 3}",
+                "T1021" if i % 2 else "T1110.003",
+                "Failed Login" if i % 3 == 0 else "Remote Service",
+            )
+        )
+    return alerts
+
+
+def test_batch_rows_round_trip_to_alerts():
+    alerts = _alerts()
+    batch = AlertBatch.from_alerts(alerts, keep_raw=True)
+
+    assert len(batch) == len(alerts)
+    assert [row.to_alert() for row in batch] == alerts
+    assert len(batch.table) < 6 * len(alerts)
+
+
+def test_batches_share_string_tables():
+    table = StringTable()
+    first = AlertBatch.from_alerts(_alerts()[:20], table=table)
+    size = len(table)
+    second = AlertBatch.from_alerts(_alerts()[20:], table=table)
+
+    assert second.table is first.table
+    assert len(table) <= size + 10
+    assert second.row(0).raw == {}
+
+
+def test_cluster_batch_matches_cluster_alerts():
+    alerts = _alerts()
+    batch = AlertBatch.from_alerts(alerts, keep_raw=True)
+    window = timedelta(minutes=15)
+
+    for min_score in (1, 3, 5):
+        assert cluster_batch(batch, window, min_score) == cluster_alerts(alerts, window, min_score)
+
+
+def test_batch_uses_a_fraction_of_alert_object_memory():
+    records = [
+        {
+            "timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "src_ip": f"10.0.{i % 7}.1",
+            "hostname": f"host-{i % 50}",
+            "username": f"user{i % 20}",
+            "alert_type": "Port Scan",
+            "mitre_technique": "T1046",
+        }
+        for i in range(20000)
+    ]
+
+    tracemalloc.start()
+    try:
+        alerts = [_normalize_alert(dict(record)) for record in records]
+        object_bytes = tracemalloc.get_traced_memory()[0]
+        del alerts
+        tracemalloc.stop()
+        tracemalloc.start()
+        batch = AlertBatch.from_alerts(_normalize_alert(dict(record)) for record in records)
+        columnar_bytes = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert len(batch) == len(records)
+    assert object_bytes >= 5 * columnar_bytes
+
+
+def test_cluster_batch_parallel_finalization_matches_serial():
+    batch = AlertBatch.from_alerts(_alerts(), keep_raw=True)
+    window = timedelta(minutes=15)
+
+    assert cluster_batch(batch, window, 5, workers=2) == cluster_batch(batch, window, 5)
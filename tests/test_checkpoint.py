@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from socdedup.checkpoint import read_checkpoint
+from socdedup.cli import app
+from socdedup.clustering import ClusteringStats, cluster_alerts
+from socdedup.ingest import ingest_json
+from socdedup.models import Alert
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_alerts.json"
+
+
+def _split_sample():
+    alerts = sorted(ingest_json(SAMPLE), key=lambda alert: alert.timestamp)
+    middle = len(alerts) // 2
+    return alerts[:middle], alerts[middle:]
+
+
+@pytest.mark.parametrize("retire_after", [None, timedelta(minutes=20)])
+def test_resume_matches_single_run(tmp_path, retire_after):
+    first, second = _split_sample()
+    window = timedelta(minutes=15)
+    checkpoint = tmp_path / "engine.ckpt"
+
+    expected_stats = ClusteringStats()
+    expected = cluster_alerts(first + second, window, 5, retire_after, expected_stats)
+    first_run = cluster_alerts(first, window, 5, retire_after, checkpoint_to=checkpoint)
+    stats = ClusteringStats()
+    second_run = cluster_alerts(second, window, 5, retire_after, stats, resume_from=checkpoint)
+
+    # Incidents closed in the first run are final; the rest were re-emitted
+    # from the checkpoint by the second run.
+    resumed_ids = {incident.incident_id for incident in second_run}
+    closed = [incident for incident in first_run if incident.incident_id not in resumed_ids]
+    assert sorted(closed + second_run, key=lambda i: i.incident_id) == sorted(
+        expected, key=lambda i: i.incident_id
+    )
+    assert stats == expected_stats
+
+
+def test_checkpoint_round_trips_alert_payloads(tmp_path):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    alert = Alert(
+        timestamp=base,
+        host="host-a",
+        user=None,
+        alert_type="Port Scan",
+        raw={"nested": {"port": [22, 443]}},
+        vendor="edr",
+    )
+    checkpoint = tmp_path / "engine.ckpt"
+    cluster_alerts([alert], timedelta(minutes=15), 5, checkpoint_to=checkpoint)
+
+    snapshot = read_checkpoint(checkpoint)
+    [(ordinal, incident_id, alerts)] = snapshot.clusters
+    assert (ordinal, incident_id, snapshot.counter) == (0, "INC-0001", 2)
+    assert alerts == [alert]
+    assert snapshot.last_timestamp == base
+
+
+def test_resume_rejects_mismatched_or_older_input(tmp_path):
+    first, second = _split_sample()
+    checkpoint = tmp_path / "engine.ckpt"
+    cluster_alerts(second, timedelta(minutes=15), 5, checkpoint_to=checkpoint)
+
+    with pytest.raises(ValueError, match="different clustering options"):
+        cluster_alerts(first, timedelta(minutes=15), 3, resume_from=checkpoint)
+    with pytest.raises(ValueError, match="predate the checkpoint"):
+        cluster_alerts(first, timedelta(minutes=15), 5, resume_from=checkpoint)
+
+    checkpoint.write_bytes(b"SDCKPT\x63\x00")
+    with pytest.raises(ValueError, match="unsupported checkpoint version"):
+        cluster_alerts(second, timedelta(minutes=15), 5, resume_from=checkpoint)
+
+
+def test_cli_checkpoint_and_resume(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first, second = _split_sample()
+    for name, alerts in (("first.json", first), ("second.json", second)):
+        payload = [alert.raw for alert in alerts]
+        (tmp_path / name).write_text(json.dumps(payload), encoding="utf-8")
+    runner = CliRunner()
+
+    missing = runner.invoke(app, ["cluster", "first.json", "--resume", "engine.ckpt"])
+    assert missing.exit_code != 0
+    result = runner.invoke(app, ["cluster", "first.json", "--checkpoint", "engine.ckpt"])
+    assert result.exit_code == 0
+    resumed = runner.invoke(app, ["cluster", "second.json", "--resume", "engine.ckpt"])
+    assert resumed.exit_code == 0
+    with_ids = runner.invoke(
+        app, ["cluster", "second.json", "--resume", "engine.ckpt", "--alerts", "ids"]
+    )
+    assert with_ids.exit_code != 0
+    assert "--resume" in with_ids.output
+
+    single = runner.invoke(app, ["cluster", str(SAMPLE)])
+    assert resumed.output == single.output
@@ -2,7 +2,16 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
 
-from socdedup.clustering import cluster_alerts
+import pytest
+
+from socdedup.clustering import (
+    ClusterState,
+    ClusteringStats,
+    EntityIndex,
+    _best_cluster_exhaustive,
+    _best_cluster_indexed,
+    cluster_alerts,
+)
 from socdedup.models import Alert
 
 
@@ -36,3 +45,104 @@ def test_clustering_greedy_scoring():
     assert len(second.alerts) == 1
     assert first.confidence.value in {"LOW", "MEDIUM", "HIGH"}
     assert first.reasoning
+
+
+def test_indexed_candidates_match_exhaustive_scan():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    hosts = ["host-a", "host-b", "host-c", None]
+    users = ["alice", "bob", None]
+    ips = ["10.0.0.1", "10.0.0.2", None]
+    techs = ["T1021", "T1046", None]
+    alerts = [
+        _alert(
+            base + timedelta(minutes=7 * i % 90),
+            hosts[i % 4],
+            users[i % 3],
+            ips[(i // 2) % 3],
+            techs[(i // 3) % 3],
+        )
+        for i in range(60)
+    ]
+    window = timedelta(minutes=15)
+
+    for min_score in (2, 3, 5, 7):
+        clusters = {}
+        index = EntityIndex()
+        for alert in sorted(alerts, key=lambda a: a.timestamp):
+            expected = _best_cluster_exhaustive(alert, clusters, window)
+            actual = _best_cluster_indexed(alert, clusters, index, window, min_score)
+            if expected[0] >= min_score:
+                assert actual == expected
+            else:
+                assert actual[0] < min_score
+            if actual[1] is not None and actual[0] >= min_score:
+                clusters[actual[1]].add_alert(alert)
+                index.add(actual[1], alert)
+            else:
+                cluster = ClusterState(incident_id=f"INC-{len(clusters) + 1:04d}")
+                cluster.add_alert(alert)
+                index.add(len(clusters), alert)
+                clusters[len(clusters)] = cluster
+
+
+def test_retirement_horizon_emits_stale_clusters_and_counts_late_alerts():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    alerts = [
+        _alert(base, "host-a", "alice", "10.0.0.1", "T1000"),
+        _alert(base + timedelta(minutes=5), "host-a", "alice", "10.0.0.1", "T1000"),
+        _alert(base + timedelta(minutes=10), "host-b", "bob", "10.0.0.2", "T2000"),
+        _alert(base + timedelta(minutes=30), "host-b", "bob", "10.0.0.2", "T2000"),
+        _alert(base + timedelta(minutes=50), "host-b", "bob", "10.0.0.2", "T2000"),
+        _alert(base + timedelta(minutes=55), "host-a", "alice", "10.0.0.1", "T1000"),
+    ]
+    window = timedelta(minutes=15)
+
+    unbounded = cluster_alerts(alerts, window, min_score=5)
+    assert [len(i.alerts) for i in unbounded] == [3, 3]
+
+    stats = ClusteringStats()
+    bounded = cluster_alerts(
+        alerts, window, min_score=5, retire_after=timedelta(minutes=30), stats=stats
+    )
+    assert [i.incident_id for i in bounded] == ["INC-0001", "INC-0002", "INC-0003"]
+    assert [len(i.alerts) for i in bounded] == [2, 3, 1]
+    assert all(i.decision_replay is not None for i in bounded)
+    assert stats.retired_incidents == 1
+    assert stats.late_alerts == 1
+    assert stats.peak_active_clusters == 2
+
+
+def test_presorted_input_is_consumed_lazily_and_checked():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    alerts = [
+        _alert(base, "host-a", "alice", "10.0.0.1", "T1000"),
+        _alert(base + timedelta(minutes=5), "host-a", "alice", "10.0.0.2", None),
+        _alert(base + timedelta(minutes=6), "host-b", "bob", "10.0.0.3", "T1000"),
+    ]
+    window = timedelta(minutes=15)
+
+    streamed = cluster_alerts(iter(alerts), window, min_score=5, presorted=True)
+    assert streamed == cluster_alerts(alerts, window, min_score=5)
+
+    with pytest.raises(ValueError, match="timestamp order"):
+        cluster_alerts(iter(reversed(alerts)), window, min_score=5, presorted=True)
+
+
+def test_parallel_finalization_matches_serial_output():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    alerts = [
+        _alert(
+            base + timedelta(minutes=i),
+            f"host-{i % 9}",
+            "admin_ops" if i % 4 == 0 else f"user{i % 5}",
+            f"10.0.0.{i % 3}",
+            "T1021" if i % 2 else None,
+        )
+        for i in range(200)
+    ]
+    window = timedelta(minutes=15)
+
+    serial = cluster_alerts(alerts, window, min_score=7)
+    parallel = cluster_alerts(alerts, window, min_score=7, workers=2)
+    assert len(serial) > 1
+    assert [i.model_dump_json() for i in parallel] == [i.model_dump_json() for i in serial]
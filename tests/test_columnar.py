@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from socdedup import columnar
+from socdedup.aggregates import AlertAggregates
+from socdedup.blast_radius import _scan_peak, compute_blast_radius, peak_host_window
+from socdedup.folding import fold_alerts
+from socdedup.models import Alert, FoldedAlert
+from socdedup.reasoning import derive_signals
+from socdedup.workload import WorkloadConfig, generate_alerts
+
+
+def _alerts(seed: int = 0):
+    config = WorkloadConfig(alerts=800, seed=seed, hosts=30, users=12, ips=20, noise=0.6)
+    alerts = [Alert(**alert) for alert in generate_alerts(config)]
+    base = alerts[0].timestamp
+    # Missing and empty entities are skipped like in AlertAggregates.add.
+    alerts.append(Alert(timestamp=base, host="", user="", alert_type="Test"))
+    alerts.append(Alert(timestamp=base, user="solo", alert_type="Test"))
+    return alerts
+
+
+@pytest.fixture
+def vectorized(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(columnar, "COLUMNAR_MIN_ALERTS", 1)
+    monkeypatch.setattr(columnar, "COLUMNAR_MIN_HOSTS", 1)
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_columnar_aggregates_match_incremental(vectorized, shuffle):
+    alerts = _alerts()
+    if shuffle:
+        random.Random(1).shuffle(alerts)
+
+    assert columnar.use_columnar(alerts)
+    assert columnar.aggregate_alerts(alerts) == AlertAggregates.from_alerts(alerts)
+
+
+def test_columnar_blast_radius_and_signals_match(vectorized, monkeypatch):
+    alerts = _alerts(seed=3)
+    blast = compute_blast_radius(alerts)
+    signals = derive_signals(alerts, blast)
+    monkeypatch.setattr(columnar, "COLUMNAR_MIN_ALERTS", 10**9)
+    monkeypatch.setattr(columnar, "COLUMNAR_MIN_HOSTS", 10**9)
+
+    assert compute_blast_radius(alerts) == blast
+    assert derive_signals(alerts, blast) == signals
+
+
+def test_peak_window_bounds_match_scan(vectorized):
+    rng = random.Random(5)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for _ in range(200):
+        times = sorted(
+            base + timedelta(seconds=rng.randrange(0, 3600, rng.choice((1, 60, 600))))
+            for _ in range(rng.randrange(1, 40))
+        )
+        assert columnar.peak_window_bounds(times, timedelta(minutes=10)) == _scan_peak(times)
+        assert peak_host_window(times).new_hosts == _scan_peak(times)[1] - _scan_peak(times)[0]
+
+
+def test_folded_alerts_and_missing_numpy_use_incremental_path(vectorized, monkeypatch):
+    alerts = sorted(_alerts(), key=lambda alert: alert.timestamp)
+    folded = list(fold_alerts(alerts, timedelta(hours=1)))
+
+    assert any(isinstance(alert, FoldedAlert) for alert in folded)
+    assert not columnar.use_columnar(folded)
+    assert columnar.aggregate_alerts(folded) == AlertAggregates.from_alerts(folded)
+
+    monkeypatch.setattr(columnar, "np", None)
+    assert not columnar.use_columnar(_alerts())
+    assert peak_host_window([datetime(2024, 1, 1, tzinfo=timezone.utc)]).new_hosts == 1
@@ -8,6 +8,7 @@ from typer.testing import CliRunner
 
 from socdedup.blast_radius import compute_blast_radius
 from socdedup.cli import app
+from socdedup.clustering import cluster_alerts
 from socdedup.confidence import assess_confidence
 from socdedup.decision import assess_decision
 from socdedup.models import Alert, Incident
@@ -103,3 +104,47 @@ def test_decision_low_monitor():
     assert confidence.value == "LOW"
     assert decision.action == "MONITOR"
     assert decision.urgency == "LOW"
+
+
+def test_online_mode_reports_decision_transitions():
+    base = datetime(2024, 1, 1, 4, 0, 0, tzinfo=timezone.utc)
+    alerts = [
+        _alert(base + timedelta(minutes=i), f"host-{i}", "admin_ops", "10.0.0.1", "T1021", "Remote Service")
+        for i in range(4)
+    ]
+    changes = []
+
+    incidents = cluster_alerts(alerts, timedelta(minutes=15), 5, on_change=changes.append)
+
+    assert [(c.previous_action, c.action) for c in changes] == [
+        ("MONITOR", "DISABLE_ACCOUNT")
+    ]
+    assert changes[0].alerts == 3
+    assert changes[0].timestamp == base + timedelta(minutes=2)
+    assert changes[0].previous_confidence.value == "LOW"
+    assert changes[0].confidence.value == "HIGH"
+    assert incidents == cluster_alerts(alerts, timedelta(minutes=15), 5)
+
+
+def test_cli_cluster_writes_transitions(tmp_path, monkeypatch):
+    runner = CliRunner()
+    base = datetime(2024, 1, 1, 5, 0, 0, tzinfo=timezone.utc)
+    records = [
+        {
+            "timestamp": (base + timedelta(minutes=i)).isoformat(),
+            "host": f"host-{i}",
+            "user": "admin_ops",
+            "src_ip": "10.0.0.1",
+            "mitre_technique": "T1021",
+            "alert_type": "Remote Service",
+        }
+        for i in range(3)
+    ]
+    source = tmp_path / "alerts.json"
+    source.write_text(json.dumps(records))
+    monkeypatch.chdir(tmp_path)
+
+    result = runner.invoke(app, ["cluster", str(source), "--transitions", "changes.jsonl"])
+    assert result.exit_code == 0
+    lines = (tmp_path / "changes.jsonl").read_text().splitlines()
+    assert [json.loads(line)["action"] for line in lines] == ["DISABLE_ACCOUNT"]
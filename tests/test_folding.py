@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from socdedup.aggregates import AlertAggregates
+from socdedup.cli import app
+from socdedup.clustering import ClusteringStats, cluster_alerts
+from socdedup.folding import fold_alerts
+from socdedup.ingest import ingest_json
+from socdedup.models import Alert, FoldedAlert, Incident, occurrences
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_alerts.json"
+
+
+def _alert(ts, host, user, tech, alert_type="Failed Login"):
+    return Alert(
+        timestamp=ts,
+        host=host,
+        user=user,
+        source_ip="10.0.0.9",
+        dest_ip=None,
+        alert_type=alert_type,
+        mitre_technique=tech,
+        raw={"seq": ts.minute},
+    )
+
+
+def test_fold_alerts_collapses_runs_within_window():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    alerts = [_alert(base + timedelta(minutes=i), "host-a", "alice", "T1110") for i in range(7)]
+    alerts.insert(3, _alert(base + timedelta(minutes=2), "host-b", "alice", "T1110"))
+
+    folded = list(fold_alerts(alerts, timedelta(minutes=5)))
+
+    assert [occurrences(alert) for alert in folded] == [6, 1, 1]
+    assert [alert.timestamp for alert in folded] == [
+        base,
+        base + timedelta(minutes=2),
+        base + timedelta(minutes=6),
+    ]
+    assert isinstance(folded[0], FoldedAlert)
+    assert folded[0].last_seen == base + timedelta(minutes=5)
+    assert folded[0].raw == {"seq": 0}
+
+
+def test_folded_aggregates_match_unfolded():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    burst = [_alert(base + timedelta(minutes=i), "host-a", "admin_ops", "T1110") for i in range(10)]
+    spread = [
+        _alert(base + timedelta(minutes=i, seconds=30), f"host-{i}", "admin_ops", "T1021")
+        for i in range(6)
+    ]
+    alerts = sorted(burst + spread, key=lambda alert: alert.timestamp)
+
+    folded = list(fold_alerts(alerts, timedelta(minutes=15)))
+
+    assert len(folded) < len(alerts)
+    assert AlertAggregates.from_alerts(folded) == AlertAggregates.from_alerts(alerts)
+
+
+def test_cluster_with_folding_matches_sample_run():
+    alerts = ingest_json(SAMPLE)
+    plain = cluster_alerts(alerts, timedelta(minutes=15), 5)
+    folded = cluster_alerts(alerts, timedelta(minutes=15), 5, fold_window=timedelta(minutes=15))
+
+    assert sum(len(incident.alerts) for incident in folded) < len(alerts)
+    for expected, incident in zip(plain, folded, strict=True):
+        assert incident.confidence == expected.confidence
+        assert incident.reasoning == expected.reasoning
+        assert incident.decision_replay == expected.decision_replay
+        assert incident.entities == expected.entities
+        assert sum(occurrences(alert) for alert in incident.alerts) == len(expected.alerts)
+        assert Incident.model_validate_json(incident.model_dump_json()) == incident
+
+
+def test_folded_run_keeps_time_bonus_of_its_last_copy():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    copies = [
+        Alert(timestamp=base + timedelta(minutes=i), host="A", user="u", alert_type="Beacon")
+        for i in range(61)
+    ]
+    # Shares only host and user, so it needs the time bonus to reach 5.
+    later = Alert(timestamp=base + timedelta(minutes=70), host="A", user="u", alert_type="Other")
+    alerts = [*copies, later]
+
+    for retire_after in (None, timedelta(minutes=20)):
+        plain = cluster_alerts(alerts, timedelta(minutes=15), 5, retire_after=retire_after)
+        folded = cluster_alerts(
+            alerts,
+            timedelta(minutes=15),
+            5,
+            retire_after=retire_after,
+            fold_window=timedelta(minutes=30),
+        )
+
+        assert [len(incident.alerts) for incident in plain] == [62]
+        assert [
+            sum(occurrences(alert) for alert in incident.alerts) for incident in folded
+        ] == [62]
+
+
+def test_folded_run_does_not_hold_back_retirement():
+    base = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    alerts = [
+        Alert(timestamp=base + timedelta(minutes=i), host="x", user="x", alert_type="Beacon")
+        for i in range(31)
+    ]
+    alerts.append(
+        Alert(timestamp=base + timedelta(minutes=1), host="y", user="y", alert_type="Scan")
+    )
+    alerts.append(
+        Alert(timestamp=base + timedelta(minutes=20), host="y", user="y", alert_type="Probe")
+    )
+    alerts.sort(key=lambda alert: alert.timestamp)
+
+    def run(fold_window):
+        stats = ClusteringStats()
+        incidents = cluster_alerts(
+            alerts,
+            timedelta(minutes=15),
+            4,
+            retire_after=timedelta(minutes=10),
+            stats=stats,
+            fold_window=fold_window,
+        )
+        return [sum(map(occurrences, incident.alerts)) for incident in incidents], stats
+
+    # The folded run of "x" lasts until minute 30; "y" still retires before
+    # the probe arrives, which then counts as late instead of joining it.
+    stats = ClusteringStats(retired_incidents=1, late_alerts=1, peak_active_clusters=2)
+    expected = ([1, 31, 1], stats)
+    assert run(None) == expected
+    assert run(timedelta(minutes=30)) == expected
+
+
+def test_cli_rejects_alert_ids_with_folding(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(
+        app, ["cluster", str(SAMPLE), "--fold-window", "5m", "--alerts", "ids"]
+    )
+
+    assert result.exit_code != 0
+    assert "--fold-window" in result.output
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import csv
 import json
+import tracemalloc
 from datetime import datetime, timezone
 
-from socdedup.ingest import ingest_csv, ingest_json
+import pytest
+
+from socdedup import ingest
+from socdedup.ingest import _normalize_alert, ingest_csv, ingest_json, ingest_jsonl, iter_json
+from socdedup.models import Alert, _parse_scalar_timestamp
 
 
 def test_ingest_json_normalization(tmp_path):
@@ -45,3 +51,203 @@ def test_ingest_csv_normalization(tmp_path):
     assert alert.user == "bob"
     assert alert.host == "host-b"
     assert alert.alert_type == "CSV Alert"
+
+
+def _payload(count: int) -> list[dict]:
+    return [
+        {
+            "timestamp": f"2024-01-01T00:{i // 60 % 5:02d}:{i % 60:02d}Z",
+            "src_ip": f"10.0.{i % 7}.1",
+            "hostname": f"host-{i % 50}",
+            "username": f"user{i % 20}",
+            "alert_type": "Stream Alert",
+            "mitre_technique": "T1046",
+            "note": "x" * 200,
+        }
+        for i in range(count)
+    ]
+
+
+def test_iter_json_matches_ingest_json_for_both_layouts(tmp_path):
+    records = _payload(50)
+    bare = tmp_path / "bare.json"
+    bare.write_text(json.dumps(records, indent=2))
+    wrapped = tmp_path / "wrapped.json"
+    wrapped.write_text(json.dumps({"source": {"name": "siem", "ids": [1, 2]}, "alerts": records}))
+
+    expected = [a.model_dump() for a in ingest_json(bare)]
+    assert [a.model_dump() for a in iter_json(bare)] == expected
+    assert [a.model_dump() for a in iter_json(wrapped)] == expected
+
+
+def test_iter_json_rejects_non_list_payload(tmp_path):
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps({"alerts": {"timestamp": "2024-01-01T00:00:00Z"}}))
+
+    with pytest.raises(ValueError, match="list of alerts"):
+        list(iter_json(path))
+
+
+def test_iter_json_peak_memory_is_independent_of_file_size(tmp_path):
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps({"alerts": _payload(5000)}))
+    file_size = path.stat().st_size
+    _parse_scalar_timestamp.cache_clear()
+
+    tracemalloc.start()
+    try:
+        count = 0
+        for _ in iter_json(path):
+            count += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 5000
+    assert file_size > 1_000_000
+    assert peak < 512 * 1024
+
+
+def test_iter_json_stops_at_a_malformed_alert(tmp_path, monkeypatch):
+    records = [json.dumps(record) for record in _payload(5000)]
+    records[10] = records[10].replace('"note"', '"note" 1,', 1)
+    path = tmp_path / "alerts.json"
+    path.write_text("[" + ",\n".join(records) + "]")
+    prefix = "[" + ",\n".join(records[:10]) + ",\n"
+    reads = []
+    open_text = ingest.Path.open
+
+    def counting_open(self, *args, **kwargs):
+        handle = open_text(self, *args, **kwargs)
+        read = handle.read
+
+        def counted(size=-1):
+            chunk = read(size)
+            reads.append(len(chunk))
+            return chunk
+
+        handle.read = counted
+        return handle
+
+    monkeypatch.setattr(ingest.Path, "open", counting_open)
+
+    with pytest.raises(ValueError, match=r"^Invalid JSON at byte (\d+): Expecting ':'") as raised:
+        list(iter_json(path))
+
+    bad = len(prefix.encode()) + records[10].index('"note"') + len('"note" ')
+    assert raised.match(rf"byte {bad}:")
+    assert sum(reads) < 4 * ingest._STREAM_CHUNK_SIZE < path.stat().st_size
+
+
+def test_iter_json_caps_record_size(tmp_path, monkeypatch):
+    path = tmp_path / "alerts.json"
+    record = dict(_payload(1)[0], note="x" * 4 * ingest._STREAM_CHUNK_SIZE)
+    path.write_text(json.dumps([_payload(1)[0], record]))
+    monkeypatch.setattr(ingest, "_MAX_RECORD_SIZE", ingest._STREAM_CHUNK_SIZE)
+
+    with pytest.raises(ValueError, match=r"byte \d+: record exceeds 65536 characters"):
+        list(iter_json(path))
+
+
+def test_ingest_jsonl_parallel_preserves_order(tmp_path, monkeypatch):
+    records = _payload(400)
+    path = tmp_path / "alerts.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n\n")
+    monkeypatch.setattr(ingest, "_JSONL_PARALLEL_MIN_BYTES", 0)
+
+    reference = tmp_path / "alerts.json"
+    reference.write_text(json.dumps(records))
+    expected = [a.model_dump() for a in ingest_json(reference)]
+    assert [a.model_dump() for a in ingest_jsonl(path, workers=1)] == expected
+    assert [a.model_dump() for a in ingest_jsonl(path, workers=3)] == expected
+
+
+def test_ingest_jsonl_reports_first_malformed_line(tmp_path, monkeypatch):
+    lines = [json.dumps(r) for r in _payload(300)]
+    lines[120] = '{"timestamp": "2024-01-01T00:00:00Z",'
+    lines[250] = "[1, 2]"
+    path = tmp_path / "alerts.ndjson"
+    path.write_text("\n".join(lines))
+    monkeypatch.setattr(ingest, "_JSONL_PARALLEL_MIN_BYTES", 0)
+
+    for workers in (1, 4):
+        with pytest.raises(ValueError, match=r"^line 121: invalid JSON"):
+            ingest_jsonl(path, workers=workers)
+
+
+def test_normalize_alert_parses_each_timestamp_string_once():
+    _parse_scalar_timestamp.cache_clear()
+    records = [
+        {"timestamp": "2024-01-01T00:00:00Z", "host": f"host-{i}", "alert_type": "Test"}
+        for i in range(10)
+    ]
+
+    alerts = [_normalize_alert(record) for record in records]
+    assert all(a.timestamp == datetime(2024, 1, 1, tzinfo=timezone.utc) for a in alerts)
+    assert _parse_scalar_timestamp.cache_info().misses == 1
+    assert alerts[0] == Alert(**alerts[0].model_dump())
+
+
+def test_normalize_alert_still_validates_unexpected_entity_types():
+    with pytest.raises(ValueError):
+        _normalize_alert({"timestamp": 0, "host": 42, "alert_type": "Test"})
+
+
+def _csv_rows(count: int) -> list[str]:
+    rows = ["timestamp,hostname,account,src_ip,alert_type,note,technique,host"]
+    for i in range(count):
+        # Quoted fields spanning lines, escaped quotes and a repeated column.
+        note = '"spans\nthree\r\nlines"' if i % 7 == 0 else '"say ""hi"""' if i % 5 == 0 else ""
+        rows.append(
+            f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z,host-{i % 9},"
+            f"user{i % 4},10.0.0.{i % 3},Alert {i % 3},{note},{'T1110' if i % 2 else ''},"
+            f"{'' if i % 3 else f'dup-{i}'}"
+        )
+    return rows
+
+
+def _csv_content(count: int) -> str:
+    return "\r\n".join(_csv_rows(count)) + "\r\n"
+
+
+def _dict_reader_alerts(path) -> list[dict]:
+    with path.open(newline="", encoding="utf-8") as handle:
+        return [_normalize_alert(row).model_dump() for row in csv.DictReader(handle)]
+
+
+def test_ingest_csv_matches_dict_reader_in_blocks_and_workers(tmp_path, monkeypatch):
+    path = tmp_path / "alerts.csv"
+    path.write_bytes(_csv_content(400).encode())
+    expected = _dict_reader_alerts(path)
+    monkeypatch.setattr(ingest, "_CSV_PARALLEL_MIN_BYTES", 0)
+
+    assert [a.model_dump() for a in ingest_csv(path, workers=1)] == expected
+    # Blocks far smaller than a record force splits inside quoted fields.
+    monkeypatch.setattr(ingest, "_CSV_BLOCK_BYTES", 23)
+    assert [a.model_dump() for a in ingest_csv(path, workers=1)] == expected
+    assert [a.model_dump() for a in ingest_csv(path, workers=3)] == expected
+
+
+def test_ingest_csv_handles_ragged_rows_and_empty_files(tmp_path):
+    path = tmp_path / "alerts.csv"
+    path.write_text("timestamp,host,user\n2024-01-01T00:00:00Z,h\n\n2024-01-01T00:00:01Z,,u\n")
+    alerts = ingest_csv(path)
+    assert [(a.host, a.user) for a in alerts] == [("h", None), (None, "u")]
+    assert alerts[0].raw == {"timestamp": "2024-01-01T00:00:00Z", "host": "h", "user": None}
+
+    path.write_text("")
+    assert ingest_csv(path) == []
+
+
+def test_ingest_csv_reports_first_bad_row_by_line(tmp_path, monkeypatch):
+    rows = _csv_rows(200)
+    rows[151] = ",host-x,,,,,,"
+    path = tmp_path / "alerts.csv"
+    path.write_text("\r\n".join(rows), newline="")
+    monkeypatch.setattr(ingest, "_CSV_PARALLEL_MIN_BYTES", 0)
+    monkeypatch.setattr(ingest, "_CSV_BLOCK_BYTES", 64)
+
+    # The 22 notes spanning three lines before it push row 151 to line 196.
+    for workers in (1, 4):
+        with pytest.raises(ValueError, match=r"^line 196: Missing timestamp"):
+            ingest_csv(path, workers=workers)
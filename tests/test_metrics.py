@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from socdedup.cli import app
+from socdedup.clustering import cluster_alerts
+from socdedup.ingest import ingest_json
+from socdedup.metrics import MetricsExporter, MetricsRegistry, PipelineMetrics, recording
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_alerts.json"
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs run.").inc(3, kind="a\"b")
+    registry.gauge("queue_depth", "Queued jobs.").set(2.5)
+    latency = registry.histogram("job_seconds", "Job latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP job_seconds Job latency.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="0.1"} 2',
+        'job_seconds_bucket{le="1"} 3',
+        'job_seconds_bucket{le="+Inf"} 4',
+        "job_seconds_sum 2.65",
+        "job_seconds_count 4",
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{kind="a\\"b"} 3',
+        "# HELP queue_depth Queued jobs.",
+        "# TYPE queue_depth gauge",
+        "queue_depth 2.5",
+    ]
+
+
+def test_clustering_reports_pipeline_metrics():
+    alerts = ingest_json(SAMPLE)
+    metrics = PipelineMetrics(MetricsRegistry())
+
+    with recording(metrics):
+        incidents = cluster_alerts(alerts, timedelta(minutes=15), 5, on_change=lambda change: None)
+
+    assert metrics.incidents_created.values[()] == len(incidents)
+    assert metrics.cluster_latency.count == len(alerts)
+    assert metrics.finalize_latency.count == len(incidents)
+    assert metrics.active_clusters.values[()] == len(incidents)
+    assert sum(metrics.confidence_transitions.values.values()) > 0
+
+
+def test_exporter_writes_on_start_and_stop(tmp_path):
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events.")
+    path = tmp_path / "textfile" / "socdedup.prom"
+
+    with MetricsExporter(registry, path, interval=3600):
+        assert "events_total 0" in path.read_text()
+        counter.inc()
+
+    assert "events_total 1" in path.read_text()
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_cli_writes_metrics_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(
+        app, ["cluster", str(SAMPLE), "--metrics-file", "metrics/socdedup.prom"]
+    )
+
+    assert result.exit_code == 0, result.output
+    text = (tmp_path / "metrics" / "socdedup.prom").read_text()
+    assert "socdedup_alerts_ingested_total 65" in text
+    assert "# TYPE socdedup_cluster_alert_seconds histogram" in text
+    assert 'socdedup_cluster_alert_seconds_bucket{le="+Inf"} 65' in text
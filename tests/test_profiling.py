@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from socdedup.cli import app
+from socdedup.clustering import cluster_alerts
+from socdedup.ingest import ingest_json
+from socdedup.profiling import Profiler, profiling
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_alerts.json"
+
+
+def test_profiler_records_assessment_stages_and_scoring():
+    alerts = ingest_json(SAMPLE)
+    profiler = Profiler()
+
+    with profiling(profiler):
+        incidents = cluster_alerts(alerts, timedelta(minutes=15), 5)
+
+    assert profiler.counters["alerts_clustered"] == len(alerts)
+    assert profiler.counters["clusters_created"] == len(incidents)
+    for name in ("blast_radius", "reasoning", "confidence", "decision"):
+        assert profiler.stages[name].calls == len(incidents)
+    assert profiler.distributions["clusters_scored"].count >= len(alerts)
+    assert profiler.distributions["candidate_postings"].max > 0
+
+
+def test_results_are_unchanged_by_profiling():
+    alerts = ingest_json(SAMPLE)
+    expected = cluster_alerts(alerts, timedelta(minutes=15), 3)
+
+    with profiling(Profiler()):
+        assert cluster_alerts(alerts, timedelta(minutes=15), 3) == expected
+
+
+def test_timed_charges_only_item_production():
+    profiler = Profiler()
+
+    assert list(profiler.timed("ingest", range(3))) == [0, 1, 2]
+    assert profiler.stages["ingest"].items == 3
+    assert profiler.stages["ingest"].calls == 3
+
+
+def test_cli_profile_writes_json(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(app, ["cluster", str(SAMPLE), "--profile", "profile.json"])
+
+    assert result.exit_code == 0, result.output
+    profile = json.loads((tmp_path / "profile.json").read_text())
+    assert profile["stages"]["ingest"]["items"] == 65
+    assert profile["stages"]["cluster"]["items"] == 65
+    assert {"payload", "write_incidents", "write_store"} <= set(profile["stages"])
+    assert profile["counters"]["bytes_written.incidents"] > 0
@@ -5,11 +5,27 @@ from datetime import datetime, timedelta, timezone
 
 from typer.testing import CliRunner
 
-from socdedup.blast_radius import compute_blast_radius
+from socdedup.blast_radius import (
+    BlastGrowth,
+    BlastRadius,
+    HostWindowTracker,
+    blast_radius_from_aggregates,
+    compute_blast_radius,
+    peak_host_window,
+)
 from socdedup.cli import app
+from socdedup.clustering import ClusterState
 from socdedup.confidence import assess_confidence
 from socdedup.models import Alert, Incident
-from socdedup.reasoning import derive_signals
+from socdedup.reasoning import (
+    CredentialSprayPattern,
+    LateralMovementPattern,
+    PrivilegedContext,
+    ReasoningSignals,
+    TechniqueProgression,
+    derive_signals,
+    signals_from_aggregates,
+)
 
 runner = CliRunner()
 
@@ -138,3 +154,79 @@ def test_cli_explain_outputs_reasoning(tmp_path):
     assert "Confidence:" in result.output
     assert "Reasoning:" in result.output
     assert "Blast radius: hosts=1 users=1 privileged_users=1" in result.output
+
+
+def test_cluster_aggregates_match_expected_analysis():
+    base = datetime(2024, 1, 1, 5, 0, 0, tzinfo=timezone.utc)
+    alerts = [
+        _alert(base + timedelta(minutes=3), "host-a", "admin_ops", "10.0.0.1", "T1110.003", "Failed Login"),
+        _alert(base, "host-b", "alice", None, None, "Remote Service"),
+        _alert(base + timedelta(minutes=40), None, "alice", "10.0.0.2", "T1021", "Remote Service"),
+        _alert(base + timedelta(minutes=7), "host-c", None, "10.0.0.1", None, "Port Scan"),
+    ]
+    for i in range(6):
+        alerts.append(
+            _alert(base + timedelta(minutes=12 + i), f"host-{i}", "alice", None, None, "Remote Service")
+        )
+
+    cluster = ClusterState(incident_id="INC-0001")
+    for alert in alerts:
+        cluster.add_alert(alert)
+
+    # What the full rescan gave before blast radius and reasoning were built
+    # on the aggregates, so neither side of the comparison checks itself.
+    expected_blast = BlastRadius(
+        unique_hosts={"host-a", "host-b", "host-c"} | {f"host-{i}" for i in range(6)},
+        unique_users={"admin_ops", "alice"},
+        privileged_users={"admin_ops"},
+        techniques={"T1110.003", "T1021"},
+        blast_growth=BlastGrowth(
+            detected=True, window_minutes=10, start_hosts=2, end_hosts=9, new_hosts=7
+        ),
+    )
+    expected_signals = ReasoningSignals(
+        credential_spray_pattern=CredentialSprayPattern(
+            detected=False, source_ips=2, users=2, window_minutes=40
+        ),
+        lateral_movement_pattern=LateralMovementPattern(
+            detected=True, user="alice", hosts=7, window_minutes=40, technique_t1021=1
+        ),
+        technique_progression=TechniqueProgression(detected=True, techniques=2, window_minutes=37),
+        privileged_context=PrivilegedContext(detected=True, privileged_users=1),
+    )
+
+    blast = blast_radius_from_aggregates(cluster.aggregates)
+    assert blast == expected_blast
+    assert compute_blast_radius(alerts) == expected_blast
+    assert signals_from_aggregates(cluster.aggregates, blast) == expected_signals
+    assert derive_signals(alerts, blast) == expected_signals
+    assert cluster.aggregates.user_bounds["alice"] == (base, base + timedelta(minutes=40))
+    assert cluster.aggregates.technique_bounds == (base + timedelta(minutes=3), base + timedelta(minutes=40))
+
+
+def test_host_window_tracker_matches_batch_scan():
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    offsets = [0, 1, 2, 2, 9, 11, 12, 13, 13, 14, 30, 31, 32, 33, 34, 35, 60]
+    times = [base + timedelta(minutes=offset) for offset in offsets]
+
+    tracker = HostWindowTracker()
+    for count, time in enumerate(times, start=1):
+        assert tracker.add(time)
+        assert tracker.peak() == peak_host_window(times[:count])
+    assert not tracker.add(base)
+    assert HostWindowTracker.from_times(reversed(times)).peak() == peak_host_window(times)
+
+
+def test_incremental_reassess_matches_blast_growth():
+    base = datetime(2024, 1, 1, 5, 0, 0, tzinfo=timezone.utc)
+    # Spread out, then a burst, then a host first seen out of order, so both
+    # the fewer-than-five fallback and the rebuild are exercised.
+    minutes = [0, 20, 40, 60, 61, 62, 63, 64, 65, 30]
+    cluster = ClusterState(incident_id="INC-0001")
+    alerts = []
+    for index, minute in enumerate(minutes):
+        alert = _alert(base + timedelta(minutes=minute), f"host-{index}", "alice", None, None, "Remote Service")
+        alerts.append(alert)
+        cluster.add_alert(alert)
+        cluster.reassess()
+        assert cluster.blast_growth == compute_blast_radius(alerts).blast_growth
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from socdedup import scoring
+from socdedup.clustering import ClusteringStats, cluster_alerts
+from socdedup.models import Alert
+from socdedup.workload import WorkloadConfig, generate_alerts
+
+WINDOW = timedelta(minutes=15)
+
+
+def _workload():
+    config = WorkloadConfig(alerts=1500, seed=7, hosts=40, users=20, ips=30)
+    return [Alert(**alert) for alert in generate_alerts(config)]
+
+
+def _run(alerts, min_score, retire_after):
+    stats = ClusteringStats()
+    incidents = cluster_alerts(alerts, WINDOW, min_score, retire_after, stats=stats)
+    return [(incident.incident_id, incident.alerts) for incident in incidents], stats
+
+
+@pytest.mark.parametrize("retire_after", [None, timedelta(minutes=30)])
+@pytest.mark.parametrize("min_score", [1, 3, 5, 7])
+def test_batch_scoring_matches_python_scoring(monkeypatch, min_score, retire_after):
+    pytest.importorskip("numpy")
+    alerts = _workload()
+    monkeypatch.setattr(scoring, "BATCH_MIN_CANDIDATES", 10**9)
+    expected = _run(alerts, min_score, retire_after)
+    monkeypatch.setattr(scoring, "BATCH_MIN_CANDIDATES", 1)
+
+    assert _run(alerts, min_score, retire_after) == expected
+
+
+def test_ties_go_to_the_earliest_cluster(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(scoring, "BATCH_MIN_CANDIDATES", 1)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    alerts = [
+        Alert(timestamp=base, host="a", alert_type="Test"),
+        Alert(timestamp=base + timedelta(minutes=1), host="b", alert_type="Test"),
+        Alert(timestamp=base + timedelta(minutes=2), user="c", alert_type="Test"),
+    ]
+
+    incidents = cluster_alerts(alerts, WINDOW, min_score=1)
+
+    assert [len(incident.alerts) for incident in incidents] == [3]
+
+
+def test_array_scorer_reuses_freed_slots():
+    pytest.importorskip("numpy")
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    scorer = scoring.ArrayScorer(WINDOW)
+    scorer.add(0, base)
+    scorer.add(1, base)
+    scorer.remove(0)
+    scorer.add(2, base + timedelta(hours=1))
+
+    assert len(scorer) == 2
+    assert scorer.best(base + timedelta(hours=1), [(2, {1, 2})], None) == (3, 2)
+    assert scorer.best(base, [(2, {1})], 2) == (3, 1)
+    assert scorer.best(base, [], 1) == (-1, None)
+
+
+def test_array_scorer_memory_follows_active_clusters():
+    pytest.importorskip("numpy")
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    scorer = scoring.ArrayScorer(WINDOW)
+    for ordinal in range(0, 1_000_000, 1000):
+        scorer.add(ordinal, base)
+        scorer.remove(ordinal)
+    scorer.add(10_000_000, base)
+
+    assert scorer.best(base, [(3, {10_000_000})], 3) == (4, 10_000_000)
+    arrays = [value for value in vars(scorer).values() if hasattr(value, "nbytes")]
+    assert sum(array.nbytes for array in arrays) <= 16 * scoring._INITIAL_SLOTS
+
+
+def test_falls_back_to_python_without_numpy(monkeypatch):
+    alerts = _workload()
+    expected = _run(alerts, 5, None)
+    monkeypatch.setattr(scoring, "np", None)
+    monkeypatch.setattr(scoring, "BATCH_MIN_CANDIDATES", 1)
+
+    assert _run(alerts, 5, None) == expected
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import socket
+from datetime import timedelta
+
+import pytest
+
+from socdedup.serve import IncidentService, ServiceError, run_server
+
+
+def _record(minute, host, user="alice", tech="T1021"):
+    return {
+        "timestamp": f"2024-01-01T03:{minute:02d}:00Z",
+        "host": host,
+        "user": user,
+        "src_ip": "10.0.0.1",
+        "alert_type": "Remote Service",
+        "mitre_technique": tech,
+    }
+
+
+async def _exchange(reader, writer, method, target, body=b""):
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+def test_service_clusters_across_batches():
+    service = IncidentService(timedelta(minutes=15), 5)
+    first = service.dispatch("POST", "/alerts", json.dumps([_record(0, "host-a")]).encode())
+    ndjson = "\n".join(json.dumps(_record(m, "host-b")) for m in (2, 1)).encode()
+    second = service.dispatch("POST", "/alerts", ndjson, "application/x-ndjson")
+
+    assert first == {"accepted": 1, "created": 1, "closed": 0, "open_incidents": 1}
+    assert second == {"accepted": 2, "created": 0, "closed": 0, "open_incidents": 1}
+    listing = service.dispatch("GET", "/incidents")["incidents"]
+    assert [(item["incident_id"], item["alerts"], item["hosts"]) for item in listing] == [
+        ("INC-0001", 3, 2)
+    ]
+    shown = service.dispatch("GET", "/incidents/INC-0001")
+    assert shown["blast_radius"]["hosts"] == 2
+    assert "action" in service.dispatch("GET", "/incidents/INC-0001/replay")
+    assert service.dispatch("GET", "/status")["alerts_ingested"] == 3
+
+
+def test_service_rejects_bad_batches_without_side_effects():
+    service = IncidentService(timedelta(minutes=15), 5)
+    body = json.dumps([_record(0, "host-a"), {"host": "host-b"}]).encode()
+    with pytest.raises(ServiceError) as excinfo:
+        service.dispatch("POST", "/alerts", body)
+    assert excinfo.value.status == 400
+    assert "alert 1" in str(excinfo.value)
+    assert service.status()["alerts_ingested"] == 0
+
+    with pytest.raises(ServiceError) as excinfo:
+        service.dispatch("GET", "/incidents/INC-9999")
+    assert excinfo.value.status == 404
+
+
+def test_service_writes_retired_incidents():
+    closed = io.StringIO()
+    service = IncidentService(
+        timedelta(minutes=15), 5, retire_after=timedelta(minutes=10), closed_output=closed
+    )
+    service.dispatch("POST", "/alerts", json.dumps([_record(0, "host-a")]).encode())
+    result = service.dispatch(
+        "POST", "/alerts", json.dumps([_record(30, "host-z", "bob", "T1110")]).encode()
+    )
+
+    assert result["closed"] == 1
+    lines = closed.getvalue().splitlines()
+    assert [json.loads(line)["incident_id"] for line in lines] == ["INC-0001"]
+    with pytest.raises(ServiceError):
+        service.show("INC-0001")
+
+
+def test_run_server_round_trip():
+    async def scenario():
+        service = IncidentService(timedelta(minutes=15), 5)
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(run_server(service, port=0, ready=ready))
+        _, port = await ready
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        body = json.dumps([_record(0, "host-a")]).encode()
+        posted = await _exchange(reader, writer, "POST", "/alerts", body)
+        missing = await _exchange(reader, writer, "GET", "/incidents/INC-0042")
+        writer.close()
+        await writer.wait_closed()
+        server.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await server
+        return posted, missing
+
+    posted, missing = asyncio.run(scenario())
+    assert posted == (200, {"accepted": 1, "closed": 0, "created": 1, "open_incidents": 1})
+    assert missing[0] == 404
+
+
+def test_unexpected_errors_answer_500_and_keep_serving(caplog):
+    class FailingService(IncidentService):
+        def status(self):
+            raise RuntimeError("boom")
+
+    async def scenario():
+        service = FailingService(timedelta(minutes=15), 5)
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(run_server(service, port=0, ready=ready))
+        _, port = await ready
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        failed = await _exchange(reader, writer, "GET", "/status")
+        listed = await _exchange(reader, writer, "GET", "/incidents")
+        writer.close()
+        await writer.wait_closed()
+        server.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await server
+        return failed, listed
+
+    failed, listed = asyncio.run(scenario())
+
+    assert failed == (500, {"error": "internal error"})
+    assert listed == (200, {"incidents": []})
+    assert "boom" in caplog.text
+
+
+def test_unix_socket_path_must_be_missing_or_a_socket(tmp_path):
+    service = IncidentService(timedelta(minutes=15), 5)
+    regular = tmp_path / "alerts.sock"
+    regular.write_text("keep me")
+
+    with pytest.raises(ValueError, match="not a socket"):
+        asyncio.run(run_server(service, unix_socket=str(regular)))
+    assert regular.read_text() == "keep me"
+
+    stale = tmp_path / "stale.sock"
+    listener = socket.socket(socket.AF_UNIX)
+    listener.bind(str(stale))
+    listener.close()
+
+    async def scenario():
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(run_server(service, unix_socket=str(stale), ready=ready))
+        await ready
+        reader, writer = await asyncio.open_unix_connection(str(stale))
+        answer = await _exchange(reader, writer, "GET", "/status")
+        writer.close()
+        await writer.wait_closed()
+        server.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await server
+        return answer
+
+    assert asyncio.run(scenario())[0] == 200
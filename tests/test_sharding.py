@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from socdedup.cli import app
+from socdedup.clustering import ClusteringStats, cluster_alerts
+from socdedup.ingest import ingest_json
+from socdedup.sharding import cluster_sharded
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_alerts.json"
+WINDOW = timedelta(minutes=15)
+
+
+def _days_of_sample(days: int):
+    sample = ingest_json(SAMPLE)
+    return [
+        alert.model_copy(update={"timestamp": alert.timestamp + timedelta(days=day)})
+        for day in range(days)
+        for alert in sample
+    ]
+
+
+@pytest.mark.parametrize("min_score", [1, 3, 5])
+def test_exact_shards_match_sequential(min_score):
+    alerts = _days_of_sample(4)
+    horizon = timedelta(minutes=20)
+
+    expected_stats = ClusteringStats()
+    expected = cluster_alerts(alerts, WINDOW, min_score, horizon, expected_stats)
+    stats = ClusteringStats()
+    incidents, report = cluster_sharded(
+        alerts, WINDOW, min_score, 4, retire_after=horizon, exact=True, workers=2, stats=stats
+    )
+
+    assert report.mode == "exact"
+    assert report.shards == 4
+    assert report.exact
+    assert incidents == expected
+    assert stats == expected_stats
+
+
+def test_exact_without_horizon_runs_sequentially():
+    alerts = _days_of_sample(2)
+
+    incidents, report = cluster_sharded(alerts, WINDOW, 5, 2, exact=True)
+
+    assert report.mode == "sequential"
+    assert "retire-after" in report.note
+    assert incidents == cluster_alerts(alerts, WINDOW, 5)
+
+
+def test_sharded_run_reports_boundaries():
+    alerts = ingest_json(SAMPLE)
+
+    incidents, report = cluster_sharded(alerts, WINDOW, 5, 3, overlap=timedelta(minutes=30))
+
+    assert report.mode == "sharded"
+    assert len(report.boundaries) == 2
+    assert not report.exact
+    assert sum(len(incident.alerts) for incident in incidents) == len(alerts)
+    assert [incident.incident_id for incident in incidents] == [
+        f"INC-{number:04d}" for number in range(1, len(incidents) + 1)
+    ]
+    assert len(report.lines()) == 3
+
+
+def test_overlap_must_cover_time_window():
+    with pytest.raises(ValueError, match="overlap"):
+        cluster_sharded(ingest_json(SAMPLE), WINDOW, 5, 2, overlap=timedelta(minutes=5))
+
+
+def test_cli_prints_shard_report(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(
+        app,
+        ["cluster", str(SAMPLE), "--shards", "2", "--exact", "--retire-after", "20m"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "mode=" in result.output
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from socdedup import sources
+from socdedup.cli import app
+from socdedup.models import Alert
+from socdedup.sources import (
+    expand_inputs,
+    merge_sources,
+    merge_streams,
+    read_sources,
+    source_positions,
+)
+from socdedup.workload import WorkloadConfig, generate_alerts
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_alerts.json"
+
+
+def _write_parts(directory: Path, records: list[dict], parts: int, shuffle: set[int]) -> list[Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for number in range(parts):
+        part = records[number::parts]
+        if number in shuffle:
+            random.Random(number).shuffle(part)
+        path = directory / f"part-{number}.jsonl"
+        path.write_text("".join(json.dumps(record) + "\n" for record in part))
+        paths.append(path)
+    return paths
+
+
+def _keys(alerts):
+    return [(alert.timestamp, alert.host, alert.user, alert.alert_type) for alert in alerts]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_merge_matches_sorting_the_concatenation(tmp_path, workers):
+    records = list(generate_alerts(WorkloadConfig(alerts=600, seed=4)))
+    paths = _write_parts(tmp_path, records, 4, shuffle={1, 3})
+
+    sources = read_sources(paths, workers=workers)
+    concatenated = [Alert(**record) for path in paths for record in map(json.loads, path.open())]
+
+    assert [source.order is None for source in sources] == [True, False, True, False]
+    assert _keys(merge_sources(sources)) == _keys(
+        sorted(concatenated, key=lambda alert: alert.timestamp)
+    )
+
+    positions: dict[int, int] = {}
+    source_positions(sources, positions)
+    merged = list(merge_sources(sources))
+    assert _keys(concatenated[positions[id(alert)]] for alert in merged) == _keys(merged)
+
+
+def test_parallel_reads_do_not_nest_pools(tmp_path, monkeypatch):
+    records = list(generate_alerts(WorkloadConfig(alerts=60, seed=1)))
+    paths = _write_parts(tmp_path, records, 3, shuffle=set())
+    requested = []
+    load_alerts = sources.load_alerts
+
+    class InlinePool:
+        def __init__(self, max_workers):
+            requested.append(("pool", max_workers))
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, function, items):
+            return map(function, items)
+
+    def recording_load(path, workers=None):
+        requested.append(("file", workers))
+        return load_alerts(path, workers=workers)
+
+    monkeypatch.setattr(sources, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(sources, "load_alerts", recording_load)
+    read_sources(paths, workers=4)
+
+    assert requested == [("pool", 3), ("file", 1), ("file", 1), ("file", 1)]
+
+
+def test_merge_streams_records_file_positions(tmp_path):
+    records = list(generate_alerts(WorkloadConfig(alerts=200, seed=2)))
+    paths = _write_parts(tmp_path, records, 3, shuffle=set())
+    concatenated = [Alert(**record) for path in paths for record in map(json.loads, path.open())]
+
+    positions: dict[int, int] = {}
+    merged = list(merge_streams(paths, positions))
+
+    assert _keys(merged) == _keys(sorted(concatenated, key=lambda alert: alert.timestamp))
+    assert _keys(concatenated[positions[id(alert)]] for alert in merged) == _keys(merged)
+
+
+def test_expand_inputs(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "nested").mkdir()
+    for name in ["a.json", "b/2.csv", "b/1.jsonl", "b/nested/3.ndjson", "b/notes.txt"]:
+        (tmp_path / name).write_text("")
+
+    expanded = expand_inputs(
+        [str(tmp_path / "a.json"), str(tmp_path / "b"), str(tmp_path / "*.json")]
+    )
+
+    assert expanded == [
+        tmp_path / "a.json",
+        tmp_path / "b" / "1.jsonl",
+        tmp_path / "b" / "2.csv",
+        tmp_path / "b" / "nested" / "3.ndjson",
+    ]
+    with pytest.raises(ValueError, match="no alert files found"):
+        expand_inputs([str(tmp_path / "*.csv")])
+    with pytest.raises(ValueError, match="unsupported file type"):
+        expand_inputs([str(tmp_path / "b" / "notes.txt")])
+
+
+def test_cli_clusters_a_directory_like_one_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = json.loads(SAMPLE.read_text())
+    whole = tmp_path / "whole.jsonl"
+    whole.write_text("".join(json.dumps(record) + "\n" for record in records))
+    _write_parts(tmp_path / "parts", records, 3, shuffle=set())
+
+    def run(*arguments):
+        result = CliRunner().invoke(app, ["cluster", *arguments, "--alerts", "ids"])
+        assert result.exit_code == 0, result.output
+        return json.loads((tmp_path / "data" / "out" / "incidents.json").read_text())
+
+    def ids(incidents):
+        # Parts interleave the records, so map part positions back to the file.
+        sizes = [len(records[number::3]) for number in range(3)]
+        starts = [sum(sizes[:number]) for number in range(3)]
+        original = {
+            starts[number] + index: number + 3 * index
+            for number in range(3)
+            for index in range(sizes[number])
+        }
+        return [
+            sorted(original[alert_id] for alert_id in incident["alert_ids"])
+            for incident in incidents
+        ]
+
+    expected = run(str(whole))
+    merged = run(str(tmp_path / "parts"))
+
+    assert [sorted(incident["alert_ids"]) for incident in expected] == ids(merged)
+
+
+def test_cli_names_the_file_that_fails_to_parse(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = list(generate_alerts(WorkloadConfig(alerts=40, seed=3)))
+    _write_parts(tmp_path / "parts", records, 2, shuffle=set())
+    broken = tmp_path / "parts" / "part-1.jsonl"
+    broken.write_text(broken.read_text() + json.dumps({"host": "h"}) + "\n")
+
+    for extra in ([], ["--presorted"]):
+        result = CliRunner().invoke(app, ["cluster", "parts", *extra])
+        assert result.exit_code != 0
+        assert isinstance(result.exception, SystemExit)
+        assert "part-1.jsonl" in result.output
+
+
+def test_directories_skip_earlier_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = json.loads(SAMPLE.read_text())
+    _write_parts(tmp_path / "data", records, 2, shuffle=set())
+    runner = CliRunner()
+
+    first = runner.invoke(app, ["cluster", "data", "--transitions", "data/changes.jsonl"])
+    assert first.exit_code == 0, first.output
+    assert (tmp_path / "data" / "out" / "incidents.json").exists()
+    second = runner.invoke(app, ["cluster", "data", "--transitions", "data/changes.jsonl"])
+
+    assert second.exit_code == 0, second.output
+    assert second.output == first.output
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from socdedup import cli
+from socdedup.cli import app
+from socdedup.clustering import cluster_alerts
+from socdedup.ingest import ingest_json
+from socdedup.store import (
+    IncidentStore,
+    IncidentWriter,
+    JsonIncidentIndex,
+    StaleIndexError,
+    incident_payload,
+    write_incidents,
+)
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_alerts.json"
+
+
+def test_store_round_trip(tmp_path):
+    incidents = cluster_alerts(ingest_json(SAMPLE), timedelta(minutes=15), 5)
+    payload = [incident_payload(incident) for incident in incidents]
+    store = IncidentStore(tmp_path / "incidents.db")
+
+    assert store.write(payload) == len(incidents)
+    assert len(store) == len(incidents)
+    for incident in incidents:
+        assert store.get(incident.incident_id) == incident
+    assert store.get("INC-9999") is None
+
+    store.write(payload[:1])
+    assert len(store) == 1
+
+
+def test_cli_lookups_use_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    result = runner.invoke(app, ["cluster", str(SAMPLE)])
+    assert result.exit_code == 0
+
+    payload = json.loads(Path("data/out/incidents.json").read_text(encoding="utf-8"))
+    incident_id = payload[0]["incident_id"]
+    for path in ("data/out/incidents.db", "data/out/incidents.json"):
+        shown = runner.invoke(app, ["incidents", "show", incident_id, "--explain", "--path", path])
+        assert shown.exit_code == 0
+        assert f"Incident: {incident_id}" in shown.output
+    replay = runner.invoke(app, ["incidents", "replay", incident_id])
+    assert replay.exit_code == 0
+    assert "Action:" in replay.output
+
+    missing = runner.invoke(app, ["incidents", "show", "INC-9999"])
+    assert missing.exit_code != 0
+
+
+def test_json_sidecar_lookup_and_stale_fallback(tmp_path):
+    incidents = cluster_alerts(ingest_json(SAMPLE), timedelta(minutes=15), 5)
+    payload = [incident_payload(incident) for incident in incidents]
+    path = tmp_path / "incidents.json"
+    write_incidents(path, payload)
+
+    assert path.read_text(encoding="utf-8") == json.dumps(payload, indent=2, sort_keys=True)
+    index = JsonIncidentIndex(path)
+    for incident in incidents:
+        assert index.get(incident.incident_id) == incident
+    assert index.get("INC-9999") is None
+
+    path.write_text(json.dumps(payload[::-1]), encoding="utf-8")
+    with pytest.raises(StaleIndexError):
+        index.get(incidents[0].incident_id)
+    runner = CliRunner()
+    shown = runner.invoke(
+        app, ["incidents", "show", incidents[-1].incident_id, "--path", str(path)]
+    )
+    assert shown.exit_code == 0
+    assert f"Incident: {incidents[-1].incident_id}" in shown.output
+
+
+@pytest.mark.parametrize("alerts_mode", ["full", "ids", "none"])
+@pytest.mark.parametrize("output_format", ["json", "jsonl"])
+def test_compact_output_modes_are_readable(tmp_path, monkeypatch, output_format, alerts_mode):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    args = ["cluster", str(SAMPLE), "--output-format", output_format, "--alerts", alerts_mode]
+    result = runner.invoke(app, [*args, "--drop-raw"])
+    assert result.exit_code == 0
+
+    path = Path(f"data/out/incidents.{output_format}")
+    expected = cluster_alerts(ingest_json(SAMPLE), timedelta(minutes=15), 5)
+    index = JsonIncidentIndex(path)
+    for incident in expected:
+        found = index.get(incident.incident_id)
+        assert found.decision_replay == incident.decision_replay
+        assert found.entities == incident.entities
+        if alerts_mode == "full":
+            assert len(found.alerts) == len(incident.alerts)
+            assert all(alert.raw == {} for alert in found.alerts)
+        else:
+            assert found.alerts == []
+            assert found.alert_count == len(incident.alerts)
+    if alerts_mode == "ids":
+        found_ids = [index.get(incident.incident_id).alert_ids for incident in expected]
+        ids = sorted(position for alert_ids in found_ids for position in alert_ids)
+        assert ids == list(range(len(ingest_json(SAMPLE))))
+
+    incident_id = expected[0].incident_id
+    Path(f"data/out/incidents.{output_format}.idx").unlink()
+    for lookup in (["--path", str(path)], []):
+        shown = runner.invoke(app, ["incidents", "show", incident_id, "--explain", *lookup])
+        assert shown.exit_code == 0
+        assert "Blast radius:" in shown.output
+        replay = runner.invoke(app, ["incidents", "replay", incident_id, *lookup])
+        assert replay.exit_code == 0
+
+
+def test_failed_run_keeps_previous_output(tmp_path):
+    incidents = cluster_alerts(ingest_json(SAMPLE), timedelta(minutes=15), 5)
+    payload = [incident_payload(incident) for incident in incidents]
+    path = tmp_path / "incidents.json"
+    store = IncidentStore(tmp_path / "incidents.db")
+    write_incidents(path, iter(payload))
+    store.write(iter(payload))
+    before = path.read_bytes()
+
+    def failing():
+        yield payload[0]
+        raise ValueError("clustering failed")
+
+    with pytest.raises(ValueError):
+        write_incidents(path, failing())
+    with pytest.raises(ValueError):
+        store.write(failing())
+
+    assert path.read_bytes() == before
+    assert len(store) == len(incidents)
+    assert sorted(tmp_path.iterdir()) == [
+        tmp_path / "incidents.db",
+        tmp_path / "incidents.json",
+        tmp_path / "incidents.json.idx",
+    ]
+
+
+def test_cli_writes_retired_incidents_while_clustering(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    alerts = sorted(ingest_json(SAMPLE), key=lambda alert: alert.timestamp)
+    consumed = []
+    written_at = []
+
+    def stream(path):
+        for alert in alerts:
+            consumed.append(alert)
+            yield alert
+
+    add = IncidentWriter.add
+
+    def recording_add(self, item):
+        written_at.append(len(consumed))
+        add(self, item)
+
+    monkeypatch.setattr(cli, "stream_alerts", stream)
+    monkeypatch.setattr(IncidentWriter, "add", recording_add)
+    result = CliRunner().invoke(
+        app, ["cluster", str(SAMPLE), "--presorted", "--retire-after", "20m"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert written_at[0] < len(alerts)
+    assert len(json.loads(Path("data/out/incidents.json").read_text())) == len(written_at)
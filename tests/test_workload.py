@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+
+from typer.testing import CliRunner
+
+from socdedup.bench import run_benchmark
+from socdedup.cli import app
+from socdedup.ingest import ingest_jsonl
+from socdedup.workload import WorkloadConfig, generate_alerts, write_workload
+
+
+def test_workload_is_seeded_and_ordered():
+    config = WorkloadConfig(alerts=2_000, seed=7, hosts=50, users=20, ips=30)
+
+    alerts = list(generate_alerts(config))
+
+    assert len(alerts) == 2_000
+    assert alerts == list(generate_alerts(config))
+    assert alerts != list(generate_alerts(WorkloadConfig(alerts=2_000, seed=8)))
+    timestamps = [alert["timestamp"] for alert in alerts]
+    assert timestamps == sorted(timestamps)
+    assert len({alert["host"] for alert in alerts}) <= 50
+
+
+def test_workload_injects_scenarios(tmp_path):
+    config = WorkloadConfig(alerts=1_000, noise=0.7, sprays=1, lateral=1, blast_growth=1)
+    path = tmp_path / "alerts.jsonl"
+
+    assert write_workload(path, config) == 1_000
+
+    alerts = ingest_jsonl(path, workers=1)
+    techniques = {alert.mitre_technique for alert in alerts}
+    assert {"T1110.003", "T1021.002", "T1486"} <= techniques
+    assert sum(alert.mitre_technique == "T1110.003" for alert in alerts) == 100
+
+
+def test_benchmark_reports_every_stage(tmp_path):
+    result = run_benchmark(
+        WorkloadConfig(alerts=500), retire_after=timedelta(hours=1), workdir=tmp_path
+    )
+
+    report = result.as_dict()
+    assert list(report["stages"]) == [
+        "generate",
+        "ingest",
+        "cluster",
+        "blast_radius",
+        "signals",
+        "serialize",
+    ]
+    assert report["workload"]["alerts"] == 500
+    assert report["incidents"] == result.incidents > 0
+    assert report["alerts_per_second"] > 0
+
+
+def test_cli_bench_writes_results(tmp_path):
+    output = tmp_path / "bench.json"
+    result = CliRunner().invoke(
+        app, ["bench", "--alerts", "300", "--output", str(output)]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(output.read_text())["stages"]["cluster"]["items"] == 300